@@ -6,3 +6,11 @@ class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.common"
     verbose_name = _("Common")
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import profiling, sqlstats
+
+        connection_created.connect(sqlstats.install, dispatch_uid="sqlstats-install")
+        connection_created.connect(profiling.install_sql_counter, dispatch_uid="profiling-install-sql-counter")
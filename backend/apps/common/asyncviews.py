@@ -0,0 +1,155 @@
+"""
+Async (ASGI-native) read views.
+
+Under ASGI a synchronous DRF view holds one of the worker's sync threads for
+the whole request. ``AsyncReadView`` serves ``GET`` and ``HEAD`` on the event
+loop instead: JWT authentication, the DRF permission classes, serialization
+and rendering run in the loop, and queries go through Django's async ORM, so
+a request only needs a thread while a query runs. Other methods go to
+``fallback``, the synchronous DRF view of the same URL. The async views are
+routed when ``ASYNC_READ_VIEWS`` is set, which ``config.asgi`` does.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.decorators import classonlymethod
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .profiling import phase
+from .projection import ProjectedSerializerMixin, parse_fields, plan_serializer
+from .renderers import FastJSONRenderer
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_jwt = JWTAuthentication()
+
+
+async def authenticate(request):
+    """``(user, token)`` from the request's bearer token; anonymous without one."""
+    if _jwt.get_header(request) is None:
+        return AnonymousUser(), None
+    # Token validation is CPU only; the user lookup is one query
+    result = await sync_to_async(_jwt.authenticate)(request)
+    return result if result is not None else (AnonymousUser(), None)
+
+
+def _closing(func):
+    def run():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+
+    return run
+
+
+async def run_queries(*funcs):
+    """
+    The results of the blocking ``funcs``, usually ORM calls. Django's async
+    ORM runs every query on one shared thread, so gathering ``acount()``
+    calls would still run them one by one. With ``ASYNC_PARALLEL_QUERIES``
+    each function gets its own thread and connection and the queries overlap;
+    that needs a database server with connections to spare (or a pooler), and
+    the functions don't see the caller's uncommitted writes. Otherwise they
+    run back to back in a single hop to the ORM's thread.
+    """
+    if settings.ASYNC_PARALLEL_QUERIES:
+        return await asyncio.gather(*(sync_to_async(_closing(func), thread_sensitive=False)() for func in funcs))
+    return await sync_to_async(lambda: [func() for func in funcs])()
+
+
+class AsyncReadView:
+    """
+    A minimal async counterpart of ``APIView`` for read endpoints. Subclasses
+    implement ``async def get()`` and return ``self.render(data)``; serializers
+    declared as ``serializer_class`` get ``?fields=``/``?exclude=`` projection
+    like ``ProjectionMixin``. Responses are always JSON.
+    """
+
+    permission_classes = ()
+    serializer_class = None
+    fallback = None
+    renderer = FastJSONRenderer()
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            if request.method in SAFE_METHODS:
+                return await self.dispatch(request, *args, **kwargs)
+            if self.fallback is not None:
+                return await sync_to_async(self.fallback)(request, *args, **kwargs)
+            return HttpResponseNotAllowed(SAFE_METHODS)
+
+        view.view_class = cls
+        view.view_initkwargs = initkwargs
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.request, self.args, self.kwargs = request, args, kwargs
+        try:
+            with phase("auth"):
+                request.user, request.auth = await authenticate(request)
+            with phase("permissions"):
+                self.check_permissions(request)
+            return await self.get(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    def check_permissions(self, request):
+        for permission in (permission_class() for permission_class in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(getattr(permission, "message", None))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = _jwt.authenticate_header(self.request)
+            exc.status_code = 401
+        context = {"view": self, "args": self.args, "kwargs": self.kwargs, "request": self.request}
+        response = api_settings.EXCEPTION_HANDLER(exc, context)
+        if response is None:
+            raise exc
+        return self.render(response.data, status=response.status_code, headers=dict(response.items()))
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.serializer_class, ProjectedSerializerMixin):
+            kwargs.setdefault("fields", parse_fields(self.request.GET.get("fields")))
+            kwargs.setdefault("exclude", parse_fields(self.request.GET.get("exclude")))
+        kwargs.setdefault("context", {"request": self.request, "view": self, "format": None})
+        return self.serializer_class(*args, **kwargs)
+
+    def project(self, queryset):
+        """``queryset`` trimmed to what the (projected) serializer reads, with its joins and prefetches."""
+        return plan_serializer(self.get_serializer(), queryset.model).apply(queryset)
+
+    async def serialize_list(self, queryset):
+        """Evaluate ``queryset`` with the async ORM, then serialize it in the loop."""
+        rows = [row async for row in self.project(queryset)]
+        return self.get_serializer(rows, many=True).data
+
+    def encode(self, data):
+        with phase("render"):
+            return self.renderer.render(data, "application/json", {})
+
+    def render(self, data, status=200, headers=None):
+        return self.respond(self.encode(data), status, headers)
+
+    def respond(self, content, status=200, headers=None):
+        response = HttpResponse(content, status=status, content_type="application/json")
+        for name, value in (headers or {}).items():
+            if name.lower() != "content-type":
+                response[name] = value
+        return response
@@ -0,0 +1,321 @@
+"""
+Read-through caching for per-user reads.
+
+A ``ReadCache`` keeps values in a small in-process LRU in front of the shared
+``CACHES`` backend. Keys carry a version per scope (usually a user), and
+saving or deleting one of the models a cache depends on bumps that version
+once the transaction commits, so stale entries are never read again and
+simply expire. Concurrent misses for one key run the computation once: threads
+of a process share it through ``SingleFlight``, and processes through a short
+lock in the shared cache.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from rest_framework.response import Response
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """A thread-safe, size-bounded in-process cache with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Concurrent ``do(key, func)`` calls with the same key share one execution
+    of ``func``: the first caller runs it, the others wait and get its result
+    (or its exception). Returns ``(result, shared)``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class AsyncSingleFlight:
+    """
+    ``SingleFlight`` for coroutines: followers await the leader's future
+    instead of blocking a thread. Calls are shared per event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func):
+        """Like ``SingleFlight.do``, with ``func`` returning an awaitable."""
+        loop = asyncio.get_running_loop()
+        future = self._calls.get((loop, key))
+        if future is not None:
+            return await asyncio.shield(future), True
+        future = self._calls[(loop, key)] = loop.create_future()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark it retrieved, in case no follower awaited it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._calls[(loop, key)]
+        return result, False
+
+
+class CacheStats:
+    """Per-cache hit and miss counters, exposed through the cache stats endpoint."""
+
+    FIELDS = ("local_hits", "shared_hits", "misses", "coalesced", "invalidations")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.caches = {}
+
+    def incr(self, name, field):
+        with self._lock:
+            entry = self.caches.setdefault(name, dict.fromkeys(self.FIELDS, 0))
+            entry[field] += 1
+
+    def as_dict(self):
+        with self._lock:
+            result = {}
+            for name, entry in self.caches.items():
+                reads = entry["local_hits"] + entry["shared_hits"] + entry["misses"]
+                hits = entry["local_hits"] + entry["shared_hits"]
+                result[name] = dict(entry, hit_ratio=hits / reads if reads else None)
+            return result
+
+
+stats = CacheStats()
+_registry = {}
+
+
+def registered_caches():
+    return dict(_registry)
+
+
+class ReadCache:
+    """
+    ``get_or_set(scope, key, compute)`` caches ``compute()`` under ``key``
+    for one ``scope``, e.g. a user's pk. ``depends_on`` maps models to a
+    function returning the scopes an instance affects; saves and deletes of
+    those models invalidate the scopes on commit, a save both the scopes the
+    instance had when loaded and the ones it has now. Queryset ``update()``
+    and ``bulk_create()`` send no signals and are covered by ``timeout`` only.
+    """
+
+    def __init__(self, name, timeout=None, depends_on=None, alias="default"):
+        self.name = name
+        self.timeout = timeout if timeout is not None else settings.READ_CACHE_TIMEOUT
+        self.alias = alias
+        self.local = LocalLRU(settings.READ_CACHE_LOCAL_ENTRIES)
+        self.flight = SingleFlight()
+        _registry[name] = self
+        for model, scopes in (depends_on or {}).items():
+            self.connect(model, scopes)
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def connect(self, model, scopes):
+        def loaded(instance):
+            return instance.__dict__.setdefault("_read_cache_scopes", {})
+
+        def remember(sender, instance, **kwargs):
+            # Reading a deferred field here would cost a query per instance
+            if not instance.get_deferred_fields():
+                loaded(instance)[self.name] = list(scopes(instance))
+
+        def before_save(sender, instance, raw=False, using=None, **kwargs):
+            if self.name in loaded(instance) or instance._state.adding or instance.pk is None:
+                return
+            stored = sender._base_manager.using(using).filter(pk=instance.pk).first()
+            if stored is not None:
+                loaded(instance)[self.name] = list(scopes(stored))
+
+        def invalidate_on_commit(affected, using):
+            affected = [scope for scope in dict.fromkeys(affected) if scope is not None]
+            if affected:
+                transaction.on_commit(lambda: self.invalidate(*affected), using=using)
+
+        def saved(sender, instance, using=None, **kwargs):
+            # Moving an instance to another scope also changes the one it left
+            current = list(scopes(instance))
+            invalidate_on_commit(loaded(instance).get(self.name, []) + current, using)
+            loaded(instance)[self.name] = current
+
+        def deleted(sender, instance, using=None, **kwargs):
+            invalidate_on_commit(scopes(instance), using)
+
+        uid = f"read-cache:{self.name}:{model._meta.label}"
+        post_init.connect(remember, sender=model, weak=False, dispatch_uid=uid)
+        pre_save.connect(before_save, sender=model, weak=False, dispatch_uid=uid)
+        post_save.connect(saved, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=uid)
+
+    def version_key(self, scope):
+        return f"rc:{self.name}:{scope}:v"
+
+    def version(self, scope):
+        key = self.version_key(scope)
+        version = self.shared.get(key)
+        if version is None:
+            # Time based, so a version lost to eviction never reuses an old number
+            self.shared.add(key, time.time_ns(), None)
+            version = self.shared.get(key)
+        return version
+
+    def invalidate(self, *scopes):
+        for scope in scopes:
+            key = self.version_key(scope)
+            try:
+                self.shared.incr(key)
+            except ValueError:
+                self.shared.set(key, time.time_ns(), None)
+            stats.incr(self.name, "invalidations")
+
+    def make_key(self, scope, key):
+        digest = hashlib.sha256(str(key).encode()).hexdigest()[:32]
+        return f"rc:{self.name}:{scope}:{self.version(scope)}:{digest}"
+
+    def get_or_set(self, scope, key, compute, cache_if=None):
+        """
+        The cached value, or ``compute()``'s result, which is stored unless
+        ``cache_if(result)`` is false.
+        """
+        full_key = self.make_key(scope, key)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            stats.incr(self.name, "local_hits")
+            return value
+        value = self.shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            stats.incr(self.name, "shared_hits")
+            self.local.set(full_key, value, min(self.timeout, settings.READ_CACHE_LOCAL_TIMEOUT))
+            return value
+
+        stats.incr(self.name, "misses")
+        value, shared = self.flight.do(full_key, lambda: self.fill(full_key, compute, cache_if))
+        if shared:
+            stats.incr(self.name, "coalesced")
+        return value
+
+    def fill(self, full_key, compute, cache_if):
+        lock_key = full_key + ":lock"
+        lock_timeout = settings.READ_CACHE_LOCK_TIMEOUT
+        locked = self.shared.add(lock_key, 1, lock_timeout)
+        if not locked:
+            # Another process is computing the value; wait for it, then give up
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.01)
+                value = self.shared.get(full_key, _MISSING)
+                if value is not _MISSING:
+                    return value
+        try:
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.shared.set(full_key, value, self.timeout)
+                self.local.set(full_key, value, min(self.timeout, settings.READ_CACHE_LOCAL_TIMEOUT))
+        finally:
+            if locked:
+                self.shared.delete(lock_key)
+        return value
+
+
+class CachedReadMixin:
+    """
+    For generic views: serves ``GET`` from ``read_cache``, keyed by the
+    requesting user and the full path. Only 200 responses are cached; the
+    rest of the view (other methods, anonymous users) is unchanged.
+    """
+
+    read_cache = None
+
+    def cache_scope(self, request):
+        return request.user.pk
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return super().get(request, *args, **kwargs)
+
+        def compute():
+            response = super(CachedReadMixin, self).get(request, *args, **kwargs)
+            return response.status_code, response.data
+
+        status, data = self.read_cache.get_or_set(
+            self.cache_scope(request), request.get_full_path(), compute, cache_if=lambda result: result[0] == 200
+        )
+        return Response(data, status=status)
@@ -0,0 +1,109 @@
+"""
+In-process request coalescing for public read-only views. When many clients
+ask for the same resource at once (an app release makes every passenger load
+the route list), the first request runs the view and the others wait for it
+and get a copy of its rendered response.
+"""
+import hashlib
+
+from django.http import HttpResponse
+from rest_framework.permissions import AllowAny
+
+from .cache import SingleFlight
+from .routers import current_state
+
+SAFE_METHODS = ("GET", "HEAD")
+
+_flight = SingleFlight()
+
+
+class CoalescedResponse(HttpResponse):
+    """An already rendered copy of a DRF response, with its ``data``."""
+
+    def __init__(self, content, status, headers, data, coalesced):
+        super().__init__(content, status=status)
+        for name, value in headers:
+            self[name] = value
+        self.data = data
+        self.coalesced = coalesced
+
+    def render(self):
+        return self
+
+
+def coalescable(request):
+    """
+    Whether ``request`` may share a response: a safe method from a client not
+    pinned to the primary after a write, since the leader may be reading
+    from a replica.
+    """
+    if request.method not in SAFE_METHODS:
+        return False
+    state = current_state()
+    return state is None or not state.pinned
+
+
+def coalesce_key(view, request, vary, public):
+    """
+    The key under which ``view`` shares its response to ``request``: the path
+    and the ``vary`` headers, plus a hash of the credentials unless ``public``.
+    """
+    headers = tuple(request.headers.get(name, "") for name in vary)
+    principal = None
+    if not public:
+        credentials = "\n".join(request.headers.get(name, "") for name in ("Authorization", "Cookie"))
+        principal = hashlib.sha256(credentials.encode()).hexdigest()
+    return (type(view).__module__, type(view).__qualname__, request.method, request.get_full_path(), headers, principal)
+
+
+class CoalescedReadMixin:
+    """
+    Followers skip authentication and permission checks and receive the
+    leader's bytes, so requests only share a response when they carry the
+    same credentials (``Authorization`` and cookies). Set ``coalesce_public``
+    on views whose GET output does not depend on who asks; their requests
+    share regardless of credentials as long as every permission of the action
+    is ``AllowAny``. Clients pinned to the primary after a write never
+    coalesce, since the leader may be reading from a replica.
+
+    ``coalesce_actions`` limits coalescing to some viewset actions, and
+    ``coalesce_vary`` lists the request headers that select a different
+    response (content negotiation).
+    """
+
+    coalesce_actions = None
+    coalesce_public = False
+    coalesce_vary = ("Accept", "Accept-Language")
+
+    def is_public(self, request):
+        if not self.coalesce_public:
+            return False
+        if hasattr(self, "action_map"):
+            self.action = self.action_map.get(request.method.lower())
+        return all(isinstance(permission, AllowAny) for permission in self.get_permissions())
+
+    def coalesce_key(self, request):
+        return coalesce_key(self, request, self.coalesce_vary, self.is_public(request))
+
+    def should_coalesce(self, request):
+        if not coalescable(request):
+            return False
+        if self.coalesce_actions is None:
+            return True
+        # dispatch() runs before the viewset sets self.action
+        action = getattr(self, "action_map", {}).get(request.method.lower())
+        return action in self.coalesce_actions
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.should_coalesce(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        def run():
+            response = super(CoalescedReadMixin, self).dispatch(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            return response.content, response.status_code, list(response.items()), getattr(response, "data", None)
+
+        result, shared = _flight.do(self.coalesce_key(request), run)
+        # Middleware modifies responses in place, so every caller gets its own
+        return CoalescedResponse(*result, coalesced=shared)
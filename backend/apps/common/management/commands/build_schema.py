@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common import schema
+
+
+class Command(BaseCommand):
+    help = "Regenerate the OpenAPI schema artifact served at /api/schema/."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true", help="Only compare the committed schema with the code; exit 1 on drift."
+        )
+
+    def handle(self, *args, **options):
+        path = settings.SCHEMA_ARTIFACT
+        if options["check"]:
+            current = path.read_bytes() if path.exists() else b""
+            if current != schema.generate():
+                raise CommandError(f"{path} is out of date; run manage.py build_schema.")
+            self.stdout.write(self.style.SUCCESS(f"{path} is up to date."))
+            return
+        content = schema.write(path)
+        schema.reset()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path} ({len(content):,} bytes) and {path.name}.gz."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.common.thumbnails import generate_thumbnail, record_thumbnail
+from apps.profiles.models import Profile
+from apps.vehicle.models import Vehicle
+
+
+class Command(BaseCommand):
+    help = "Generate missing WebP thumbnails for vehicle licenses and profile photos and record them."
+
+    def handle(self, *args, **options):
+        names = set(Vehicle.objects.exclude(license="").values_list("license", flat=True))
+        names |= set(
+            Profile.objects.exclude(profile_photo="")
+            .exclude(profile_photo__isnull=True)
+            .values_list("profile_photo", flat=True)
+        )
+        generated = failed = 0
+        for name in sorted(names):
+            try:
+                thumbnail = generate_thumbnail(name)
+                record_thumbnail(Vehicle, "license", name, thumbnail)
+                record_thumbnail(Profile, "profile_photo", name, thumbnail)
+                generated += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"{name}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"{generated} thumbnails ready, {failed} failed."))
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+
+from apps.common import sqlstats
+
+SORT_KEYS = {
+    "total": lambda row: row["total_ms"],
+    "count": lambda row: row["count"],
+    "mean": lambda row: row["total_ms"] / row["count"],
+    "p95": lambda row: row["p95_ms"] if row["p95_ms"] is not None else float("inf"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Top SQL fingerprints by database time, merged from every process that "
+        "flushed statistics (SQL_STATS_ENABLED) to the shared cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--sort", choices=SORT_KEYS, default="total")
+        parser.add_argument("--per-view", action="store_true", help="One row per view and fingerprint.")
+        parser.add_argument("--view", help="Only views whose dotted path contains this.")
+        parser.add_argument("--table", action="append", default=[], help="Only statements on this table (repeatable).")
+        parser.add_argument("--width", type=int, default=160, help="Truncate statements to this many characters.")
+        parser.add_argument("--reset", action="store_true", help="Clear the statistics after reporting.")
+
+    def handle(self, *args, **options):
+        sqlstats.stats.flush()
+        rows = {}
+        for (view, sql), entry in sqlstats.collect().items():
+            if options["view"] and options["view"] not in view:
+                continue
+            if options["table"] and not any(f'"{table}"' in sql for table in options["table"]):
+                continue
+            key = (view, sql) if options["per_view"] else sql
+            row = rows.setdefault(
+                key, {"view": view, "sql": sql, "count": 0, "total_ms": 0.0, "buckets": [0] * (len(sqlstats.BUCKETS) + 1), "views": set()}
+            )
+            row["count"] += entry["count"]
+            row["total_ms"] += entry["total_ms"]
+            row["buckets"] = [a + b for a, b in zip(row["buckets"], entry["buckets"])]
+            row["views"].add(view)
+
+        if not rows:
+            self.stdout.write("No SQL statistics recorded; is SQL_STATS_ENABLED set?")
+            return
+        for row in rows.values():
+            row["p95_ms"] = sqlstats.percentile(row["buckets"], 95)
+        grand_total = sum(row["total_ms"] for row in rows.values()) or 1.0
+        ranked = sorted(rows.values(), key=SORT_KEYS[options["sort"]], reverse=True)[: options["top"]]
+
+        self.stdout.write(f"{len(rows)} fingerprints, {grand_total:,.0f} ms of database time\n")
+        for rank, row in enumerate(ranked, 1):
+            p95 = f"<={row['p95_ms']}" if row["p95_ms"] is not None else f">{sqlstats.BUCKETS[-1]}"
+            views = row["view"] if options["per_view"] else ", ".join(sorted(row["views"]))
+            self.stdout.write(
+                f"{rank:>3}. [{sqlstats.fingerprint_id(row['sql'])}] {row['total_ms'] / grand_total:6.1%} of time  "
+                f"{row['count']:>8} calls  {row['total_ms']:>10,.1f} ms total  "
+                f"{row['total_ms'] / row['count']:>8.2f} ms mean  p95 {p95} ms"
+            )
+            self.stdout.write(f"     views: {views}")
+            sql = row["sql"]
+            self.stdout.write(f"     {sql if len(sql) <= options['width'] else sql[: options['width']] + '...'}")
+
+        if options["reset"]:
+            sqlstats.request_reset()
+            self.stdout.write(self.style.SUCCESS("Statistics cleared."))
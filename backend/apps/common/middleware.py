@@ -0,0 +1,234 @@
+import gzip
+import hashlib
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.signing import BadSignature
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+from .routers import _state, RoutingState, wants_primary
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Cache backends whose entries other processes (or nodes) can't see
+PROCESS_LOCAL_CACHES = ("LocMemCache", "DummyCache", "FileBasedCache")
+
+
+def _on_loop(hook):
+    async def run(*args):
+        return hook(*args)
+
+    return run
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively in both handler chains: ``call``
+    under WSGI and ``acall`` under ASGI, so an async view is not pushed onto a
+    thread by a sync-only middleware in front of it. ``process_view`` hooks
+    must not block; in an async chain they run on the event loop instead of
+    going through ``sync_to_async``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            if hasattr(self, "process_view"):
+                self.process_view = _on_loop(self.process_view)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.acall(request)
+        return self.call(request)
+
+    def call(self, request):
+        return self.get_response(request)
+
+    async def acall(self, request):
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware(HybridMiddleware):
+    """
+    Lets safe requests read from replicas. Unsafe requests, views marked with
+    ``primary_db`` and clients that wrote within the last
+    ``REPLICA_PIN_SECONDS`` read from the primary, so a passenger always sees the
+    trip they just requested.
+
+    A client is pinned through a signed cookie and, for token-authenticated
+    API clients that don't send cookies, a cache entry keyed by a hash of the
+    ``Authorization`` header. That entry has to reach every process, so
+    replicas are only used with a shared cache (``CACHE_URL``); with a
+    per-process one every read goes to the primary.
+    """
+
+    _warned = False
+
+    def enabled(self):
+        if not settings.DATABASE_REPLICAS:
+            return False
+        if type(caches["default"]).__name__ in PROCESS_LOCAL_CACHES:
+            if not ReplicaRoutingMiddleware._warned:
+                ReplicaRoutingMiddleware._warned = True
+                logger.warning("DATABASE_REPLICAS are ignored: replica pins need a shared cache (set CACHE_URL)")
+            return False
+        return True
+
+    def call(self, request):
+        if not self.enabled():
+            return self.get_response(request)
+
+        pinned = request.method in SAFE_METHODS and self.is_pinned(request)
+        state = RoutingState(request.method in SAFE_METHODS and not pinned, pinned)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            self.pin(request, response)
+        return response
+
+    async def acall(self, request):
+        if not self.enabled():
+            return await self.get_response(request)
+
+        pinned = request.method in SAFE_METHODS and await sync_to_async(self.is_pinned)(request)
+        state = RoutingState(request.method in SAFE_METHODS and not pinned, pinned)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            await sync_to_async(self.pin)(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        if state is not None and wants_primary(view_func):
+            state.replicas_allowed = False
+
+    def cache_key(self, request):
+        authorization = request.headers.get("Authorization")
+        if authorization:
+            return "replica-pin:" + hashlib.sha256(authorization.encode()).hexdigest()
+        return None
+
+    def is_pinned(self, request):
+        cookie = settings.REPLICA_PIN_COOKIE
+        try:
+            if request.get_signed_cookie(cookie, None, salt=cookie, max_age=settings.REPLICA_PIN_SECONDS):
+                return True
+        except BadSignature:
+            pass
+        key = self.cache_key(request)
+        return bool(key and cache.get(key))
+
+    def pin(self, request, response):
+        seconds = settings.REPLICA_PIN_SECONDS
+        response.set_signed_cookie(
+            settings.REPLICA_PIN_COOKIE,
+            "1",
+            salt=settings.REPLICA_PIN_COOKIE,
+            max_age=seconds,
+            httponly=True,
+            samesite="Lax",
+        )
+        key = self.cache_key(request)
+        if key:
+            cache.set(key, True, seconds)
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` for an Accept-Encoding header; refused codings have q=0."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """
+    Brotli or gzip for text and JSON responses of at least
+    ``COMPRESSION_MIN_SIZE`` bytes, whichever the client prefers (brotli on a
+    tie, and only when the ``brotli`` package is installed). Streaming
+    responses such as media files are left alone.
+
+    Compressed sizes leak whether reflected input matches a secret in the same
+    body (BREACH), so responses that may carry one go out as they are: those
+    under ``COMPRESSION_EXCLUDED_PATHS`` (token endpoints, the admin), those
+    that set cookies and those that rendered the CSRF token.
+    """
+
+    def call(self, request):
+        return self.compress(request, self.get_response(request))
+
+    async def acall(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or len(response.content) < settings.COMPRESSION_MIN_SIZE
+            or not response.get("Content-Type", "").startswith(settings.COMPRESSION_CONTENT_TYPES)
+            or not self.secret_free(request, response)
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = self.choose(accepted_encodings(request.headers.get("Accept-Encoding")))
+        if coding is None:
+            return response
+        if coding == "br":
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            compressed = gzip.compress(response.content, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = coding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            # The compressed body is no longer byte-identical to the original
+            response["ETag"] = "W/" + etag
+        return response
+
+    def secret_free(self, request, response):
+        return not (
+            request.path.startswith(settings.COMPRESSION_EXCLUDED_PATHS)
+            or response.cookies
+            # Set by django.middleware.csrf.get_token()
+            or "CSRF_COOKIE_NEEDS_UPDATE" in request.META
+        )
+
+    def choose(self, accepted):
+        candidates = [("br", 2), ("gzip", 1)] if brotli is not None else [("gzip", 1)]
+        wildcard = accepted.get("*", 0)
+        best = max(candidates, key=lambda c: (accepted.get(c[0], wildcard), c[1]))
+        return best[0] if accepted.get(best[0], wildcard) > 0 else None
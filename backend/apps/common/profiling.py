@@ -0,0 +1,312 @@
+"""
+Opt-in request instrumentation, enabled with ``PROFILING_ENABLED``.
+
+A sampled request records how long it spent in each phase: authentication,
+permission checks, SQL (queryset evaluation), serializer ``.data``
+(``to_representation``) and rendering. Phases are exclusive, so SQL run while
+serializing counts as ``db`` only, and time outside them is ``other``. Timings
+go into per-view histograms, exported in the Prometheus text format by
+``/internal/metrics``, and into a ``Server-Timing`` header. A further sample of
+requests runs under cProfile, and the profiles of those slower than
+``PROFILING_SLOW_MS`` are kept for ``/internal/profiles``. Under ASGI, where
+requests interleave on one thread, only the phases are recorded.
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import io
+import pstats
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .middleware import HybridMiddleware
+
+PHASES = ("auth", "permissions", "db", "serialize", "render", "other")
+
+# Seconds, as Prometheus expects
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Phase timings of one request. Entering a phase pauses the enclosing one."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self._stack = []
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self.phases[parent[0]] += now - parent[1]
+        self._stack.append([name, now])
+
+    def exit(self):
+        now = time.perf_counter()
+        name, started = self._stack.pop()
+        self.phases[name] += now - started
+        if self._stack:
+            self._stack[-1][1] = now
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        self.phases["other"] = max(0.0, self.total - sum(self.phases.values()))
+        return self
+
+    def server_timing(self):
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items() if seconds]
+        parts.append(f"total;dur={self.total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def _timed(name, func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        # Nested calls (a serializer's fields, a list's items) stay in the outer phase
+        if profile is None or (profile._stack and profile._stack[-1][0] == name):
+            return func(*args, **kwargs)
+        profile.enter(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.exit()
+
+    wrapper.profiled = True
+    return wrapper
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time a block as ``name`` on the current request's profile, if it has one."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def _hooks():
+    from rest_framework.response import Response
+    from rest_framework.serializers import ListSerializer, Serializer
+    from rest_framework.views import APIView
+
+    # (class, attribute, phase); properties are wrapped through their getter
+    return [
+        (APIView, "perform_authentication", "auth"),
+        (APIView, "check_permissions", "permissions"),
+        (APIView, "check_object_permissions", "permissions"),
+        (Serializer, "data", "serialize"),
+        (ListSerializer, "data", "serialize"),
+        (Response, "rendered_content", "render"),
+    ]
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """Wrap the DRF methods that delimit phases. Runs once, on the first profiled request."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        for cls, attr, phase in _hooks():
+            current = cls.__dict__[attr]
+            if isinstance(current, property):
+                setattr(cls, attr, property(_timed(phase, current.fget)))
+            else:
+                setattr(cls, attr, _timed(phase, current))
+        _installed = True
+
+
+def _count_sql(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    profile.queries += 1
+    profile.enter("db")
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.exit()
+
+
+def install_sql_counter(connection, **kwargs):
+    """
+    ``connection_created`` receiver. A wrapper on every connection rather than
+    one per request, so queries run on another thread (the async ORM's) count
+    too: the profile follows the request's context there.
+    """
+    if _count_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _count_sql)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-view request and phase histograms of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = {}
+        self.phases = {}
+        self.queries = {}
+
+    def record(self, view, profile):
+        with self._lock:
+            self.requests.setdefault(view, Histogram()).observe(profile.total)
+            for phase, seconds in profile.phases.items():
+                self.phases.setdefault((view, phase), Histogram()).observe(seconds)
+            self.queries[view] = self.queries.get(view, 0) + profile.queries
+
+    def exposition(self):
+        """The metrics in the Prometheus text format."""
+        out = io.StringIO()
+        with self._lock:
+            _write_histograms(
+                out, "http_request_duration_seconds", "Request duration by view.",
+                {(("view", view),): h for view, h in self.requests.items()},
+            )
+            _write_histograms(
+                out, "http_request_phase_seconds", "Time spent per request phase by view.",
+                {(("view", view), ("phase", phase)): h for (view, phase), h in self.phases.items()},
+            )
+            out.write("# HELP http_request_queries_total SQL queries run by view.\n")
+            out.write("# TYPE http_request_queries_total counter\n")
+            for view, count in sorted(self.queries.items()):
+                out.write(f"http_request_queries_total{_labels((('view', view),))} {count}\n")
+        return out.getvalue()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _write_histograms(out, name, help_text, histograms):
+    out.write(f"# HELP {name} {help_text}\n# TYPE {name} histogram\n")
+    for labels, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+            cumulative += count
+            out.write(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}\n")
+        out.write(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}\n")
+        out.write(f"{name}_count{_labels(labels)} {histogram.count}\n")
+
+
+metrics = Metrics()
+captures = deque()
+
+
+def capture(view, request, profile, profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(40)
+    captures.append(
+        {
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "duration_ms": round(profile.total * 1000, 2),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in profile.phases.items()},
+            "captured_at": time.time(),
+            "profile": stream.getvalue(),
+        }
+    )
+    while len(captures) > settings.PROFILING_MAX_CAPTURES:
+        captures.popleft()
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match._func_path if match is not None else "unmatched"
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Times a ``PROFILING_SAMPLE_RATE`` share of requests; place it first so the
+    total covers the other middleware. A no-op unless ``PROFILING_ENABLED``.
+    """
+
+    def sampled(self):
+        return settings.PROFILING_ENABLED and random.random() < settings.PROFILING_SAMPLE_RATE
+
+    def call(self, request):
+        if not self.sampled():
+            return self.get_response(request)
+        install()
+
+        profile = RequestProfile()
+        profiler = None
+        if random.random() < settings.PROFILING_CPROFILE_RATE:
+            profiler = cProfile.Profile()
+        token = _current.set(profile)
+        try:
+            if profiler is not None:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, profiler)
+
+    async def acall(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        install()
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, None)
+
+    def finish(self, request, response, profile, profiler):
+        profile.finish()
+        view = view_name(request)
+        metrics.record(view, profile)
+        if profiler is not None and profile.total * 1000 >= settings.PROFILING_SLOW_MS:
+            capture(view, request, profile, profiler)
+        if settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = profile.server_timing()
+        return response
@@ -0,0 +1,174 @@
+"""
+Sparse fieldsets: ``?fields=id,status,route.pickup`` and
+``?exclude=notes_for_driver,route.drivers`` on list and detail endpoints.
+
+``ProjectedSerializerMixin`` drops the unrequested fields from the output, and
+``ProjectionMixin`` derives the queryset from the remaining fields: only the
+columns, ``select_related`` joins and prefetches those fields read are kept.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def parse_fields(value):
+    """``"id,route.pickup.name"`` -> ``{"id": {}, "route": {"pickup": {"name": {}}}}``"""
+    if not value:
+        return None
+    tree = {}
+    for path in value.split(","):
+        node = tree
+        for part in path.strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree or None
+
+
+class ProjectedSerializerMixin:
+    """
+    Accepts ``fields`` and ``exclude`` trees (see ``parse_fields``). Nested
+    serializers that use the mixin are projected with the matching subtree.
+
+    ``projection_sources`` maps ``SerializerMethodField`` names and other
+    computed fields to the model paths they read, e.g.
+    ``{"passenger": ["passenger__first_name", "passenger__last_name"]}``, so
+    the queryset can be projected around them.
+    """
+
+    projection_sources = {}
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        self._projection = (fields, exclude)
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        include, exclude = self._projection
+        if include:
+            unknown = set(include) - set(fields)
+            if unknown:
+                raise serializers.ValidationError({"fields": [f"Unknown field(s): {', '.join(sorted(unknown))}"]})
+            fields = {name: field for name, field in fields.items() if name in include}
+        for name, subtree in (exclude or {}).items():
+            if not subtree:
+                fields.pop(name, None)
+        for name, field in fields.items():
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if isinstance(nested, ProjectedSerializerMixin):
+                nested._projection = ((include or {}).get(name) or None, (exclude or {}).get(name) or None)
+        return fields
+
+
+class QueryPlan:
+    def __init__(self):
+        self.only = set()
+        self.select = set()
+        self.prefetch = {}
+        # Relation paths ("" for the root model) whose whole row is needed
+        self.whole = set()
+
+    def apply(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.select:
+            queryset = queryset.select_related(*sorted(self.select))
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch.values())
+        if "" not in self.whole:
+            only = {
+                path
+                for path in self.only
+                if not any(path.startswith(prefix + "__") for prefix in self.whole)
+            }
+            queryset = queryset.only(*sorted(only))
+        return queryset
+
+
+def _walk(plan, model, attrs, prefix, field=None):
+    relation = prefix[:-2]
+    if not attrs:
+        plan.whole.add(relation)
+        return
+    name = model._meta.pk.name if attrs[0] == "pk" else attrs[0]
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # A property or method such as get_full_name reads the whole row
+        plan.whole.add(relation)
+        return
+
+    path = prefix + name
+    if model_field.many_to_many or model_field.one_to_many:
+        if isinstance(field, ManyRelatedField) and isinstance(field.child_relation, PrimaryKeyRelatedField):
+            related_pk = model_field.related_model._meta.pk.name
+            plan.prefetch[path] = Prefetch(path, queryset=model_field.related_model.objects.only(related_pk))
+        else:
+            plan.prefetch.setdefault(path, path)
+        return
+    if not model_field.is_relation:
+        plan.only.add(path)
+        return
+
+    if model_field.concrete:
+        plan.only.add(path)
+    if len(attrs) == 1 and not isinstance(field, serializers.BaseSerializer):
+        if not model_field.concrete:
+            plan.select.add(path)
+            plan.whole.add(path)
+        # A primary key field only needs the foreign key column
+        return
+    plan.select.add(path)
+    related = model_field.related_model
+    if len(attrs) > 1:
+        _walk(plan, related, attrs[1:], path + "__", field)
+    else:
+        plan_serializer(field, related, path + "__", plan)
+
+
+def plan_serializer(serializer, model, prefix="", plan=None):
+    """The columns, joins and prefetches needed to serialize ``model`` rows."""
+    plan = plan or QueryPlan()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        sources = getattr(serializer, "projection_sources", {}).get(name)
+        if sources is not None:
+            for source in sources:
+                _walk(plan, model, source.split("__"), prefix)
+        elif field.source == "*" and isinstance(field, serializers.BaseSerializer):
+            plan_serializer(field, model, prefix, plan)
+        else:
+            _walk(plan, model, field.source_attrs, prefix, field)
+    return plan
+
+
+class ProjectionMixin:
+    """
+    For generic views: passes ``?fields=``/``?exclude=`` to the serializer on
+    safe requests and trims the filtered queryset to what the projected
+    serializer reads. Querysets are projected even without parameters, which also
+    replaces hand-written ``select_related`` calls with the derived joins.
+    """
+
+    def projection(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None, None
+        params = self.request.query_params
+        return parse_fields(params.get("fields")), parse_fields(params.get("exclude"))
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), ProjectedSerializerMixin):
+            include, exclude = self.projection()
+            kwargs.setdefault("fields", include)
+            kwargs.setdefault("exclude", exclude)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not isinstance(queryset, QuerySet) or self.request.method not in SAFE_METHODS:
+            return queryset
+        return plan_serializer(self.get_serializer(), queryset.model).apply(queryset)
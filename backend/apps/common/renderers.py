@@ -0,0 +1,77 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+LINE_SEPARATORS = ((b"\xe2\x80\xa8", b"\\u2028"), (b"\xe2\x80\xa9", b"\\u2029"))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when it is installed. Compact UTF-8 output
+    is encoded straight to bytes; anything orjson doesn't handle natively
+    (datetimes, Decimals, lazy strings, querysets) goes through DRF's encoder so
+    the output matches the stock renderer. Indented output (the browsable API)
+    and ``UNICODE_JSON = False`` use the stock renderer.
+    """
+
+    def __init__(self):
+        self._default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        renderer_context = renderer_context or {}
+        if orjson is None or self.ensure_ascii or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        for raw, escaped in LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
+
+
+class EnvelopeJSONRenderer(FastJSONRenderer):
+    """
+    Wraps successful payloads as ``{"status_code": ..., <envelope_key>: data}``
+    and encodes the result once. Payloads carrying an ``error`` key are
+    rendered as they are.
+    """
+
+    envelope_key = "data"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get("response")
+        if isinstance(data, dict) and data.get("error") is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        envelope = {
+            "status_code": response.status_code if response is not None else None,
+            self.envelope_key: data,
+        }
+        return super().render(envelope, accepted_media_type, renderer_context)
+
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """Renders an already formatted Prometheus text exposition, and errors as plain text."""
+
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = f"{data.get('detail', data)}\n"
+        return data.encode(self.charset)
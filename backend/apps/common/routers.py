@@ -0,0 +1,160 @@
+"""
+Read-replica routing.
+
+Writes always go to ``default``. Reads go to one of ``DATABASE_REPLICAS`` only
+while ``ReplicaRoutingMiddleware`` has marked the current request as a safe,
+unpinned read (or inside ``use_replicas()``); everywhere else, including
+management commands and open transactions, reads stay on ``default``.
+"""
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = "default"
+
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RoutingState:
+    """
+    Per-request routing decision. ``pinned`` marks a client that wrote recently
+    and must see its writes; ``wrote`` is set by the router on any write.
+    """
+
+    def __init__(self, replicas_allowed, pinned=False):
+        self.replicas_allowed = replicas_allowed
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def current_state():
+    return _state.get()
+
+
+@contextmanager
+def routing(replicas_allowed):
+    token = _state.set(RoutingState(replicas_allowed))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def use_primary():
+    """Send every read in the block to ``default``."""
+    return routing(False)
+
+
+def use_replicas():
+    """Allow replica reads in the block, e.g. for reports run outside a request."""
+    return routing(True)
+
+
+def primary_db(view):
+    """
+    Opt a view out of replica reads, for views that must see their own or other
+    clients' latest writes. Works on function views and on view classes.
+    """
+    if isinstance(view, type):
+        view.use_primary_db = True
+        return view
+
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        return view(*args, **kwargs)
+
+    wrapped.use_primary_db = True
+    return wrapped
+
+
+def wants_primary(view_func):
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    return getattr(view_func, "use_primary_db", False) or getattr(view_class, "use_primary_db", False)
+
+
+class ReplicaHealth:
+    """
+    Replication lag per replica, measured at most once every
+    ``REPLICA_LAG_CHECK_INTERVAL`` seconds. A replica that cannot be reached is
+    treated as infinitely behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def reset(self):
+        with self._lock:
+            self._checked.clear()
+
+    def measure(self, alias):
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            return 0.0
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                return float(cursor.fetchone()[0])
+        except DatabaseError:
+            logger.warning("Replica %s is unreachable", alias, exc_info=True)
+            return float("inf")
+
+    def lag(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(alias)
+        if checked and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        lag = self.measure(alias)
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica %s is %.1fs behind, reading from %s", alias, lag, PRIMARY)
+        with self._lock:
+            self._checked[alias] = (now, lag)
+        return lag
+
+    def healthy(self, aliases):
+        return [alias for alias in aliases if self.lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS]
+
+
+health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replicas_allowed or state.wrote:
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        replicas = health.healthy(settings.DATABASE_REPLICAS)
+        return random.choice(replicas) if replicas else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Reads later in the same request must see this write
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
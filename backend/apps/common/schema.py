@@ -0,0 +1,112 @@
+"""
+The OpenAPI schema, generated ahead of time instead of per request.
+
+``build_schema`` writes the schema to ``SCHEMA_ARTIFACT`` (committed, and
+checked against the code by a test) plus a gzip copy next to it for reverse
+proxies. ``serve_schema`` loads the artifact once per process and serves it
+from memory, precompressed, with an ETag made of the API version and a
+content hash. Without an artifact the schema is generated on first use.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from .middleware import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "application/vnd.oai.openapi+json"
+
+
+def generate():
+    """The schema of the current code as canonical JSON bytes (needs drf-spectacular)."""
+    from drf_spectacular.generators import SchemaGenerator
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return (json.dumps(schema, indent=2, sort_keys=True, ensure_ascii=False, default=str) + "\n").encode()
+
+
+def write(path=None):
+    """Regenerate the artifact and its gzip copy. Returns the JSON bytes."""
+    path = path or settings.SCHEMA_ARTIFACT
+    content = generate()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+    return content
+
+
+class Artifact:
+    """The schema bytes, their compressed variants and ETag."""
+
+    def __init__(self, content):
+        self.variants = {"identity": content, "gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content)
+        version = json.loads(content)["info"]["version"]
+        self.tag = f"{version}-{hashlib.sha256(content).hexdigest()[:16]}"
+
+    def etag(self, coding):
+        return f'"{self.tag}"' if coding == "identity" else f'"{self.tag}-{coding}"'
+
+
+_artifact = None
+_lock = threading.Lock()
+
+
+def artifact():
+    global _artifact
+    if _artifact is None:
+        with _lock:
+            if _artifact is None:
+                try:
+                    content = settings.SCHEMA_ARTIFACT.read_bytes()
+                except FileNotFoundError:
+                    logger.warning("%s is missing; run build_schema. Generating the schema now.", settings.SCHEMA_ARTIFACT)
+                    content = generate()
+                _artifact = Artifact(content)
+    return _artifact
+
+
+def reset():
+    global _artifact
+    _artifact = None
+
+
+@require_safe
+def serve_schema(request):
+    schema = artifact()
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+    coding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in schema.variants and accepted.get(candidate, accepted.get("*", 0)) > 0:
+            coding = candidate
+            break
+
+    if_none_match = request.headers.get("If-None-Match")
+    known = {schema.etag(c) for c in schema.variants}
+    if if_none_match and (
+        if_none_match.strip() == "*" or {tag.removeprefix("W/") for tag in parse_etags(if_none_match)} & known
+    ):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(schema.variants[coding], content_type=CONTENT_TYPE)
+        if coding != "identity":
+            response["Content-Encoding"] = coding
+    response["ETag"] = schema.etag(coding)
+    response["Cache-Control"] = f"public, max-age={settings.SCHEMA_CACHE_MAX_AGE}"
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
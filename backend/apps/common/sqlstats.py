@@ -0,0 +1,229 @@
+"""
+SQL statement statistics, enabled with ``SQL_STATS_ENABLED``.
+
+Every statement is reduced to a fingerprint (literals, placeholders and
+``IN``/``VALUES`` lists collapsed) and counted per view with its total time
+and a latency histogram. Each process writes its counters to the shared cache
+at most every ``SQL_STATS_FLUSH_SECONDS``, and the ``sql_report`` command
+merges them into a top-N report; with several processes that needs a shared
+``CACHE_URL``. Statements slower than ``SQL_SLOW_MS`` are logged with their
+``EXPLAIN`` output. The log gets the parameterized SQL and a plan with its
+string literals masked; parameters, which may be passwords, tokens or personal
+data, are logged at DEBUG level and only with ``DEBUG`` on.
+"""
+import contextlib
+import contextvars
+import functools
+import hashlib
+import logging
+import os
+import re
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .middleware import HybridMiddleware
+from .profiling import view_name
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds
+BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+NO_VIEW = "-"
+PROCESSES_KEY = "sqlstats:processes"
+RESET_KEY = "sqlstats:reset"
+
+_view = contextvars.ContextVar("sqlstats_view", default=NO_VIEW)
+_explaining = contextvars.ContextVar("sqlstats_explaining", default=False)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES = re.compile(r"\((?:\s*\?\s*,)*\s*\?\s*\)(?:\s*,\s*\((?:\s*\?\s*,)*\s*\?\s*\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """``sql`` with every value replaced by ``?``, so one query shape maps to one string."""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES.sub("(...), ...", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint_id(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def percentile(buckets, pct):
+    """Upper bound, in ms, of the bucket holding the ``pct`` percentile (None past the last bound)."""
+    total = sum(buckets)
+    if not total:
+        return 0
+    rank = total * pct / 100
+    seen = 0
+    for bound, count in zip(BUCKETS + (None,), buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return None
+
+
+class SQLStats:
+    """Counters of this process, keyed by ``(view, fingerprint)``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.entries = {}
+            self.started = time.time()
+            self.flushed = time.monotonic()
+
+    def record(self, view, sql, elapsed_ms):
+        shape = fingerprint(sql)
+        with self._lock:
+            entry = self.entries.get((view, shape))
+            if entry is None:
+                entry = self.entries[(view, shape)] = {"count": 0, "total_ms": 0.0, "buckets": [0] * (len(BUCKETS) + 1)}
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            for i, bound in enumerate(BUCKETS):
+                if elapsed_ms <= bound:
+                    break
+            else:
+                i = len(BUCKETS)
+            entry["buckets"][i] += 1
+            due = time.monotonic() - self.flushed >= settings.SQL_STATS_FLUSH_SECONDS
+        if due:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "entries": [dict(entry, view=view, sql=sql) for (view, sql), entry in self.entries.items()],
+            }
+
+    def flush(self):
+        """Write this process's counters to the shared cache, dropping them if a reset was requested."""
+        reset_at = cache.get(RESET_KEY)
+        if reset_at and reset_at > self.started:
+            self.reset()
+        self.flushed = time.monotonic()
+        key = f"sqlstats:process:{self.process}"
+        cache.set(key, self.snapshot(), settings.SQL_STATS_RETENTION)
+        processes = cache.get(PROCESSES_KEY) or set()
+        if key not in processes:
+            cache.set(PROCESSES_KEY, processes | {key}, None)
+
+
+stats = SQLStats()
+
+
+def collect():
+    """Counters of every process that flushed within ``SQL_STATS_RETENTION``, merged per view and fingerprint."""
+    merged = {}
+    keys = cache.get(PROCESSES_KEY) or set()
+    for snapshot in cache.get_many(list(keys)).values():
+        for entry in snapshot["entries"]:
+            total = merged.setdefault(
+                (entry["view"], entry["sql"]), {"count": 0, "total_ms": 0.0, "buckets": [0] * (len(BUCKETS) + 1)}
+            )
+            total["count"] += entry["count"]
+            total["total_ms"] += entry["total_ms"]
+            total["buckets"] = [a + b for a, b in zip(total["buckets"], entry["buckets"])]
+    return merged
+
+
+def request_reset():
+    """Ask every process to drop its counters at its next flush."""
+    cache.set(RESET_KEY, time.time(), None)
+    cache.delete_many(list(cache.get(PROCESSES_KEY) or ()))
+    stats.reset()
+
+
+def redact(plan):
+    """``plan`` with its string literals (the values PostgreSQL prints in filters) masked."""
+    return plan and _STRING.sub("?", plan)
+
+
+def explain(connection, sql, params):
+    """The query plan of a ``SELECT``, or None."""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return None
+    token = _explaining.set(True)
+    try:
+        # In a transaction, a savepoint, so a failing EXPLAIN can't break it
+        guard = transaction.atomic(using=connection.alias) if connection.in_atomic_block else contextlib.nullcontext()
+        with guard, connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            return "\n".join(" ".join(str(value) for value in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"(EXPLAIN failed: {exc})"
+    finally:
+        _explaining.reset(token)
+
+
+def record(execute, sql, params, many, context):
+    """The execute wrapper installed on every connection."""
+    if not settings.SQL_STATS_ENABLED or _explaining.get():
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    view = _view.get()
+    stats.record(view, sql, elapsed_ms)
+    if elapsed_ms >= settings.SQL_SLOW_MS and not many:
+        connection = context["connection"]
+        logger.warning(
+            "Slow query (%.1f ms, %s, %s): %s\nPlan:\n%s",
+            elapsed_ms, view, connection.alias, sql, redact(explain(connection, sql, params)),
+        )
+        if settings.DEBUG:
+            logger.debug("Slow query params: %r", params)
+    return result
+
+
+def install(connection, **kwargs):
+    """``connection_created`` receiver. First in the list, so ``execute_wrapper()`` blocks don't pop it."""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record)
+
+
+class SQLStatsMiddleware(HybridMiddleware):
+    """Labels the statements of a request with its view."""
+
+    def call(self, request):
+        if not settings.SQL_STATS_ENABLED:
+            return self.get_response(request)
+        token = _view.set(NO_VIEW)
+        try:
+            return self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    async def acall(self, request):
+        if not settings.SQL_STATS_ENABLED:
+            return await self.get_response(request)
+        token = _view.set(NO_VIEW)
+        try:
+            return await self.get_response(request)
+        finally:
+            _view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.SQL_STATS_ENABLED:
+            _view.set(view_name(request))
@@ -0,0 +1,42 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentHashStorage(FileSystemStorage):
+    """
+    Saves every file as ``<upload_to>/<sha256><ext>``. Identical uploads share
+    one file on disk, and a name never points at different bytes, which makes
+    media URLs safe to cache forever.
+
+    Names under ``preserved_prefixes`` (derived files such as thumbnails, whose
+    names already embed the source hash) are stored as given.
+    """
+
+    preserved_prefixes = ("thumbs/",)
+
+    def save(self, name, content, max_length=None):
+        name = (name or getattr(content, "name", "")).replace("\\", "/")
+        if name.startswith(self.preserved_prefixes):
+            return super().save(name, content, max_length)
+
+        digest = getattr(content, "content_hash", None) or file_digest(content)
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        name = posixpath.join(directory, f"{digest}{extension}")
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
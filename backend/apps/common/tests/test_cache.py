@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.common.cache import LocalLRU, ReadCache, SingleFlight, stats
+from apps.profiles.caches import profile_cache
+from apps.profiles.models import Profile
+from apps.profiles.views import ProfileDetailAPIView
+from apps.users.factories import DriverFactory, UserFactory
+from apps.vehicle.caches import driver_trips_cache
+from apps.vehicle.factories import TripFactory
+from apps.vehicle.models import Trip
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear()
+    stats.reset()
+    yield
+    cache.clear()
+
+
+def test_local_lru_evicts_oldest_and_expires():
+    lru = LocalLRU(max_entries=2)
+    lru.set("a", 1, 60)
+    lru.set("b", 2, 60)
+    lru.get("a")
+    lru.set("c", 3, 60)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    lru.set("d", 4, -1)
+    assert lru.get("d", "missing") == "missing"
+
+
+def test_single_flight_runs_once_for_concurrent_callers():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    def worker():
+        results.append(flight.do("key", slow))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * 7
+    assert {value for value, _ in results} == {"value"}
+
+
+def test_burst_of_misses_computes_once():
+    read_cache = ReadCache("test-burst")
+    calls = []
+    barrier = threading.Barrier(10)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"answer": 42}
+
+    def worker():
+        barrier.wait()
+        assert read_cache.get_or_set(1, "key", compute) == {"answer": 42}
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    counters = stats.as_dict()["test-burst"]
+    assert counters["misses"] + counters["local_hits"] + counters["shared_hits"] == 10
+    assert counters["coalesced"] == counters["misses"] - 1
+
+    read_cache.invalidate(1)
+    read_cache.get_or_set(1, "key", compute)
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_profile_detail_is_cached_until_the_user_changes(django_capture_on_commit_callbacks):
+    user = UserFactory(first_name="Mina")
+    # UserFactory mutes the signal that creates profiles
+    Profile.objects.create(user=user)
+    view = ProfileDetailAPIView.as_view()
+
+    def get():
+        request = APIRequestFactory().get("/api/v1/profiles/me/")
+        force_authenticate(request, user=user)
+        response = view(request)
+        response.render()
+        return response
+
+    assert get().data["first_name"] == "Mina"
+    with CaptureQueriesContext(connection) as queries:
+        assert get().data["first_name"] == "Mina"
+    assert len(queries) == 0
+
+    with django_capture_on_commit_callbacks(execute=True):
+        user.first_name = "Laila"
+        user.save()
+    assert get().data["first_name"] == "Laila"
+    assert stats.as_dict()[profile_cache.name]["invalidations"] >= 1
+
+
+@pytest.mark.django_db
+def test_errors_are_not_cached():
+    read_cache = ReadCache("test-errors")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 404, {}
+
+    for _ in range(2):
+        read_cache.get_or_set(1, "key", compute, cache_if=lambda result: result[0] == 200)
+    assert len(calls) == 2
+
+
+@pytest.mark.django_db
+def test_moving_a_trip_invalidates_both_drivers(django_capture_on_commit_callbacks):
+    first, second = DriverFactory(), DriverFactory()
+    trip = TripFactory(driver=first)
+    versions = {driver.pk: driver_trips_cache.version(driver.pk) for driver in (first, second)}
+
+    # Loaded fresh, as the accept and reassign views do
+    trip = Trip.objects.get(pk=trip.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        trip.driver = second
+        trip.save()
+    assert all(driver_trips_cache.version(pk) != version for pk, version in versions.items())
+
+    # Also when the driver was deferred on load
+    versions = {driver.pk: driver_trips_cache.version(driver.pk) for driver in (first, second)}
+    trip = Trip.objects.only("pkid").get(pk=trip.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        trip.driver = first
+        trip.save()
+    assert all(driver_trips_cache.version(pk) != version for pk, version in versions.items())
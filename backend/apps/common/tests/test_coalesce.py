@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+from django.db import connection
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIRequestFactory
+
+from apps.common.routers import routing
+from apps.vehicle.models import Location, Route
+from apps.vehicle.views import RouteViewSet
+
+
+@pytest.fixture
+def routes():
+    kabul = Location.objects.create(name="Kabul")
+    for name in ("Herat", "Bamyan", "Kandahar"):
+        Route.objects.create(pickup=kabul, drop=Location.objects.create(name=name), price_af=500)
+
+
+def count_queries(func):
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        result = func()
+    return result, queries
+
+
+@pytest.mark.django_db(transaction=True)
+def test_simultaneous_route_lists_share_one_query_set(routes, monkeypatch):
+    view = RouteViewSet.as_view({"get": "list"})
+    factory = APIRequestFactory()
+    single, single_queries = count_queries(lambda: view(factory.get("/api/v1/vehicle/vehicle/routes/")))
+    assert single.status_code == 200 and len(single_queries) > 0
+
+    # Keep the leader busy long enough for every follower to arrive
+    original_list = RouteViewSet.list
+
+    def slow_list(self, request, *args, **kwargs):
+        time.sleep(0.2)
+        return original_list(self, request, *args, **kwargs)
+
+    monkeypatch.setattr(RouteViewSet, "list", slow_list)
+    clients = 12
+    barrier = threading.Barrier(clients)
+    responses, queries = [], []
+    lock = threading.Lock()
+
+    def client():
+        barrier.wait()
+        try:
+            response, executed = count_queries(lambda: view(factory.get("/api/v1/vehicle/vehicle/routes/")))
+            with lock:
+                responses.append(response)
+                queries.extend(executed)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(responses) == clients
+    assert len(queries) == len(single_queries)
+    assert sum(not response.coalesced for response in responses) == 1
+    assert {response.content for response in responses} == {single.content}
+    assert len({id(response) for response in responses}) == clients
+
+
+@pytest.mark.django_db
+def test_writes_are_not_coalesced(routes):
+    view = RouteViewSet.as_view({"post": "create"})
+    response = view(APIRequestFactory().post("/api/v1/vehicle/vehicle/routes/", {}, format="json"))
+    assert not getattr(response, "coalesced", False)
+
+
+def test_pinned_clients_are_not_coalesced():
+    view = RouteViewSet(action_map={"get": "list"})
+    request = APIRequestFactory().get("/api/v1/vehicle/vehicle/routes/")
+    assert view.should_coalesce(request)
+    with routing(False) as state:
+        state.pinned = True
+        assert not view.should_coalesce(request)
+
+
+def test_only_public_views_share_across_credentials():
+    factory = APIRequestFactory()
+
+    def keys(view_class):
+        view = view_class(action_map={"get": "list"})
+        return {
+            view.coalesce_key(factory.get("/api/v1/vehicle/vehicle/routes/", HTTP_AUTHORIZATION=f"Bearer {token}"))
+            for token in ("mina", "laila")
+        }
+
+    class PrivateRoutes(RouteViewSet):
+        coalesce_public = False
+
+    class AuthenticatedRoutes(RouteViewSet):
+        def get_permissions(self):
+            return [IsAuthenticated()]
+
+    assert len(keys(RouteViewSet)) == 1
+    assert len(keys(PrivateRoutes)) == 2
+    # Declared public, but not everyone may read it
+    assert len(keys(AuthenticatedRoutes)) == 2
@@ -0,0 +1,114 @@
+import io
+import tracemalloc
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from PIL import Image
+
+from apps.common.storage import ContentHashStorage
+from apps.common.thumbnails import generate_thumbnail, schedule_thumbnail, thumbnail_name, thumbnail_url
+from apps.common.uploads import LimitedImageUploadHandler, UploadRejected
+
+CHUNK = 64 * 1024
+
+
+def png_bytes(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "orange").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def stream(handler, header, total_size, name="photo.png"):
+    handler.new_file("license", name, "image/png", None)
+    filler = b"\0" * CHUNK
+    sent = 0
+    for chunk in [header] + [filler] * ((total_size - len(header)) // CHUNK):
+        handler.receive_data_chunk(chunk, sent)
+        sent += len(chunk)
+    return handler.file_complete(sent)
+
+
+@pytest.fixture
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.THUMBNAIL_WORKERS = 0
+    return tmp_path
+
+
+@override_settings(MAX_UPLOAD_SIZE=32 * 1024 * 1024)
+def test_large_upload_streams_with_constant_memory():
+    handler = LimitedImageUploadHandler()
+    tracemalloc.start()
+    try:
+        uploaded = stream(handler, png_bytes(100, 100), 24 * 1024 * 1024)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert uploaded.size >= 24 * 1024 * 1024 - CHUNK
+    assert len(uploaded.content_hash) == 64
+    # Header buffer plus a couple of chunks, never the file
+    assert peak < 1024 * 1024
+    uploaded.close()
+
+
+@override_settings(MAX_UPLOAD_SIZE=1024 * 1024)
+def test_oversized_upload_is_rejected_while_streaming():
+    handler = LimitedImageUploadHandler()
+    with pytest.raises(UploadRejected):
+        stream(handler, png_bytes(10, 10), 4 * 1024 * 1024)
+    assert handler.received <= 1024 * 1024 + CHUNK
+
+
+@override_settings(MAX_UPLOAD_SIZE=1024 * 1024, MAX_IMAGE_DIMENSION=1000)
+def test_image_dimensions_are_checked_from_the_first_chunk():
+    handler = LimitedImageUploadHandler()
+    handler.new_file("license", "huge.png", "image/png", None)
+    with pytest.raises(UploadRejected):
+        handler.receive_data_chunk(png_bytes(1200, 10), 0)
+
+
+def test_content_hash_storage_deduplicates(tmp_path):
+    storage = ContentHashStorage(location=str(tmp_path))
+    first = storage.save("license/a.JPG", ContentFile(b"same bytes"))
+    second = storage.save("license/b.jpg", ContentFile(b"same bytes"))
+    other = storage.save("license/c.jpg", ContentFile(b"other bytes"))
+
+    assert first == second
+    assert first.endswith(".jpg") and first != other
+    assert len(list((tmp_path / "license").iterdir())) == 2
+
+
+def test_thumbnail_is_webp_and_bounded(media_root):
+    name = default_storage.save("license/photo.png", ContentFile(png_bytes(1600, 800)))
+    generated = generate_thumbnail(name, size=320)
+
+    assert generated == thumbnail_name(name, 320)
+    with default_storage.open(generated) as handle, Image.open(handle) as image:
+        assert image.format == "WEBP"
+        assert image.size == (320, 160)
+
+
+@pytest.mark.django_db
+def test_thumbnail_url_falls_back_to_original_until_recorded(media_root, monkeypatch):
+    from apps.vehicle.factories import VehicleFactory
+
+    name = default_storage.save("license/photo.png", ContentFile(png_bytes(50, 50)))
+    vehicle = VehicleFactory(license=name)
+    assert thumbnail_url(vehicle.license) == vehicle.license.url
+    generate_thumbnail(name)
+    # Existence comes from the row, not from the storage
+    assert thumbnail_url(vehicle.license) == vehicle.license.url
+
+    schedule_thumbnail(vehicle.license)
+    vehicle.refresh_from_db()
+    assert vehicle.license_thumbnail == thumbnail_name(name)
+    monkeypatch.setattr(default_storage, "exists", lambda name: pytest.fail("storage lookup"))
+    assert thumbnail_url(vehicle.license).endswith(".webp")
+    assert schedule_thumbnail(vehicle.license) is None
+
+    # A new license leaves the old thumbnail behind
+    vehicle.license = "license/other.png"
+    assert thumbnail_url(vehicle.license) == vehicle.license.url
@@ -0,0 +1,121 @@
+import os
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common.thumbnails import record_thumbnail, thumbnail_name
+from apps.users.factories import AdminFactory, DriverFactory
+from apps.vehicle.factories import VehicleFactory
+from apps.vehicle.models import Vehicle
+
+HASHED = "a" * 64 + ".jpg"
+CONTENT = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def media(tmp_path, settings, client):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.MEDIA_SERVE = True
+    (tmp_path / "photos").mkdir()
+    (tmp_path / "photos" / HASHED).write_bytes(CONTENT)
+    (tmp_path / "photos" / "legacy.jpg").write_bytes(CONTENT)
+    return tmp_path
+
+
+def url(name):
+    return reverse("media", kwargs={"path": name})
+
+
+def test_content_hashed_file_is_immutable(media, client):
+    response = client.get(url(f"photos/{HASHED}"))
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == CONTENT
+    assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response["Content-Length"] == str(len(CONTENT))
+    assert response["Content-Type"] == "image/jpeg"
+
+
+def test_legacy_name_gets_short_cache(media, client):
+    response = client.get(url("photos/legacy.jpg"))
+    assert "immutable" not in response["Cache-Control"]
+
+
+def test_conditional_requests_return_304(media, client):
+    response = client.get(url(f"photos/{HASHED}"))
+    assert client.get(url(f"photos/{HASHED}"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    mtime = os.stat(media / "photos" / HASHED).st_mtime
+    assert client.get(url(f"photos/{HASHED}"), HTTP_IF_MODIFIED_SINCE=http_date(mtime)).status_code == 304
+
+
+@pytest.mark.parametrize(
+    "header,start,end",
+    [("bytes=0-99", 0, 99), ("bytes=16000-", 16000, len(CONTENT) - 1), ("bytes=-10", len(CONTENT) - 10, len(CONTENT) - 1)],
+)
+def test_single_range(media, client, header, start, end):
+    response = client.get(url(f"photos/{HASHED}"), HTTP_RANGE=header)
+    assert response.status_code == 206
+    assert b"".join(response.streaming_content) == CONTENT[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range(media, client):
+    response = client.get(url(f"photos/{HASHED}"), HTTP_RANGE="bytes=999999-")
+    assert response.status_code == 416
+
+
+def test_path_traversal_is_404(media, client):
+    assert client.get(url("../../etc/passwd")).status_code == 404
+
+
+def test_accel_redirect_mode_sends_no_body(media, client):
+    with override_settings(MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/"):
+        response = client.get(url(f"photos/{HASHED}"))
+    assert response["X-Accel-Redirect"] == f"/protected-media/photos/{HASHED}"
+    assert response.content == b""
+    assert response["Cache-Control"].endswith("immutable")
+
+
+def test_private_files_and_their_thumbnails_are_not_served(media, client, settings):
+    for name in ("license", "thumbs/320/license"):
+        (media / name).mkdir(parents=True)
+        (media / name / HASHED).write_bytes(CONTENT)
+        assert client.get(url(f"{name}/{HASHED}")).status_code == 404
+    assert client.get(url(f"photos/../license/{HASHED}")).status_code == 404
+
+    settings.MEDIA_SERVE = False
+    assert client.get(url(f"photos/{HASHED}")).status_code == 404
+
+
+@pytest.mark.django_db
+def test_license_images_are_served_to_the_driver_and_admins(media, client):
+    name = f"license/{HASHED}"
+    (media / "license").mkdir()
+    (media / name).write_bytes(CONTENT)
+    vehicle = VehicleFactory(license=name)
+    license = reverse("vehicle-license", kwargs={"id": vehicle.id})
+
+    def get(user, path=license, **params):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"} if user else {}
+        return client.get(path, params, **headers)
+
+    response = get(vehicle.driver)
+    assert response.status_code == 200 and b"".join(response.streaming_content) == CONTENT
+    assert response["Cache-Control"] == "private, max-age=31536000, immutable"
+    assert get(AdminFactory()).status_code == 200
+    assert get(DriverFactory()).status_code == 403
+    assert get(None).status_code == 401
+
+    # The original until the thumbnail is recorded
+    (media / thumbnail_name(name)).parent.mkdir(parents=True)
+    (media / thumbnail_name(name)).write_bytes(b"webp")
+    assert b"".join(get(vehicle.driver, thumbnail=1).streaming_content) == CONTENT
+    record_thumbnail(Vehicle, "license", name, thumbnail_name(name))
+    assert b"".join(get(vehicle.driver, thumbnail=1).streaming_content) == b"webp"
+
+    data = get(vehicle.driver, reverse("vehicle-detail", kwargs={"id": vehicle.id})).json()
+    assert data["license"] == f"http://testserver{license}"
+    assert data["license_thumbnail"] == f"http://testserver{license}?thumbnail=1"
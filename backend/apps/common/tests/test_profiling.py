@@ -0,0 +1,76 @@
+import pytest
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common import profiling
+from apps.users.factories import AdminFactory, DriverFactory
+from apps.vehicle.models import Location, Route, Trip
+
+pytestmark = pytest.mark.django_db
+
+TRIPS = "/api/v1/vehicle/admin/trips/"
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    profiling.metrics.reset()
+    profiling.captures.clear()
+    yield
+    profiling.metrics.reset()
+    profiling.captures.clear()
+
+
+def bearer(user):
+    return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+
+@pytest.fixture
+def admin_with_trips():
+    admin = AdminFactory()
+    route = Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"), drop=Location.objects.create(name="Herat"), price_af=900
+    )
+    Trip.objects.bulk_create([Trip(passenger=admin, route=route, fare=900) for _ in range(5)])
+    return admin
+
+
+def test_disabled_by_default(client, admin_with_trips):
+    response = client.get(TRIPS, **bearer(admin_with_trips))
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
+    assert profiling.metrics.requests == {}
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_CPROFILE_RATE=1.0, PROFILING_SLOW_MS=0)
+def test_phases_histograms_and_captures(client, admin_with_trips):
+    response = client.get(TRIPS, **bearer(admin_with_trips))
+    assert response.status_code == 200
+
+    timings = dict(part.split(";dur=") for part in response["Server-Timing"].split(", "))
+    assert {"auth", "permissions", "db", "serialize", "render", "total"} <= set(timings)
+    phases = sum(float(ms) for name, ms in timings.items() if name != "total")
+    assert phases == pytest.approx(float(timings["total"]), abs=0.1)
+
+    view = "apps.vehicle.views.AdminTripListView"
+    assert profiling.metrics.requests[view].count == 1
+    assert profiling.metrics.queries[view] >= 2
+    assert profiling.captures[0]["view"] == view
+    assert "cumulative" in profiling.captures[0]["profile"]
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_CPROFILE_RATE=0.0, METRICS_TOKEN="scrape-me")
+def test_metrics_endpoint_is_protected(client, admin_with_trips):
+    client.get(TRIPS, **bearer(admin_with_trips))
+
+    assert client.get("/internal/metrics").status_code == 401
+    assert client.get("/internal/metrics", **bearer(DriverFactory())).status_code == 403
+    assert client.get("/internal/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code == 401
+
+    response = client.get("/internal/metrics", HTTP_AUTHORIZATION="Bearer scrape-me")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    assert 'http_request_duration_seconds_count{view="apps.vehicle.views.AdminTripListView"} 1' in text
+    assert 'http_request_phase_seconds_bucket{view="apps.vehicle.views.AdminTripListView",phase="db",le="+Inf"} 1' in text
+
+    assert client.get("/internal/metrics", **bearer(admin_with_trips)).status_code == 200
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.common.projection import parse_fields
+from apps.users.factories import UserFactory
+from apps.vehicle.models import Location, Route, Trip
+from apps.vehicle.views import AdminTripListView, RouteViewSet
+
+
+@pytest.fixture
+def admin():
+    return UserFactory(role="admin")
+
+
+@pytest.fixture
+def trips(admin):
+    for i in range(4):
+        route = Route.objects.create(
+            pickup=Location.objects.create(name=f"Pickup {i}"),
+            drop=Location.objects.create(name=f"Drop {i}"),
+            price_af=400 + i,
+        )
+        route.drivers.add(UserFactory(role="driver"))
+        Trip.objects.create(passenger=UserFactory(), route=route, fare=route.price_af, notes_for_driver="x" * 200)
+
+
+def get(view, user, **params):
+    request = APIRequestFactory().get("/", params)
+    force_authenticate(request, user=user)
+    with CaptureQueriesContext(connection) as queries:
+        response = view(request)
+        response.render()
+    return response, queries
+
+
+def test_parse_fields():
+    assert parse_fields("id, route.pickup.name,route.drop") == {
+        "id": {},
+        "route": {"pickup": {"name": {}}, "drop": {}},
+    }
+    assert parse_fields("") is None
+
+
+@pytest.mark.django_db
+def test_fields_trim_payload_and_joins(trips, admin):
+    view = AdminTripListView.as_view()
+    full, full_queries = get(view, admin)
+    sparse, sparse_queries = get(view, admin, fields="id,status,route.pickup")
+
+    assert sparse.status_code == 200
+    row = json.loads(sparse.content)[0]
+    assert set(row) == {"id", "status", "route"}
+    assert set(row["route"]) == {"pickup"}
+    assert len(sparse.content) < len(full.content) / 3
+
+    # No driver/vehicle prefetches and no passenger or driver joins
+    assert len(sparse_queries) == 1 < len(full_queries)
+    sql = sparse_queries[0]["sql"]
+    assert "users_user" not in sql and "notes_for_driver" not in sql
+
+
+@pytest.mark.django_db
+def test_exclude_nested_fields(trips, admin):
+    response, queries = get(AdminTripListView.as_view(), admin, exclude="route.drivers,route.vehicles,notes_for_driver")
+
+    row = json.loads(response.content)[0]
+    assert "notes_for_driver" not in row
+    assert "drivers" not in row["route"] and "pickup" in row["route"]
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_unknown_field_is_rejected(trips, admin):
+    response, _ = get(AdminTripListView.as_view(), admin, fields="id,secret")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_route_list_query_count_does_not_grow_with_rows(trips, admin):
+    view = RouteViewSet.as_view({"get": "list"})
+    _, queries = get(view, admin)
+    # Routes with pickup/drop joined, plus one prefetch each for drivers and vehicles
+    assert len(queries) == 3
+
+    response, queries = get(view, admin, fields="id,price_af")
+    assert len(queries) == 1
+    assert json.loads(response.content)[0].keys() == {"id", "price_af"}
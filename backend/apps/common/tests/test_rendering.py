@@ -0,0 +1,112 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import brotli
+import pytest
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import get_token
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from apps.common.middleware import CompressionMiddleware, accepted_encodings
+from apps.common.renderers import FastJSONRenderer
+from apps.profiles.renderers import ProfileJsonRenderers
+
+
+class FakeResponse:
+    status_code = 200
+
+
+def test_fast_renderer_matches_stock_renderer():
+    data = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "fare": Decimal("500.50"),
+        "when": datetime(2024, 5, 1, 8, 30, tzinfo=timezone.utc),
+        "name": "کابل ➜ هرات\u2028",
+        "nested": [{"count": 1, "ok": True, "none": None}],
+        "big": 2**70,
+    }
+    fast = FastJSONRenderer().render(data)
+    assert json.loads(fast) == json.loads(JSONRenderer().render(data))
+    assert b"\\u2028" in fast
+    assert json.loads(fast)["when"] == "2024-05-01T08:30:00Z"
+
+
+def test_profile_renderer_encodes_once():
+    rendered = ProfileJsonRenderers().render({"about_me": "hi"}, renderer_context={"response": FakeResponse()})
+    assert json.loads(rendered) == {"status_code": 200, "profile": {"about_me": "hi"}}
+
+    errors = ProfileJsonRenderers().render({"error": "nope"}, renderer_context={"response": FakeResponse()})
+    assert json.loads(errors) == {"error": "nope"}
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip;q=0.5, br, identity;q=0") == {"gzip": 0.5, "br": 1.0, "identity": 0.0}
+
+
+def compress(accept, body=None, content_type="application/json", path="/", view=None):
+    payload = body if body is not None else json.dumps([{"trip": i, "status": "completed"} for i in range(200)])
+
+    def respond(request):
+        if view is not None:
+            view(request)
+        return HttpResponse(payload, content_type=content_type)
+
+    middleware = CompressionMiddleware(respond)
+    request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept)
+    return middleware(request), payload.encode()
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [("gzip, deflate, br", "br"), ("gzip", "gzip"), ("br;q=0.5, gzip", "gzip"), ("gzip;q=0, *", "br")],
+)
+def test_compression_negotiation(accept, expected):
+    response, original = compress(accept)
+    assert response["Content-Encoding"] == expected
+    assert "Accept-Encoding" in response["Vary"]
+    decoded = brotli.decompress(response.content) if expected == "br" else gzip.decompress(response.content)
+    assert decoded == original
+    assert int(response["Content-Length"]) == len(response.content) < len(original)
+
+
+def test_small_and_unacceptable_responses_are_not_compressed():
+    small, _ = compress("gzip, br", body='{"ok": true}')
+    assert not small.has_header("Content-Encoding")
+
+    refused, _ = compress("identity")
+    assert not refused.has_header("Content-Encoding")
+    assert refused["Vary"] == "Accept-Encoding"
+
+    image, _ = compress("gzip", body="x" * 5000, content_type="image/png")
+    assert not image.has_header("Content-Encoding")
+
+
+def test_compression_weakens_etag():
+    response = JsonResponse({"rows": ["x" * 2000]})
+    response["ETag"] = '"abc"'
+    middleware = CompressionMiddleware(lambda request: response)
+    result = middleware(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"))
+    assert result["ETag"] == 'W/"abc"'
+
+
+def test_responses_that_may_carry_secrets_are_not_compressed():
+    token, _ = compress("gzip, br", path="/api/v1/auth/token/")
+    assert not token.has_header("Content-Encoding")
+
+    csrf, _ = compress("gzip, br", path="/api/v1/profiles/", view=get_token)
+    assert not csrf.has_header("Content-Encoding")
+
+    def with_cookie(request):
+        response = JsonResponse({"rows": ["x" * 2000]})
+        response.set_cookie("sessionid", "secret")
+        return response
+
+    cookie = CompressionMiddleware(with_cookie)(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip"))
+    assert not cookie.has_header("Content-Encoding")
+
+    plain, _ = compress("gzip", path="/api/v1/profiles/")
+    assert plain["Content-Encoding"] == "gzip"
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from django.db import transaction
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+
+from apps.common.middleware import ReplicaRoutingMiddleware
+from apps.common.routers import ReplicaRouter, health, primary_db, use_primary, use_replicas
+from apps.vehicle.models import Location
+
+router = ReplicaRouter()
+
+
+@pytest.fixture(autouse=True)
+def replicas(monkeypatch, settings):
+    # The single test process sees its memory cache like a shared one
+    monkeypatch.setattr("apps.common.middleware.PROCESS_LOCAL_CACHES", ())
+    settings.DATABASE_REPLICAS = ["replica"]
+    settings.REPLICA_MAX_LAG_SECONDS = 5
+    lags = {"replica": 0.0}
+    monkeypatch.setattr(health, "measure", lambda alias: lags[alias])
+    health.reset()
+    yield lags
+    health.reset()
+
+
+def reading_view(request):
+    return JsonResponse({"db": router.db_for_read(Location)})
+
+
+def writing_view(request):
+    return JsonResponse({"db": router.db_for_write(Location), "then": router.db_for_read(Location)})
+
+
+def call(view, method="get", **extra):
+    def get_response(request):
+        # Django calls process_view inside the request's routing context
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware = ReplicaRoutingMiddleware(get_response)
+    return middleware(getattr(RequestFactory(), method)("/", **extra))
+
+
+def body(response):
+    return json.loads(response.content)
+
+
+def test_reads_outside_requests_use_primary():
+    assert router.db_for_read(Location) == "default"
+    with use_replicas():
+        assert router.db_for_read(Location) == "replica"
+        with use_primary():
+            assert router.db_for_read(Location) == "default"
+
+
+def test_safe_request_reads_from_replica():
+    assert body(call(reading_view)) == {"db": "replica"}
+    assert body(call(reading_view, "post")) == {"db": "default"}
+
+
+def test_write_pins_client_to_primary(settings):
+    response = call(writing_view, "post", HTTP_AUTHORIZATION="JWT abc")
+    assert body(response) == {"db": "default", "then": "default"}
+    cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+
+    # Browser clients are pinned by the cookie, API clients by their token
+    assert body(call(reading_view, HTTP_COOKIE=f"{cookie.key}={cookie.value}")) == {"db": "default"}
+    assert body(call(reading_view, HTTP_AUTHORIZATION="JWT abc")) == {"db": "default"}
+    assert body(call(reading_view, HTTP_AUTHORIZATION="JWT other")) == {"db": "replica"}
+    # The cookie is signed, so clients can't pin themselves
+    assert body(call(reading_view, HTTP_COOKIE=f"{cookie.key}=9999999999")) == {"db": "replica"}
+
+
+def test_replicas_need_a_shared_cache(monkeypatch):
+    monkeypatch.setattr("apps.common.middleware.PROCESS_LOCAL_CACHES", ("LocMemCache",))
+    assert body(call(reading_view)) == {"db": "default"}
+
+
+def test_primary_db_opt_out():
+    assert body(call(primary_db(reading_view))) == {"db": "default"}
+
+
+def test_lagging_replica_is_skipped(replicas):
+    replicas["replica"] = 30.0
+    assert body(call(reading_view)) == {"db": "default"}
+
+
+@pytest.mark.django_db
+def test_reads_inside_transaction_use_primary():
+    with use_replicas(), transaction.atomic():
+        assert router.db_for_read(Location) == "default"
+
+
+@override_settings(DATABASE_REPLICAS=[])
+def test_no_replicas_configured():
+    assert body(call(reading_view)) == {"db": "default"}
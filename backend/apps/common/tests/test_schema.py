@@ -0,0 +1,44 @@
+import gzip
+import json
+
+import pytest
+from django.conf import settings
+
+from apps.common import schema
+
+
+@pytest.fixture(autouse=True)
+def fresh_artifact():
+    schema.reset()
+    yield
+    schema.reset()
+
+
+def test_committed_schema_matches_the_code():
+    path = settings.SCHEMA_ARTIFACT
+    message = f"{path} is out of date; run manage.py build_schema and commit the result"
+    assert path.read_bytes() == schema.generate(), message
+    assert gzip.decompress(path.with_name(path.name + ".gz").read_bytes()) == path.read_bytes(), message
+
+
+def test_schema_is_served_precompressed_with_etag(client, monkeypatch):
+    def fail():
+        raise AssertionError("the schema must not be generated per request")
+
+    monkeypatch.setattr(schema, "generate", fail)
+
+    response = client.get("/api/schema/", HTTP_ACCEPT_ENCODING="gzip")
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response["Vary"]
+    document = json.loads(gzip.decompress(response.content))
+    assert document["info"]["version"] == settings.SPECTACULAR_SETTINGS["VERSION"]
+    assert response["ETag"].startswith(f'"{document["info"]["version"]}-')
+
+    plain = client.get("/api/schema/", HTTP_ACCEPT_ENCODING="identity")
+    assert "Content-Encoding" not in plain
+    assert json.loads(plain.content) == document
+
+    not_modified = client.get("/api/schema/", HTTP_IF_NONE_MATCH=plain["ETag"], HTTP_ACCEPT_ENCODING="gzip")
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
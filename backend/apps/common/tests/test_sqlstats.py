@@ -0,0 +1,84 @@
+import io
+import logging
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common import sqlstats
+from apps.users.factories import AdminFactory
+from apps.vehicle.models import Location, Route, Trip
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    cache.clear()
+    sqlstats.stats.reset()
+    yield
+    cache.clear()
+    sqlstats.stats.reset()
+
+
+def test_fingerprint_collapses_values():
+    a = sqlstats.fingerprint(
+        'SELECT "vehicle_trip"."id" FROM "vehicle_trip" WHERE "vehicle_trip"."route_id" IN (%s, %s, %s) LIMIT 21'
+    )
+    b = sqlstats.fingerprint(
+        'SELECT  "vehicle_trip"."id" FROM "vehicle_trip"\nWHERE "vehicle_trip"."route_id" IN (%s) LIMIT 5'
+    )
+    assert a == b == 'SELECT "vehicle_trip"."id" FROM "vehicle_trip" WHERE "vehicle_trip"."route_id" IN (...) LIMIT ?'
+    assert sqlstats.fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)") == "INSERT INTO t (a, b) VALUES (...), ..."
+    assert sqlstats.fingerprint("SELECT * FROM t2 WHERE name = 'it''s' AND n = 4.5") == "SELECT * FROM t2 WHERE name = ? AND n = ?"
+
+
+def test_percentile_uses_bucket_bounds():
+    buckets = [0] * (len(sqlstats.BUCKETS) + 1)
+    buckets[0] = 90
+    buckets[3] = 10
+    assert sqlstats.percentile(buckets, 50) == sqlstats.BUCKETS[0]
+    assert sqlstats.percentile(buckets, 95) == sqlstats.BUCKETS[3]
+
+
+@pytest.mark.django_db
+@override_settings(SQL_STATS_ENABLED=True, SQL_SLOW_MS=0, DEBUG=False)
+def test_slow_query_log_leaves_out_parameter_values(caplog):
+    with caplog.at_level(logging.DEBUG, logger="apps.common.sqlstats"), connection.cursor() as cursor:
+        cursor.execute("SELECT pkid FROM users_user WHERE email = %s", ["hunter2@example.com"])
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("users_user" in message and "Plan:" in message for message in messages)
+    assert not any("hunter2" in message for message in messages)
+
+
+@pytest.mark.django_db
+@override_settings(SQL_STATS_ENABLED=True, SQL_SLOW_MS=0)
+def test_requests_are_aggregated_per_view_and_reported(client, caplog):
+    admin = AdminFactory()
+    route = Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"), drop=Location.objects.create(name="Herat"), price_af=900
+    )
+    Trip.objects.bulk_create([Trip(passenger=admin, route=route, fare=900) for _ in range(3)])
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(admin).access_token}"}
+
+    with caplog.at_level(logging.WARNING, logger="apps.common.sqlstats"):
+        for _ in range(2):
+            assert client.get("/api/v1/vehicle/admin/trips/", **headers).status_code == 200
+
+    view = "apps.vehicle.views.AdminTripListView"
+    trips = [
+        entry for (entry_view, sql), entry in sqlstats.stats.entries.items()
+        if entry_view == view and 'FROM "vehicle_trip"' in sql
+    ]
+    assert trips and trips[0]["count"] == 2
+    slow = [record.getMessage() for record in caplog.records if "vehicle_trip" in record.getMessage()]
+    assert slow and "Plan:" in slow[0] and "EXPLAIN failed" not in slow[0]
+
+    out = io.StringIO()
+    call_command("sql_report", "--table", "vehicle_trip", "--top", "5", "--width", "2000", stdout=out)
+    assert view in out.getvalue() and 'FROM "vehicle_trip"' in out.getvalue()
+
+    call_command("sql_report", "--reset", stdout=io.StringIO())
+    assert sqlstats.collect() == {}
+
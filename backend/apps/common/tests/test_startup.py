@@ -0,0 +1,19 @@
+from collections import Counter
+
+from django.conf import settings
+
+from benchmarks.startup import run_probe
+
+
+def test_middleware_is_listed_once():
+    assert [name for name, count in Counter(settings.MIDDLEWARE).items() if count > 1] == []
+
+
+def test_api_profile_boots_without_admin_and_schema_apps():
+    full = run_probe("config.settings.production")
+    api = run_probe("config.settings.api")
+
+    assert api["status"] == full["status"] == 401
+    assert api["heavy_modules"] == []
+    assert "drf_spectacular" in full["heavy_modules"]
+    assert api["modules"] < full["modules"]
@@ -0,0 +1,123 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def thumbnail_name(name, size=None):
+    size = size or settings.THUMBNAIL_SIZE
+    directory, basename = posixpath.split(name)
+    stem = posixpath.splitext(basename)[0]
+    return posixpath.join("thumbs", str(size), directory, f"{stem}.webp")
+
+
+def has_thumbnail(field_file, size=None):
+    """
+    Whether the thumbnail of ``field_file`` has been generated, going by the
+    ``<field>_thumbnail`` column next to it rather than asking the storage.
+    Thumbnail names derive from the source name, so a column left over from a
+    previous file never matches.
+    """
+    recorded = getattr(field_file.instance, f"{field_file.field.name}_thumbnail", "")
+    return bool(recorded) and recorded == thumbnail_name(field_file.name, size)
+
+
+def thumbnail_url(field_file, size=None):
+    """
+    URL of the WebP thumbnail of ``field_file``, or of the original while the
+    thumbnail has not been generated yet.
+    """
+    if not field_file:
+        return None
+    if has_thumbnail(field_file, size):
+        return default_storage.url(thumbnail_name(field_file.name, size))
+    return field_file.url
+
+
+def record_thumbnail(model, field, name, thumbnail, using="default"):
+    """
+    Store ``thumbnail`` in the ``<field>_thumbnail`` column of every ``model``
+    row whose ``field`` is still ``name``. An ``update()``, so no save signals
+    fire and schedule another thumbnail.
+    """
+    return (
+        model._default_manager.using(using)
+        .filter(**{field: name})
+        .update(**{f"{field}_thumbnail": thumbnail})
+    )
+
+
+def generate_thumbnail(name, size=None):
+    """
+    Write the WebP thumbnail of the stored image ``name`` unless it already
+    exists. Returns the thumbnail name.
+    """
+    size = size or settings.THUMBNAIL_SIZE
+    target = thumbnail_name(name, size)
+    if default_storage.exists(target):
+        return target
+
+    with default_storage.open(name, "rb") as handle, Image.open(handle) as image:
+        # Lets the JPEG decoder downscale while decoding instead of afterwards
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=settings.THUMBNAIL_QUALITY, method=4)
+
+    return default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def _generate_quietly(field_file, size):
+    instance, name = field_file.instance, field_file.name
+    try:
+        thumbnail = generate_thumbnail(name, size)
+        record_thumbnail(type(instance), field_file.field.name, name, thumbnail, instance._state.db or "default")
+        return thumbnail
+    except Exception:
+        logger.exception("Could not generate a thumbnail for %s", name)
+
+
+def _generate_in_worker(field_file, size):
+    try:
+        return _generate_quietly(field_file, size)
+    finally:
+        # Worker threads would otherwise each keep a connection open
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix="thumbnails"
+            )
+        return _executor
+
+
+def schedule_thumbnail(field_file, size=None):
+    """
+    Generate the thumbnail of ``field_file`` on the thumbnail worker pool, or
+    inline when ``THUMBNAIL_WORKERS`` is 0, and record it on the instance's
+    row. Missing source files and recorded thumbnails are skipped.
+    """
+    if not field_file or has_thumbnail(field_file, size) or not default_storage.exists(field_file.name):
+        return None
+    if not settings.THUMBNAIL_WORKERS:
+        return _generate_quietly(field_file, size)
+    return _get_executor().submit(_generate_in_worker, field_file, size)
@@ -0,0 +1,32 @@
+"""
+``write_transaction()`` is ``transaction.atomic()`` for read-check-write paths
+such as trip acceptance and ride assignment. On SQLite the outermost block
+starts with ``BEGIN IMMEDIATE``: the write lock is taken before the first
+read, so a concurrent writer waits out the busy timeout instead of failing
+with ``database is locked`` when its read lock can't be upgraded. Every other
+transaction keeps SQLite's default deferred ``BEGIN``, so readers never queue
+behind writers. On PostgreSQL ``select_for_update()`` row locks do this job
+and the block is a plain ``atomic()``.
+"""
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+
+@contextmanager
+def write_transaction(using="default"):
+    connection = connections[using]
+    if connection.vendor != "sqlite" or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # Connecting resets transaction_mode from OPTIONS, so connect first
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = "IMMEDIATE"
+    try:
+        with transaction.atomic(using=using):
+            connection.transaction_mode = mode
+            yield
+    finally:
+        connection.transaction_mode = mode
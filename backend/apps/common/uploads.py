@@ -0,0 +1,81 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from PIL import Image
+
+# Enough for the header of every format Pillow sniffs, bar JPEGs with huge EXIF
+IMAGE_HEADER_BYTES = 64 * 1024
+
+
+class UploadRejected(MultiPartParserError):
+    """
+    Raised while an upload is still streaming in. DRF's MultiPartParser turns
+    it into a 400 response.
+    """
+
+
+class LimitedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams each uploaded file to a temporary file chunk by chunk and keeps a
+    running SHA-256 of it (exposed as ``content_hash`` for ContentHashStorage).
+
+    The upload is aborted as soon as it passes ``MAX_UPLOAD_SIZE``, and image
+    dimensions are checked against ``MAX_IMAGE_DIMENSION``/``MAX_IMAGE_PIXELS``
+    from the first chunks, so neither an oversized file nor a decompression
+    bomb is ever read to the end or held in memory.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.digest = hashlib.sha256()
+        self.header = bytearray()
+        self.dimensions_checked = not (self.content_type or "").startswith("image/")
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            self.file.close()
+            raise UploadRejected(
+                f"{self.file_name} is larger than the {settings.MAX_UPLOAD_SIZE} byte upload limit."
+            )
+        self.digest.update(raw_data)
+        if not self.dimensions_checked:
+            self.header += raw_data[: IMAGE_HEADER_BYTES - len(self.header)]
+            self.check_dimensions(final=len(self.header) >= IMAGE_HEADER_BYTES)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.dimensions_checked:
+            self.check_dimensions(final=True)
+        file = super().file_complete(file_size)
+        file.content_hash = self.digest.hexdigest()
+        return file
+
+    def check_dimensions(self, final):
+        try:
+            with Image.open(io.BytesIO(self.header)) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.reject_dimensions()
+        except Exception:
+            # Not enough of the header yet; ImageField validation has the last
+            # word on files Pillow cannot identify at all.
+            self.dimensions_checked = final
+            return
+        self.dimensions_checked = True
+        if (
+            max(width, height) > settings.MAX_IMAGE_DIMENSION
+            or width * height > settings.MAX_IMAGE_PIXELS
+        ):
+            self.reject_dimensions()
+
+    def reject_dimensions(self):
+        self.file.close()
+        raise UploadRejected(
+            f"{self.file_name} exceeds the {settings.MAX_IMAGE_DIMENSION}px / "
+            f"{settings.MAX_IMAGE_PIXELS} pixel image limit."
+        )
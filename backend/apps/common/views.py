@@ -1,3 +1,252 @@
-from django.shortcuts import render
+import hmac
+import mimetypes
+import os
+import posixpath
+import re
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.vehicle.permissions import IsAdmin
+
+from . import profiling
+from .cache import stats as cache_stats
+from .renderers import PrometheusTextRenderer
+
+METRICS_TOKEN_AUTH = "metrics-token"
+
+# Names written by ContentHashStorage: <sha256>.<ext>
+CONTENT_HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.[a-z0-9]+)?$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """
+    A file object limited to ``length`` bytes from ``start``. It keeps
+    ``fileno()`` so ``wsgi.file_wrapper`` can still sendfile() the range, with
+    the count bounded by Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` inclusive for a single ``bytes=`` range, ``None`` when the
+    header should be ignored (absent or multi-range) and ``ValueError`` when it
+    cannot be satisfied.
+    """
+    match = RANGE_HEADER.match(header or "")
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def set_headers(response, headers):
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def cache_control_for(path, public=True):
+    scope = "public" if public else "private"
+    if CONTENT_HASHED_NAME.match(posixpath.basename(path)):
+        return f"{scope}, max-age=31536000, immutable"
+    return f"{scope}, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+def is_private_media(name):
+    """Whether ``name`` is in one of ``MEDIA_PRIVATE_DIRS`` or is a thumbnail of such a file."""
+    parts = posixpath.normpath(name).split("/")
+    if parts[0] == "thumbs":
+        # thumbs/<size>/<original name>, see apps.common.thumbnails
+        parts = parts[2:]
+    return bool(parts) and parts[0] in settings.MEDIA_PRIVATE_DIRS
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a public file from MEDIA_ROOT (with ``MEDIA_SERVE`` on). Files in
+    ``MEDIA_PRIVATE_DIRS`` are 404 here; views that check who is asking, such
+    as ``VehicleLicenseView``, serve them with ``media_response``.
+    """
+    if not settings.MEDIA_SERVE or is_private_media(path):
+        raise Http404("File not found.")
+    return media_response(request, path)
+
+
+def media_response(request, path, public=True):
+    """
+    A response for the file ``path`` under MEDIA_ROOT, with caching validators
+    and single-range support. Content-hashed names are cached as immutable;
+    ``public=False`` keeps shared caches from storing the file.
+
+    With ``MEDIA_ACCEL_REDIRECT_PREFIX`` set, only headers are produced and the
+    bytes are left to the reverse proxy through ``X-Accel-Redirect``; otherwise
+    the response goes out through ``wsgi.file_wrapper`` (sendfile under
+    gunicorn).
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("File not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("File not found.")
+
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control_for(path, public),
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == "*"
+    else:
+        not_modified = not was_modified_since(
+            request.headers.get("If-Modified-Since"), stat.st_mtime
+        )
+    if not_modified:
+        response = HttpResponseNotModified()
+        set_headers(response, headers)
+        return response
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        response = HttpResponse(content_type=content_type)
+        set_headers(response, headers)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + path.lstrip("/")
+        return response
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range and request.headers.get("If-Range") not in (None, etag):
+        byte_range = None
+
+    handle = open(full_path, "rb")
+    if byte_range:
+        start, end = byte_range
+        response = FileResponse(RangeFile(handle, start, end - start + 1), content_type=content_type, status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = end - start + 1
+    else:
+        response = FileResponse(handle, content_type=content_type)
+    response.block_size = settings.MEDIA_STREAM_BLOCK_SIZE
+    set_headers(response, headers)
+    return response
+
+
+class FileContentNegotiation(BaseContentNegotiation):
+    """For views that return files: whatever the ``Accept`` header, errors are rendered by the first renderer."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class CacheStatsView(APIView):
+    """Hit, miss and coalescing counters of this process's read caches."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, format=None):
+        return Response(cache_stats.as_dict())
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """``Authorization: Bearer <METRICS_TOKEN>``, for scrapers without a user account."""
+
+    def authenticate(self, request):
+        token = settings.METRICS_TOKEN
+        header = request.headers.get("Authorization", "")
+        if token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+            return AnonymousUser(), METRICS_TOKEN_AUTH
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="metrics"'
+
+
+class HasMetricsToken(BasePermission):
+    def has_permission(self, request, view):
+        return request.auth == METRICS_TOKEN_AUTH
+
+
+class MetricsView(APIView):
+    """
+    Request, phase and query histograms recorded by ``ProfilingMiddleware``
+    and the read cache counters, in the Prometheus text format. Readable with
+    ``METRICS_TOKEN`` or an admin's JWT.
+    """
+
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication]
+    permission_classes = [HasMetricsToken | IsAdmin]
+    renderer_classes = [PrometheusTextRenderer]
+    # Internal, not part of the public API schema
+    schema = None
+
+    def get(self, request, format=None):
+        lines = [
+            "# HELP read_cache_events_total Read cache hits, misses, coalesced misses and invalidations.",
+            "# TYPE read_cache_events_total counter",
+        ]
+        for name, counters in sorted(cache_stats.as_dict().items()):
+            for event in cache_stats.FIELDS:
+                lines.append(f'read_cache_events_total{{cache="{name}",event="{event}"}} {counters[event]}')
+        text = profiling.metrics.exposition() + "\n".join(lines) + "\n"
+        return Response(text, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileCapturesView(APIView):
+    """The cProfile output of recent slow requests, newest first."""
+
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication]
+    permission_classes = [HasMetricsToken | IsAdmin]
+    schema = None
+
+    def get(self, request, format=None):
+        return Response(list(reversed(profiling.captures)))
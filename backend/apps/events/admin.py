@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+from .models import ConsumerOffset, OutboxEvent
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ["pkid", "event_type", "aggregate_type", "aggregate_id", "created_at"]
+    list_filter = ["aggregate_type", "event_type"]
+    readonly_fields = ["aggregate_type", "aggregate_id", "event_type", "payload", "created_at"]
+
+
+class ConsumerOffsetAdmin(admin.ModelAdmin):
+    list_display = ["consumer", "last_event", "delivered", "failures", "updated_at"]
+
+
+admin.site.register(OutboxEvent, OutboxEventAdmin)
+admin.site.register(ConsumerOffset, ConsumerOffsetAdmin)
@@ -0,0 +1,276 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import BooleanField, F, Func, Max, Min, Q, Value
+from django.utils import timezone
+
+from .models import ConsumerOffset, OutboxEvent, uses_snapshots
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_local = threading.local()
+
+
+class Consumer:
+    def __init__(self, name, handler, aggregate_types=None):
+        self.name = name
+        self.handler = handler
+        self.aggregate_types = frozenset(aggregate_types or ())
+
+    def accepts(self, event):
+        return not self.aggregate_types or event.aggregate_type in self.aggregate_types
+
+
+def register(name, handler=None, aggregate_types=None):
+    """
+    Register ``handler`` as the consumer ``name``. The handler receives a list
+    of ``OutboxEvent`` in delivery order and may be called again with the same
+    events if it raises. Can be used as a decorator.
+    """
+
+    def decorator(func):
+        _registry[name] = Consumer(name, func, aggregate_types)
+        return func
+
+    if handler is not None:
+        return decorator(handler)
+    return decorator
+
+
+def unregister(name):
+    _registry.pop(name, None)
+
+
+def registered_consumers():
+    return dict(_registry)
+
+
+class DispatchStats:
+    """In-process delivery counters, exposed through the stats endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.consumers = {}
+
+    def _entry(self, name):
+        return self.consumers.setdefault(
+            name,
+            {"delivered": 0, "batches": 0, "failures": 0, "busy_seconds": 0.0, "last_lag_seconds": None},
+        )
+
+    def record_batch(self, name, delivered, duration, oldest_created_at):
+        with self._lock:
+            entry = self._entry(name)
+            entry["delivered"] += delivered
+            entry["batches"] += 1
+            entry["busy_seconds"] += duration
+            entry["last_lag_seconds"] = (timezone.now() - oldest_created_at).total_seconds()
+
+    def record_failure(self, name):
+        with self._lock:
+            self._entry(name)["failures"] += 1
+
+    def as_dict(self):
+        with self._lock:
+            result = {}
+            for name, entry in self.consumers.items():
+                busy = entry["busy_seconds"]
+                result[name] = dict(entry, events_per_second=entry["delivered"] / busy if busy else None)
+            return result
+
+
+stats = DispatchStats()
+
+
+def outbox_head(using="default"):
+    """
+    The current outbox position: ``txid_current_snapshot()`` on PostgreSQL,
+    the highest ``pkid`` elsewhere (SQLite commits one writer at a time, so
+    ``pkid`` order is commit order). Take it before the surrounding
+    transaction writes events of its own.
+    """
+    if uses_snapshots(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT txid_current_snapshot()::text")
+            return cursor.fetchone()[0]
+    return str(OutboxEvent.objects.using(using).aggregate(head=Max("pkid"))["head"] or 0)
+
+
+def _visible(position):
+    return Func(F("txid"), Value(position), function="txid_visible_in_snapshot", output_field=BooleanField())
+
+
+def committed_between(since, until, using="default"):
+    """
+    Events committed after position ``since`` (blank for the start of the
+    outbox) and by position ``until`` (see ``outbox_head``), unordered.
+    """
+    events = OutboxEvent.objects.using(using)
+    if not uses_snapshots(using):
+        events = events.filter(pkid__lte=int(until))
+        return events.filter(pkid__gt=int(since)) if since else events
+    # Events written before txids were recorded have none and are long committed
+    events = events.filter(Q(txid__isnull=True) | Q(_visible(until)))
+    if since:
+        xmin = int(since.split(":", 1)[0])
+        # Transactions below xmin were visible to ``since`` already; the bound keeps the txid index in use
+        events = events.filter(txid__gte=xmin).exclude(_visible(since))
+    return events
+
+
+def dispatch_consumer(consumer, batch_size=None, using="default"):
+    """
+    Deliver the next batch of events to one consumer and advance its offset.
+    Returns the number of events read from the outbox (0 when drained or failed).
+
+    Each round delivers, in ``pkid`` order, the events committed between the
+    consumer's position and a newer one (its window), so an event that
+    commits after higher ``pkid``s have been delivered is still picked up.
+    """
+    batch_size = batch_size or settings.EVENTS_BATCH_SIZE
+    # Before the row lock below gives this transaction an id of its own
+    head = outbox_head(using)
+    with transaction.atomic(using=using):
+        offset, _ = (
+            ConsumerOffset.objects.using(using)
+            .select_for_update()
+            .get_or_create(consumer=consumer.name)
+        )
+        if not offset.window:
+            if head == offset.position:
+                return 0
+            # Offsets from before positions existed resume after their last event
+            offset.window, offset.window_after = head, 0 if offset.position else offset.last_event
+        events = list(
+            committed_between(offset.position, offset.window, using)
+            .filter(pkid__gt=offset.window_after)
+            .order_by("pkid")[:batch_size]
+        )
+        if not events:
+            offset.position, offset.window, offset.window_after = offset.window, "", 0
+            offset.save(update_fields=["position", "window", "window_after", "updated_at"])
+            return 0
+
+        relevant = [event for event in events if consumer.accepts(event)]
+        started = time.perf_counter()
+        try:
+            if relevant:
+                with transaction.atomic(using=using):
+                    consumer.handler(relevant)
+        except Exception as exc:
+            logger.exception("Event consumer %s failed after event %s", consumer.name, offset.last_event)
+            offset.failures += 1
+            offset.last_error = repr(exc)[:1000]
+            offset.save(update_fields=["failures", "last_error", "updated_at"])
+            stats.record_failure(consumer.name)
+            return 0
+
+        offset.last_event = offset.window_after = events[-1].pkid
+        if len(events) < batch_size:
+            offset.position, offset.window, offset.window_after = offset.window, "", 0
+        offset.delivered += len(relevant)
+        offset.last_error = ""
+        offset.save(
+            update_fields=["position", "window", "window_after", "last_event", "delivered", "last_error", "updated_at"]
+        )
+        stats.record_batch(consumer.name, len(relevant), time.perf_counter() - started, events[0].created_at)
+        return len(events)
+
+
+def dispatch(batch_size=None, using="default", names=None, max_batches=100):
+    """
+    Drain the outbox for every registered consumer (or only ``names``), at most
+    ``max_batches`` batches each. Returns the number of events read.
+    """
+    selected = [c for name, c in _registry.items() if names is None or name in names]
+    total = 0
+    _local.dispatching = True
+    try:
+        for consumer in selected:
+            for _ in range(max_batches):
+                read = dispatch_consumer(consumer, batch_size, using)
+                total += read
+                if not read:
+                    break
+    finally:
+        _local.dispatching = False
+    return total
+
+
+def schedule_dispatch(using="default"):
+    """
+    With ``EVENTS_DISPATCH_ON_COMMIT`` enabled, deliver new events in-process as
+    soon as the surrounding transaction commits. Otherwise the
+    ``dispatch_events`` command is responsible for delivery.
+    """
+    if not getattr(settings, "EVENTS_DISPATCH_ON_COMMIT", False):
+        return
+    if getattr(_local, "dispatching", False):
+        return
+    transaction.on_commit(lambda: dispatch(using=using), using=using)
+
+
+def _pending(offset, head, using):
+    if offset is None:
+        return committed_between("", head, using)
+    pending = committed_between(offset.position, head, using)
+    if offset.window:
+        delivered = committed_between(offset.position, offset.window, using).filter(pkid__lte=offset.window_after)
+        pending = pending.exclude(pkid__in=delivered.values("pkid"))
+    elif not offset.position:
+        pending = pending.filter(pkid__gt=offset.last_event)
+    return pending
+
+
+def snapshot(using="default"):
+    """Current outbox head, per-consumer backlog and lag, and delivery throughput."""
+    head = OutboxEvent.objects.using(using).aggregate(head=Max("pkid"))["head"] or 0
+    position = outbox_head(using)
+    offsets = {o.consumer: o for o in ConsumerOffset.objects.using(using).all()}
+    now = timezone.now()
+    consumers = {}
+    for name in sorted(set(_registry) | set(offsets)):
+        offset = offsets.get(name)
+        pending = _pending(offset, position, using)
+        oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+        consumers[name] = {
+            "registered": name in _registry,
+            "last_event": offset.last_event if offset else 0,
+            "pending": pending.count(),
+            "lag_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+            "delivered": offset.delivered if offset else 0,
+            "failures": offset.failures if offset else 0,
+            "last_error": offset.last_error if offset else "",
+        }
+    return {"head": head, "consumers": consumers, "throughput": stats.as_dict()}
+
+
+def prune(older_than, using="default"):
+    """
+    Delete events that every registered consumer has processed and that were
+    created before ``older_than``. Returns the number of deleted rows.
+    """
+    names = list(_registry)
+    if not names:
+        return 0
+    positions = list(
+        ConsumerOffset.objects.using(using).filter(consumer__in=names).values_list("position", flat=True)
+    )
+    if len(positions) < len(names) or not all(positions):
+        return 0
+    processed = OutboxEvent.objects.using(using).filter(created_at__lt=older_than)
+    if uses_snapshots(using):
+        # Transactions below every position's xmin were visible to all of them
+        floor = min(int(position.split(":", 1)[0]) for position in positions)
+        processed = processed.filter(Q(txid__isnull=True) | Q(txid__lt=floor))
+    else:
+        processed = processed.filter(pkid__lte=min(int(position) for position in positions))
+    deleted, _ = processed.delete()
+    return deleted
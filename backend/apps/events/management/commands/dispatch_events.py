@@ -0,0 +1,42 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.events import bus
+
+
+class Command(BaseCommand):
+    help = "Deliver outbox events to the registered consumers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--consumer", action="append", dest="consumers")
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling instead of exiting once drained."
+        )
+        parser.add_argument("--interval", type=float, default=1.0)
+        parser.add_argument(
+            "--prune-days",
+            type=int,
+            default=None,
+            help="Delete delivered events older than this many days after dispatching.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            delivered = bus.dispatch(
+                batch_size=options["batch_size"], names=options["consumers"]
+            )
+            if options["prune_days"] is not None:
+                cutoff = timezone.now() - timedelta(days=options["prune_days"])
+                pruned = bus.prune(cutoff)
+                if pruned:
+                    self.stdout.write(f"Pruned {pruned} delivered events.")
+            if delivered:
+                self.stdout.write(f"Dispatched {delivered} events.")
+            if not options["loop"]:
+                break
+            if not delivered:
+                time.sleep(options["interval"])
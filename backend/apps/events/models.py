@@ -0,0 +1,171 @@
+from django.db import connections, models, router, transaction
+from django.utils.translation import gettext_lazy as _
+
+
+class OutboxEvent(models.Model):
+    """
+    A domain event written in the same transaction as the change it describes.
+    Events are delivered in the order their transactions became visible, and
+    by ``pkid`` among those that became visible together, so events for a
+    single aggregate are always delivered in the order they were committed.
+
+    A ``pkid`` is taken at INSERT but becomes visible at COMMIT, so on
+    PostgreSQL a lower one can show up after a higher one. ``txid`` records
+    the writing transaction there so readers can tell which transactions a
+    position (see ``apps.events.bus.outbox_head``) has already seen.
+    """
+
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    aggregate_type = models.CharField(verbose_name=_("aggregate type"), max_length=50)
+    aggregate_id = models.CharField(verbose_name=_("aggregate id"), max_length=64)
+    event_type = models.CharField(verbose_name=_("event type"), max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # txid_current() of the writer on PostgreSQL; null elsewhere
+    txid = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        verbose_name = _("outbox event")
+        verbose_name_plural = _("outbox events")
+        ordering = ["pkid"]
+        indexes = [
+            models.Index(
+                fields=["aggregate_type", "aggregate_id", "pkid"],
+                name="outbox_aggregate_idx",
+            ),
+            models.Index(fields=["txid"], name="outbox_txid_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.aggregate_type}:{self.aggregate_id}"
+
+
+class ConsumerOffset(models.Model):
+    """
+    How far a registered consumer has got. Every event committed by
+    ``position`` has been delivered; ``window`` is the newer position being
+    delivered, ``window_after`` the last ``pkid`` delivered from it. An offset
+    only moves forward after the consumer returns, which gives at-least-once
+    delivery: a crash mid-batch means the batch is delivered again.
+    """
+
+    consumer = models.CharField(max_length=100, unique=True)
+    position = models.TextField(blank=True)
+    window = models.TextField(blank=True)
+    window_after = models.BigIntegerField(default=0)
+    # The last event delivered, for display
+    last_event = models.BigIntegerField(default=0)
+    delivered = models.BigIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("consumer offset")
+        verbose_name_plural = _("consumer offsets")
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event}"
+
+
+class OutboxMixin:
+    """
+    Records an ``OutboxEvent`` whenever the model is created, updated or deleted.
+    The write and the event share one transaction, so an event exists if and
+    only if the change was committed.
+
+    ``outbox_aggregate`` names the aggregate (defaults to the model name) and
+    ``outbox_ignored_fields`` lists fields whose isolated updates, such as
+    ``last_login``, are not worth an event.
+    """
+
+    outbox_aggregate = None
+    outbox_ignored_fields = frozenset()
+
+    def outbox_payload(self):
+        payload = {"pkid": self.pk}
+        if getattr(self, "id", None) is not None and self.id != self.pk:
+            payload["id"] = str(self.id)
+        return payload
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        if update_fields and set(update_fields) <= set(self.outbox_ignored_fields):
+            return super().save(*args, **kwargs)
+
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            payload = self.outbox_payload()
+            if update_fields:
+                payload["update_fields"] = sorted(update_fields)
+            record_event(self, "created" if created else "updated", payload, using)
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            payload = self.outbox_payload()
+            result = super().delete(*args, **kwargs)
+            record_event(self, "deleted", payload, using, aggregate_pk=payload["pkid"])
+        return result
+
+
+def uses_snapshots(using="default"):
+    """Whether outbox positions are transaction snapshots (PostgreSQL) rather than ``pkid``s."""
+    return connections[using].vendor == "postgresql"
+
+
+def writer_txid(using="default"):
+    """The ``txid`` value for events written on ``using``: ``txid_current()`` on PostgreSQL."""
+    if uses_snapshots(using):
+        return models.Func(function="txid_current", output_field=models.BigIntegerField())
+    return None
+
+
+def aggregate_name(model):
+    return getattr(model, "outbox_aggregate", None) or model._meta.model_name
+
+
+def record_event(instance, action, payload=None, using=None, aggregate_pk=None):
+    """
+    Append an event for ``instance`` to the outbox on the ``using`` connection.
+    Call it inside the transaction that performs the change.
+    """
+    aggregate = aggregate_name(type(instance))
+    event = OutboxEvent.objects.using(using or "default").create(
+        aggregate_type=aggregate,
+        aggregate_id=str(aggregate_pk if aggregate_pk is not None else instance.pk),
+        event_type=f"{aggregate}.{action}",
+        payload=payload if payload is not None else {"pkid": instance.pk},
+        txid=writer_txid(using or "default"),
+    )
+    from apps.events.bus import schedule_dispatch
+
+    schedule_dispatch(using or "default")
+    return event
+
+
+def record_events_bulk(instances, action, using=None):
+    """
+    ``record_event`` for many saved instances in one INSERT, for bulk paths
+    that bypass ``save()``.
+    """
+    events = []
+    txid = writer_txid(using or "default")
+    for instance in instances:
+        aggregate = aggregate_name(type(instance))
+        events.append(
+            OutboxEvent(
+                aggregate_type=aggregate,
+                aggregate_id=str(instance.pk),
+                event_type=f"{aggregate}.{action}",
+                payload=instance.outbox_payload(),
+                txid=txid,
+            )
+        )
+    OutboxEvent.objects.using(using or "default").bulk_create(events)
+    from apps.events.bus import schedule_dispatch
+
+    schedule_dispatch(using or "default")
+    return events
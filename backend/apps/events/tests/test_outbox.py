@@ -0,0 +1,142 @@
+import pytest
+from django.db import connection, transaction
+
+from apps.events import bus
+from apps.events.models import ConsumerOffset, OutboxEvent
+from apps.users.factories import UserFactory
+from apps.vehicle.models import Location, Route, Trip
+
+sqlite_only = pytest.mark.skipif(connection.vendor != "sqlite", reason="emulates PostgreSQL positions on SQLite")
+
+
+@pytest.fixture
+def route():
+    pickup = Location.objects.create(name="Kabul")
+    drop = Location.objects.create(name="Herat")
+    return Route.objects.create(pickup=pickup, drop=drop, price_af=500)
+
+
+@pytest.fixture
+def collector():
+    received = []
+    bus.register("test-collector", lambda events: received.extend(events), ["trip"])
+    yield received
+    bus.unregister("test-collector")
+
+
+@pytest.mark.django_db
+def test_trip_changes_are_written_to_the_outbox(route):
+    passenger = UserFactory()
+    trip = Trip.objects.create(passenger=passenger, route=route, fare=route.price_af)
+    trip.status = "cancelled"
+    trip.save()
+
+    events = list(OutboxEvent.objects.filter(aggregate_type="trip"))
+    assert [e.event_type for e in events] == ["trip.created", "trip.updated"]
+    assert events[1].payload["status"] == "cancelled"
+    assert events[0].aggregate_id == str(trip.pk)
+
+
+@pytest.mark.django_db
+def test_rolled_back_change_leaves_no_event(route):
+    passenger = UserFactory()
+    before = OutboxEvent.objects.count()
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            Trip.objects.create(passenger=passenger, route=route)
+            raise RuntimeError
+    assert OutboxEvent.objects.count() == before
+
+
+@pytest.mark.django_db
+def test_last_login_update_is_ignored():
+    user = UserFactory()
+    before = OutboxEvent.objects.count()
+    user.save(update_fields=["last_login"])
+    assert OutboxEvent.objects.count() == before
+
+
+@pytest.mark.django_db
+def test_route_assignment_records_route_event(route):
+    driver = UserFactory(role="driver")
+    route.drivers.add(driver)
+    event = OutboxEvent.objects.filter(aggregate_type="route").last()
+    assert event.payload == {"pkid": route.pk, "m2m": "drivers"}
+
+
+# Dispatch only sees committed events (on PostgreSQL, by transaction snapshot)
+@pytest.mark.django_db(transaction=True)
+def test_dispatch_delivers_in_order_and_advances_offset(route, collector):
+    passenger = UserFactory()
+    trips = [Trip.objects.create(passenger=passenger, route=route) for _ in range(3)]
+
+    bus.dispatch(batch_size=2)
+
+    assert [e.aggregate_id for e in collector] == [str(t.pk) for t in trips]
+    offset = ConsumerOffset.objects.get(consumer="test-collector")
+    assert offset.last_event == OutboxEvent.objects.latest("pkid").pkid
+    assert offset.delivered == 3
+
+    bus.dispatch()
+    assert len(collector) == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_batch_is_redelivered(route):
+    passenger = UserFactory()
+    Trip.objects.create(passenger=passenger, route=route)
+    attempts = []
+
+    def flaky(events):
+        attempts.append([e.pkid for e in events])
+        if len(attempts) == 1:
+            raise ValueError("boom")
+
+    bus.register("test-flaky", flaky, ["trip"])
+    try:
+        bus.dispatch()
+        offset = ConsumerOffset.objects.get(consumer="test-flaky")
+        assert offset.failures == 1
+        assert offset.delivered == 0
+
+        bus.dispatch()
+        assert attempts[0] == attempts[1]
+        offset.refresh_from_db()
+        assert offset.delivered == 1
+        assert bus.snapshot()["consumers"]["test-flaky"]["pending"] == 0
+    finally:
+        bus.unregister("test-flaky")
+
+
+@sqlite_only
+@pytest.mark.django_db
+def test_event_committed_after_a_higher_pkid_is_still_delivered(monkeypatch, collector):
+    # PostgreSQL positions, with txid_visible_in_snapshot() as a SQLite function
+    def visible(txid, position):
+        if txid is None:
+            return None
+        xmin, xmax, in_progress = position.split(":")
+        return txid < int(xmin) or (txid < int(xmax) and str(txid) not in in_progress.split(","))
+
+    connection.ensure_connection()
+    connection.connection.create_function("txid_visible_in_snapshot", 2, visible)
+    head = {"position": "5:7:5"}
+    monkeypatch.setattr(bus, "uses_snapshots", lambda using="default": True)
+    monkeypatch.setattr(bus, "outbox_head", lambda using="default": head["position"])
+
+    def commit(pkid, txid):
+        OutboxEvent.objects.create(
+            pkid=pkid, txid=txid, aggregate_type="trip", aggregate_id=str(pkid), event_type="trip.updated"
+        )
+
+    # Transaction 5 took pkid 1001 and is still open; transaction 6 took 1002 and committed
+    commit(1002, 6)
+    bus.dispatch()
+    assert [e.pkid for e in collector] == [1002]
+
+    commit(1001, 5)
+    head["position"] = "7:7:"
+    assert bus.snapshot()["consumers"]["test-collector"]["pending"] == 1
+    bus.dispatch()
+    assert [e.pkid for e in collector] == [1002, 1001]
+    assert bus.snapshot()["consumers"]["test-collector"]["pending"] == 0
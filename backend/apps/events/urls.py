@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import EventStatsView
+
+urlpatterns = [
+    path("stats/", EventStatsView.as_view(), name="event-stats"),
+]
@@ -0,0 +1,19 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.common.routers import primary_db
+from apps.vehicle.permissions import IsAdmin
+
+from . import bus
+
+
+@primary_db
+class EventStatsView(APIView):
+    """
+    Outbox head, per-consumer backlog and lag, and in-process delivery throughput.
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, format=None):
+        return Response(bus.snapshot())
@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+
+from apps.common.cache import ReadCache
+
+from .models import Profile
+
+User = get_user_model()
+
+# The profile payload includes the user's names, email and role
+profile_cache = ReadCache(
+    "profile",
+    depends_on={
+        Profile: lambda profile: [profile.user_id],
+        User: lambda user: [user.pk],
+    },
+)
@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django_filters import rest_framework as filters
+
+User = get_user_model()
+
+
+class UserFilter(filters.FilterSet):
+    """``?role=driver&is_active=true&joined_after=2024-01-01&joined_before=...``"""
+
+    role = filters.ChoiceFilter(choices=User.Role.choices)
+    is_active = filters.BooleanFilter()
+    joined = filters.IsoDateTimeFromToRangeFilter(field_name="date_joined")
+
+    class Meta:
+        model = User
+        fields = ["role", "is_active", "joined"]
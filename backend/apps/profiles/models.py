@@ -47,6 +47,8 @@ class Profile(TimeStampedModel):
         default="profile_default.png",
         null=True,
     )
+    # Set once the WebP thumbnail of the photo exists, see apps.common.thumbnails
+    profile_photo_thumbnail = models.CharField(max_length=255, blank=True, default="", editable=False)
 
     def __str__(self):
         return f'{self.user.first_name}"s Profile'
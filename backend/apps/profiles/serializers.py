@@ -1,10 +1,14 @@
 from django_countries.serializer_fields import CountryField
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+
+from apps.common.projection import ProjectedSerializerMixin
+from apps.common.thumbnails import thumbnail_url
+
 from .models import Profile
 User = get_user_model() 
 
-class ProfileSerializers(serializers.ModelSerializer):
+class ProfileSerializers(ProjectedSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(source="user.username")
     first_name = serializers.CharField(source="user.first_name")
     last_name = serializers.CharField(source="user.last_name")
@@ -13,8 +17,15 @@ class ProfileSerializers(serializers.ModelSerializer):
     user_pkid = serializers.IntegerField(source='user.pk', read_only=True)
     full_name = serializers.SerializerMethodField(read_only=True)
     profile_photo = serializers.SerializerMethodField()
+    profile_photo_thumbnail = serializers.SerializerMethodField()
     country = CountryField(name_only=True)
 
+    projection_sources = {
+        "full_name": ["user__first_name", "user__last_name"],
+        "profile_photo": ["profile_photo"],
+        "profile_photo_thumbnail": ["profile_photo", "profile_photo_thumbnail"],
+    }
+
     class Meta:
         model = Profile
         fields = [
@@ -27,6 +38,7 @@ class ProfileSerializers(serializers.ModelSerializer):
             "full_name",
             "email",
             "profile_photo",
+            "profile_photo_thumbnail",
             "country",
             "address",
             "gender",
@@ -43,6 +55,9 @@ class ProfileSerializers(serializers.ModelSerializer):
     def get_profile_photo(self, obj):
         return obj.profile_photo.url
 
+    def get_profile_photo_thumbnail(self, obj):
+        return thumbnail_url(obj.profile_photo)
+
     def update(self, instance, validated_data):
         # Extract nested user data
         user_data = validated_data.pop("user", {})
@@ -82,12 +97,14 @@ class UpdateProfileSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class AdminUserListSerializer(serializers.ModelSerializer):
+class AdminUserListSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the admin user management page (read-only list).
     """
     full_name = serializers.CharField(source='get_full_name', read_only=True)
 
+    projection_sources = {"full_name": ["first_name", "last_name"]}
+
     class Meta:
         model = User
         fields = [
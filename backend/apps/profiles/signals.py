@@ -1,8 +1,10 @@
 import logging
 
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from apps.common.thumbnails import schedule_thumbnail
 from apps.profiles.models import Profile
 from config.settings.base import AUTH_USER_MODEL
 
@@ -14,4 +16,11 @@ def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
         logger.info(f"{instance}'s profile has been created.")
- 
\ No newline at end of file
+
+
+@receiver(post_save, sender=Profile)
+def create_profile_photo_thumbnail(sender, instance, created, **kwargs):
+    if created:
+        # New profiles point at the shared default photo
+        return
+    transaction.on_commit(lambda: schedule_thumbnail(instance.profile_photo))
@@ -1,4 +1,3 @@
-from config.settings.local import DEFAULT_FROM_EMAIL
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
 from rest_framework import generics, status
@@ -7,7 +6,14 @@ from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters
+from apps.common.cache import CachedReadMixin
+from apps.common.projection import ProjectionMixin
+from apps.search.filters import IndexedSearchFilter
 from apps.vehicle.permissions import IsAdmin
+from .caches import profile_cache
+from .filters import UserFilter
 from .models import Profile
 from .pagination import ProfilePagination
 from .renderers import ProfileJsonRenderers, ProfilesJsonRenderers
@@ -15,7 +21,7 @@ from .serializers import ProfileSerializers, UpdateProfileSerializer,AdminUserUp
 
 User = get_user_model()
 
-class ProfileListAPIView(generics.ListAPIView):
+class ProfileListAPIView(ProjectionMixin, generics.ListAPIView):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializers
     permission_classes = [IsAuthenticated]
@@ -23,8 +29,9 @@ class ProfileListAPIView(generics.ListAPIView):
     renderer_classes = [ProfilesJsonRenderers]
 
 
-class ProfileDetailAPIView(generics.RetrieveAPIView):
+class ProfileDetailAPIView(CachedReadMixin, generics.RetrieveAPIView):
     permission_classes = [AllowAny]
+    read_cache = profile_cache
     serializer_class = ProfileSerializers
     renderer_classes = [ProfileJsonRenderers]
 
@@ -55,13 +62,19 @@ class UpdateProfileAPIView(generics.UpdateAPIView):
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
-class AdminUserListView(generics.ListAPIView):
+class AdminUserListView(ProjectionMixin, generics.ListAPIView):
     """
     Provides a list of all users for the admin dashboard.
     """
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = AdminUserListSerializer
     permission_classes = [IsAdmin]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
+    filterset_class = UserFilter
+    search_kind = 'user'
+    # Only used on databases without a full-text index
+    search_fields = ['first_name', 'last_name', 'email', 'username']
+    ordering_fields = ['date_joined', 'email']
 
 class AdminUserDetailView(generics.RetrieveUpdateAPIView):
     """
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
+
+
+class RoutingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.routing"
+    verbose_name = _("Routing")
+
+    def ready(self):
+        from apps.routing import signals  # noqa
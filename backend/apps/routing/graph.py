@@ -0,0 +1,269 @@
+"""
+Multi-leg itineraries over the route network.
+
+``RouteGraph`` holds every ``Route`` as a directed edge from its pickup to its
+drop, weighted by price and by the driving time from the distance matrix (or,
+without one, the coordinate estimate). ``search()`` finds the cheapest or
+fastest itinerary of at most ``max_legs`` legs: A* with a great-circle
+heuristic when every location on the network has coordinates, Dijkstra
+otherwise.
+
+The graph is loaded once per process and patched as routes change: right
+after a save or delete in this process (``signals``), and from the route
+events in the outbox for edits made by other processes, checked at most every
+``ROUTE_GRAPH_CHECK_SECONDS``. Writes that bypass the outbox (``bulk_create``,
+``update()``) and coordinate edits made elsewhere show up with the full reload
+every ``ROUTE_GRAPH_RELOAD_SECONDS`` or when a new distance matrix is published.
+Each load or patch publishes a new immutable ``Network``, so searches never
+wait on one another or on a refresh.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from apps.events import bus
+from apps.events.models import aggregate_name
+from apps.tracking.geohash import haversine_km
+from apps.vehicle.models import Location, Route
+
+from . import matrix
+
+OPTIMIZE = ("price", "duration")
+
+Edge = namedtuple("Edge", "route pickup drop price_af distance_km duration_min")
+Itinerary = namedtuple("Itinerary", "legs price_af distance_km duration_min")
+
+WEIGHTS = {
+    "price": lambda edge: float(edge.price_af),
+    "duration": lambda edge: edge.duration_min,
+}
+
+
+class Network:
+    """
+    One immutable version of the graph. Searches read it without a lock;
+    ``patched()`` returns a new version with some routes reread.
+    """
+
+    def __init__(self, distances, coordinates):
+        self.matrix = distances
+        self.coordinates = coordinates
+        self.edges = {}
+        self.routes = {}
+        # The lowest cost per great-circle km of any edge; times the
+        # distance left it never overestimates, which keeps A* exact
+        self.rates = dict.fromkeys(OPTIMIZE, math.inf)
+        self.admissible = True
+
+    def _leg(self, pickup, drop):
+        found = self.matrix.leg(pickup, drop) if self.matrix is not None else None
+        if found is not None:
+            return found
+        a, b = self.coordinates.get(pickup), self.coordinates.get(drop)
+        if a is None or b is None:
+            return matrix.Leg(None, None)
+        km = haversine_km(*a, *b) * settings.DISTANCE_ROAD_FACTOR
+        return matrix.Leg(km, km * 60 / settings.DISTANCE_AVERAGE_SPEED_KMH)
+
+    def _add(self, route, pickup, drop, price_af):
+        self._remove(route)
+        edge = Edge(route, pickup, drop, price_af, *self._leg(pickup, drop))
+        self.edges.setdefault(pickup, {})[route] = edge
+        self.routes[route] = edge
+        a, b = self.coordinates.get(pickup), self.coordinates.get(drop)
+        if a is None or b is None:
+            self.admissible = False
+            return
+        km = haversine_km(*a, *b)
+        if km > 0:
+            for optimize, weight in WEIGHTS.items():
+                cost = weight(edge)
+                if cost is not None:
+                    self.rates[optimize] = min(self.rates[optimize], cost / km)
+
+    def _remove(self, route):
+        edge = self.routes.pop(route, None)
+        if edge is not None:
+            outgoing = self.edges[edge.pickup]
+            del outgoing[route]
+            if not outgoing:
+                del self.edges[edge.pickup]
+
+    def patched(self, rows, removed):
+        """
+        A copy with the ``(route, pickup, drop, price_af)`` ``rows`` added or
+        replaced and the ``removed`` route pks gone. Only the outgoing edge
+        maps that change are copied.
+        """
+        network = Network(self.matrix, self.coordinates)
+        network.routes = dict(self.routes)
+        network.edges = dict(self.edges)
+        network.rates = dict(self.rates)
+        network.admissible = self.admissible
+        touched = {row[1] for row in rows}
+        touched |= {self.routes[route].pickup for route in {row[0] for row in rows} | set(removed) if route in self.routes}
+        for pickup in touched:
+            if pickup in network.edges:
+                network.edges[pickup] = dict(network.edges[pickup])
+        for row in rows:
+            network._add(*row)
+        for route in removed:
+            network._remove(route)
+        return network
+
+    def search(self, origin, destination, optimize, max_legs):
+        return self._search(origin, destination, WEIGHTS[optimize], self._heuristic(destination, optimize), max_legs)
+
+    def _heuristic(self, destination, optimize):
+        target = self.coordinates.get(destination)
+        # Slightly under the rate, so float rounding can't make it overestimate
+        rate = self.rates[optimize] * (1 - 1e-9)
+        if not self.admissible or target is None or not 0 < rate < math.inf:
+            return lambda node: 0.0
+        coordinates, cache = self.coordinates, {}
+
+        def estimate(node):
+            value = cache.get(node)
+            if value is None:
+                value = cache[node] = rate * haversine_km(*coordinates[node], *target)
+            return value
+
+        return estimate
+
+    def _search(self, origin, destination, weight, heuristic, max_legs):
+        # Labels are (node, legs): a cheaper path with more legs doesn't make
+        # a dearer one with fewer redundant, so a node is settled per leg count
+        fewest_legs = {}
+        # (cost, legs) of the cheapest label queued per node; most pushes are dominated by it
+        queued = {origin: (0.0, 0)}
+        tie = itertools.count()
+        heap = [(heuristic(origin), 0.0, 0, next(tie), origin, None)]
+        while heap:
+            _, cost, legs, _, node, path = heapq.heappop(heap)
+            if node == destination:
+                return _itinerary(path)
+            if fewest_legs.get(node, max_legs + 1) <= legs:
+                continue
+            fewest_legs[node] = legs
+            if legs == max_legs:
+                continue
+            for edge in self.edges.get(node, {}).values():
+                step = weight(edge)
+                if step is None or fewest_legs.get(edge.drop, max_legs + 1) <= legs + 1:
+                    continue
+                total = cost + step
+                best = queued.get(edge.drop)
+                if best is not None and best[0] <= total and best[1] <= legs + 1:
+                    continue
+                if best is None or total < best[0]:
+                    queued[edge.drop] = (total, legs + 1)
+                heapq.heappush(
+                    heap, (total + heuristic(edge.drop), total, legs + 1, next(tie), edge.drop, (edge, path))
+                )
+        return None
+
+
+class RouteGraph:
+    """
+    The process's current ``Network``, kept up to date. The lock only
+    serializes loads and patches; searches run on whichever version was
+    current when they started.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.network = None
+        self.loaded_at = None
+
+    def load(self):
+        """(Re)build the whole graph from the database."""
+        with self._lock:
+            # Read first: events committed during the load are replayed, which is harmless
+            self.position = bus.outbox_head()
+            network = Network(
+                matrix.current(),
+                {
+                    pk: (latitude, longitude)
+                    for pk, latitude, longitude in Location.objects.filter(
+                        latitude__isnull=False, longitude__isnull=False
+                    ).values_list("pkid", "latitude", "longitude")
+                },
+            )
+            rows = Route.objects.values_list("pkid", "pickup_id", "drop_id", "price_af")
+            for row in rows.iterator(chunk_size=5000):
+                network._add(*row)
+            self.network = network
+            self.loaded_at = self.checked_at = time.monotonic()
+
+    def invalidate(self):
+        """Reload everything before the next search."""
+        with self._lock:
+            self.loaded_at = None
+
+    def patch(self, routes):
+        """Reread the given route pks; deleted ones leave the graph. A no-op before the first load."""
+        with self._lock:
+            if self.loaded_at is None:
+                return
+            rows = list(
+                Route.objects.filter(pkid__in=routes).values_list("pkid", "pickup_id", "drop_id", "price_af")
+            )
+            self.network = self.network.patched(rows, set(routes) - {row[0] for row in rows})
+
+    def refresh(self):
+        """Load the graph on first use, then apply the route events committed since."""
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self.loaded_at is None
+                or now - self.loaded_at >= settings.ROUTE_GRAPH_RELOAD_SECONDS
+                or matrix.current() is not self.network.matrix
+            ):
+                self.load()
+                return
+            if now - self.checked_at < settings.ROUTE_GRAPH_CHECK_SECONDS:
+                return
+            self.checked_at = now
+            # Positions rather than a pkid high-water mark, so an event that
+            # commits after higher pkids were read is still applied
+            head = bus.outbox_head()
+            if head == self.position:
+                return
+            changed = bus.committed_between(self.position, head).filter(aggregate_type=aggregate_name(Route))
+            routes = {int(route) for route in changed.values_list("aggregate_id", flat=True)}
+            if routes:
+                self.patch(routes)
+            self.position = head
+
+    def search(self, origin, destination, optimize="price", max_legs=None):
+        """
+        The best ``Itinerary`` between two location pks by ``optimize`` (one of
+        ``OPTIMIZE``), or None when no route chain of at most ``max_legs``
+        legs connects them.
+        """
+        self.refresh()
+        return self.network.search(origin, destination, optimize, max_legs or settings.ITINERARY_MAX_LEGS)
+
+
+def _itinerary(path):
+    legs = []
+    while path is not None:
+        edge, path = path
+        legs.append(edge)
+    legs.reverse()
+    distances = [edge.distance_km for edge in legs]
+    durations = [edge.duration_min for edge in legs]
+    return Itinerary(
+        legs,
+        sum((edge.price_af for edge in legs), start=0),
+        None if None in distances else sum(distances),
+        None if None in durations else sum(durations),
+    )
+
+
+graph = RouteGraph()
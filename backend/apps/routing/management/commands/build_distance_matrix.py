@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.routing.matrix import build
+
+
+class Command(BaseCommand):
+    help = "Compute the location distance and ETA matrix and publish it to DISTANCE_MATRIX_DIR."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--road-graph",
+            default=None,
+            help="CSV of road segments (from,to,distance_km,duration_min); default: DISTANCE_ROAD_GRAPH.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        matrix = build(road_graph=options["road_graph"])
+        self.stdout.write(
+            f"Built the {len(matrix)} x {len(matrix)} distance matrix in {time.perf_counter() - started:.1f}s "
+            f"({matrix.path})."
+        )
@@ -0,0 +1,311 @@
+"""
+Location x Location distance and duration matrix.
+
+``build()`` computes the driving distance (km) and duration (minutes) between
+every pair of locations and publishes them as ``.npy`` files under
+``DISTANCE_MATRIX_DIR``: float32 arrays, about 100 MB each for 5k locations.
+Pairs joined by roads in ``DISTANCE_ROAD_GRAPH`` get the fastest route over
+those roads; the others the great-circle distance times
+``DISTANCE_ROAD_FACTOR`` at ``DISTANCE_AVERAGE_SPEED_KMH``. Pairs with neither
+(a location without coordinates) are NaN.
+
+Every process memory-maps the latest build (``current()``), so the arrays live
+once in the page cache and ``leg()`` is a dict lookup and two array reads.
+Each build is written to its own directory and published by replacing the
+``CURRENT`` pointer file, so readers never see a half-written matrix. Builds
+take a file lock on the directory, a build never replaces a newer one, and
+only finished builds other than the published one are pruned.
+"""
+import contextlib
+import csv
+import heapq
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+from apps.tracking.geohash import EARTH_RADIUS_KM
+from apps.vehicle.models import Location
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows; builds in several processes may then overlap
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+POINTER = "CURRENT"
+# Held by the process building; written into a build once all its files are
+LOCK = ".lock"
+COMPLETE = "COMPLETE"
+# Rows computed per NumPy step; bounds the temporaries to ROW_BLOCK x n floats
+ROW_BLOCK = 256
+# Builds kept on disk, so processes still on the previous one can finish with it
+KEEP_BUILDS = 2
+
+Leg = namedtuple("Leg", "distance_km duration_min")
+
+_lock = threading.Lock()
+_current = None
+_checked_at = None
+_executor = None
+_pending = False
+
+
+class DistanceMatrix:
+    """One published build, memory-mapped read-only."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pks = np.load(self.path / "locations.npy")
+        self.index = {pk: row for row, pk in enumerate(self.pks.tolist())}
+        self.distance_km = np.load(self.path / "distance_km.npy", mmap_mode="r")
+        self.duration_min = np.load(self.path / "duration_min.npy", mmap_mode="r")
+
+    def __len__(self):
+        return len(self.pks)
+
+    def leg(self, origin, destination):
+        """The ``Leg`` between two location pks, or None without an estimate."""
+        i, j = self.index.get(origin), self.index.get(destination)
+        if i is None or j is None:
+            return None
+        distance = float(self.distance_km[i, j])
+        if math.isnan(distance):
+            return None
+        return Leg(distance, float(self.duration_min[i, j]))
+
+
+def current():
+    """
+    The latest published matrix, or None before the first build. Looks for a
+    newer build at most every ``DISTANCE_MATRIX_CHECK_SECONDS``.
+    """
+    global _current, _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < settings.DISTANCE_MATRIX_CHECK_SECONDS:
+        return _current
+    with _lock:
+        _checked_at = now
+        path = _published(Path(settings.DISTANCE_MATRIX_DIR))
+        if path is None:
+            _current = None
+            return None
+        if _current is None or _current.path != path:
+            try:
+                _current = DistanceMatrix(path)
+            except (OSError, ValueError):
+                logger.exception("Could not load the distance matrix in %s", path)
+        return _current
+
+
+def leg(origin, destination):
+    """The ``Leg`` between two location pks from the current matrix, or None."""
+    matrix = current()
+    return matrix.leg(origin, destination) if matrix is not None else None
+
+
+def estimate(route):
+    """``(distance_km, eta_minutes)`` of a route, rounded for display, or ``(None, None)``."""
+    found = leg(route.pickup_id, route.drop_id)
+    if found is None:
+        return None, None
+    return round(found.distance_km, 1), math.ceil(found.duration_min)
+
+
+def fill_from_coordinates(distance, duration, latitude, longitude):
+    """Great-circle estimates for every pair; NaN where a coordinate is missing."""
+    lat, lng = np.radians(latitude), np.radians(longitude)
+    cos_lat = np.cos(lat)
+    km_factor = 2 * EARTH_RADIUS_KM * settings.DISTANCE_ROAD_FACTOR
+    minutes_per_km = 60 / settings.DISTANCE_AVERAGE_SPEED_KMH
+    for start in range(0, len(lat), ROW_BLOCK):
+        rows = slice(start, start + ROW_BLOCK)
+        a = (
+            np.sin((lat[None, :] - lat[rows, None]) / 2) ** 2
+            + cos_lat[rows, None] * cos_lat[None, :] * np.sin((lng[None, :] - lng[rows, None]) / 2) ** 2
+        )
+        km = km_factor * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        distance[rows] = km
+        duration[rows] = km * minutes_per_km
+
+
+def load_road_graph(path, index):
+    """
+    Adjacency lists ``{row: [(row, minutes, km)]}`` from a CSV of two-way road
+    segments with the columns ``from,to,distance_km,duration_min``, where
+    ``from`` and ``to`` are location names. ``index`` maps names to matrix rows;
+    segments between unknown locations are skipped.
+    """
+    graph, skipped = {}, 0
+    with open(path, newline="") as handle:
+        for line, segment in enumerate(csv.DictReader(handle), start=2):
+            try:
+                a, b = index.get(segment["from"]), index.get(segment["to"])
+                km, minutes = float(segment["distance_km"]), float(segment["duration_min"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{path}, line {line}: expected from,to,distance_km,duration_min") from None
+            if a is None or b is None:
+                skipped += 1
+                continue
+            graph.setdefault(a, []).append((b, minutes, km))
+            graph.setdefault(b, []).append((a, minutes, km))
+    if skipped:
+        logger.warning("Skipped %d road segments between unknown locations in %s", skipped, path)
+    return graph
+
+
+def fill_from_road_graph(distance, duration, graph):
+    """The fastest route over ``graph`` (see ``load_road_graph``) for every connected pair."""
+    for source in graph:
+        best = {source: (0.0, 0.0)}
+        heap = [(0.0, 0.0, source)]
+        while heap:
+            minutes, km, row = heapq.heappop(heap)
+            if minutes > best[row][0]:
+                continue
+            for neighbour, segment_minutes, segment_km in graph[row]:
+                total = minutes + segment_minutes
+                if neighbour not in best or total < best[neighbour][0]:
+                    best[neighbour] = (total, km + segment_km)
+                    heapq.heappush(heap, (total, km + segment_km, neighbour))
+        targets = np.fromiter(best, dtype=np.int64, count=len(best))
+        values = np.array(list(best.values()), dtype=np.float64)
+        duration[source, targets] = values[:, 0]
+        distance[source, targets] = values[:, 1]
+
+
+def _allocate(path, size):
+    # A memmap can't be created empty
+    if not size:
+        np.save(path, np.empty((0, 0), dtype=np.float32))
+        return np.empty((0, 0), dtype=np.float32)
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(size, size))
+
+
+@contextlib.contextmanager
+def _exclusive(root):
+    """Hold the build lock of ``root``, waiting for other processes' builds."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK, "a") as handle:
+        if fcntl is not None:
+            # Released when the file is closed
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        yield
+
+
+def _published(root):
+    """The directory of the published build, or None."""
+    try:
+        return root / (root / POINTER).read_text().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _started(path):
+    """When the build in ``path`` read the locations, in ns (its name starts with it)."""
+    return int(path.name.split("-", 1)[0])
+
+
+def build(road_graph=None):
+    """Compute and publish the matrix for every location. Returns the new ``DistanceMatrix``."""
+    road_graph = settings.DISTANCE_ROAD_GRAPH if road_graph is None else road_graph
+    root = Path(settings.DISTANCE_MATRIX_DIR)
+    with _exclusive(root):
+        target = _build(root, road_graph)
+        _publish(root, target)
+    return DistanceMatrix(target)
+
+
+def _build(root, road_graph):
+    target = root / f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+    rows = list(Location.objects.order_by("pkid").values_list("pkid", "name", "latitude", "longitude"))
+    target.mkdir()
+    try:
+        np.save(target / "locations.npy", np.array([row[0] for row in rows], dtype=np.int64))
+        distance = _allocate(target / "distance_km.npy", len(rows))
+        duration = _allocate(target / "duration_min.npy", len(rows))
+        if rows:
+            coordinates = np.array([(row[2], row[3]) for row in rows], dtype=np.float64)
+            fill_from_coordinates(distance, duration, coordinates[:, 0], coordinates[:, 1])
+            if road_graph:
+                graph = load_road_graph(road_graph, {row[1]: i for i, row in enumerate(rows)})
+                fill_from_road_graph(distance, duration, graph)
+            np.fill_diagonal(distance, 0)
+            np.fill_diagonal(duration, 0)
+            distance.flush()
+            duration.flush()
+        del distance, duration
+        (target / COMPLETE).touch()
+    except BaseException:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+    return target
+
+
+def _publish(root, target):
+    """Point ``CURRENT`` at ``target`` unless a later build is published, then prune. Call under the lock."""
+    global _checked_at
+    published = _published(root)
+    if published is not None and _started(published) > _started(target):
+        logger.warning("Not publishing the distance matrix in %s: %s is newer", target, published)
+    else:
+        staged = root / f".{POINTER}.{uuid.uuid4().hex}"
+        staged.write_text(target.name)
+        os.replace(staged, root / POINTER)
+        published = target
+        with _lock:
+            # This process switches to the new build on its next lookup
+            _checked_at = None
+    # Directories without COMPLETE may still be being written by a build that didn't lock
+    builds = sorted(
+        (path for path in root.iterdir() if path.is_dir() and path != published and (path / COMPLETE).exists()),
+        reverse=True,
+    )
+    for old in builds[KEEP_BUILDS - 1 :]:
+        # Mappings of the removed files stay valid in processes still using them
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def schedule_rebuild():
+    """
+    Rebuild the matrix on a background thread, or inline without
+    ``DISTANCE_MATRIX_IN_BACKGROUND``. Calls made while a rebuild is waiting
+    to start are served by that rebuild.
+    """
+    global _executor, _pending
+    if not settings.DISTANCE_MATRIX_IN_BACKGROUND:
+        build()
+        return
+    with _lock:
+        if _pending:
+            return
+        _pending = True
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="distance-matrix")
+    _executor.submit(_rebuild_in_background)
+
+
+def _rebuild_in_background():
+    global _pending
+    with _lock:
+        # Changes from here on need another build
+        _pending = False
+    try:
+        started = time.perf_counter()
+        matrix = build()
+        logger.info("Rebuilt the %d-location distance matrix in %.1fs", len(matrix), time.perf_counter() - started)
+    except Exception:
+        logger.exception("Distance matrix rebuild failed")
+    finally:
+        close_old_connections()
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+
+from .graph import OPTIMIZE
+
+
+class ItineraryQuerySerializer(serializers.Serializer):
+    origin = serializers.IntegerField(min_value=1)
+    destination = serializers.IntegerField(min_value=1)
+    optimize = serializers.ChoiceField(choices=OPTIMIZE, default="price")
+    max_legs = serializers.IntegerField(min_value=1, max_value=8, required=False)
+
+    def validate(self, attrs):
+        if attrs["origin"] == attrs["destination"]:
+            raise serializers.ValidationError({"destination": ["Must differ from the origin."]})
+        return attrs
@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.vehicle.models import Location, Route
+
+from .graph import graph
+from .matrix import current, schedule_rebuild
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def rebuild_distance_matrix(sender, instance, **kwargs):
+    """
+    Location edits change the matrix and the graph's coordinates. Until
+    ``build_distance_matrix`` has published a first matrix there is none to
+    keep up to date.
+    """
+    if kwargs.get("raw"):
+        return
+    transaction.on_commit(graph.invalidate)
+    if current() is not None:
+        transaction.on_commit(schedule_rebuild)
+
+
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def patch_route_graph(sender, instance, **kwargs):
+    """This process's itinerary searches see route edits as soon as they commit."""
+    if kwargs.get("raw"):
+        return
+    route = instance.pk
+    transaction.on_commit(lambda: graph.patch([route]))
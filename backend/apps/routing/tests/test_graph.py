@@ -0,0 +1,193 @@
+import random
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from apps.events import bus
+from apps.events.models import OutboxEvent
+from apps.routing.graph import graph
+from apps.tracking.geohash import haversine_km
+from apps.vehicle.models import Location, Route
+
+pytestmark = pytest.mark.django_db
+
+SEARCH = "/api/v1/routing/itineraries/"
+
+
+@pytest.fixture(autouse=True)
+def fresh_graph(settings, tmp_path):
+    settings.DISTANCE_MATRIX_DIR = str(tmp_path / "matrix")
+    settings.DISTANCE_MATRIX_CHECK_SECONDS = 0
+    settings.ROUTE_GRAPH_CHECK_SECONDS = 0
+    settings.DISTANCE_ROAD_FACTOR = 1.0
+    settings.DISTANCE_AVERAGE_SPEED_KMH = 60
+    graph.invalidate()
+    yield
+    graph.invalidate()
+
+
+@pytest.fixture
+def network():
+    places = {
+        name: Location.objects.create(name=name, latitude=lat, longitude=lng)
+        for name, lat, lng in [
+            ("Kabul", 34.5553, 69.2075),
+            ("Mazar", 36.7090, 67.1109),
+            ("Herat", 34.3529, 62.2040),
+            ("Kandahar", 31.6133, 65.7101),
+        ]
+    }
+
+    def route(pickup, drop, price):
+        return Route.objects.create(pickup=places[pickup], drop=places[drop], price_af=price)
+
+    routes = {
+        "direct": route("Kabul", "Herat", 3000),
+        "to_mazar": route("Kabul", "Mazar", 800),
+        "mazar_herat": route("Mazar", "Herat", 900),
+        "to_kandahar": route("Kabul", "Kandahar", 500),
+        "kandahar_herat": route("Kandahar", "Herat", 700),
+    }
+    return places, routes
+
+
+def test_cheapest_and_fastest_itineraries(network):
+    places, routes = network
+    kabul, herat = places["Kabul"].pk, places["Herat"].pk
+
+    cheapest = graph.search(kabul, herat, "price")
+    assert [edge.route for edge in cheapest.legs] == [routes["to_kandahar"].pk, routes["kandahar_herat"].pk]
+    assert cheapest.price_af == Decimal("1200.00")
+
+    fastest = graph.search(kabul, herat, "duration")
+    assert [edge.route for edge in fastest.legs] == [routes["direct"].pk]
+    # Coordinate estimate at 60 km/h and no detour factor: a minute per km
+    assert fastest.duration_min == pytest.approx(haversine_km(34.5553, 69.2075, 34.3529, 62.2040))
+
+    assert graph.search(kabul, herat, "price", max_legs=1).legs == fastest.legs
+    assert graph.search(herat, kabul) is None
+
+
+def test_a_star_matches_dijkstra():
+    rng = random.Random(3)
+    places = Location.objects.bulk_create(
+        [Location(name=f"P{i}", latitude=rng.uniform(30, 38), longitude=rng.uniform(61, 74)) for i in range(150)]
+    )
+    pairs = {(rng.randrange(150), rng.randrange(150)) for _ in range(1200)}
+    Route.objects.bulk_create(
+        [
+            Route(pickup=places[a], drop=places[b], price_af=Decimal(rng.randrange(100, 2000)))
+            for a, b in pairs
+            if a != b
+        ]
+    )
+    for optimize in ("price", "duration"):
+        for _ in range(40):
+            origin, destination = rng.sample(places, 2)
+            found = graph.search(origin.pk, destination.pk, optimize)
+            exact = graph.network._search(
+                origin.pk, destination.pk, lambda e: graph_weight(e, optimize), lambda n: 0.0, 4
+            )
+            assert (found is None) == (exact is None)
+            if found is not None:
+                assert cost(found, optimize) == pytest.approx(cost(exact, optimize))
+
+
+def graph_weight(edge, optimize):
+    return float(edge.price_af) if optimize == "price" else edge.duration_min
+
+
+def cost(itinerary, optimize):
+    return float(itinerary.price_af) if optimize == "price" else itinerary.duration_min
+
+
+# Committed for real: the outbox only hands out events once they commit
+@pytest.mark.django_db(transaction=True)
+def test_route_edits_patch_the_loaded_graph(monkeypatch, network):
+    places, routes = network
+    kabul, herat = places["Kabul"].pk, places["Herat"].pk
+    assert len(graph.search(kabul, herat).legs) == 2
+
+    # In this process: patched once the change commits
+    routes["direct"].price_af = 1000
+    routes["direct"].save()
+    assert [edge.route for edge in graph.search(kabul, herat).legs] == [routes["direct"].pk]
+
+    # Elsewhere: only the outbox event reaches this process
+    with monkeypatch.context() as patched:
+        patched.setattr(graph, "patch", lambda routes: None)
+        routes["direct"].delete()
+        Route.objects.create(pickup=places["Kabul"], drop=places["Herat"], price_af=100)
+    itinerary = graph.search(kabul, herat)
+    assert itinerary.price_af == Decimal("100.00") and len(graph.network.routes) == 5
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="emulates PostgreSQL positions on SQLite")
+def test_route_event_committed_after_a_higher_pkid_is_applied(monkeypatch, network):
+    places, routes = network
+    kabul, herat = places["Kabul"].pk, places["Herat"].pk
+
+    # PostgreSQL positions, with txid_visible_in_snapshot() as a SQLite function
+    def visible(txid, position):
+        if txid is None:
+            return None
+        xmin, xmax, in_progress = position.split(":")
+        return txid < int(xmin) or (txid < int(xmax) and str(txid) not in in_progress.split(","))
+
+    connection.ensure_connection()
+    connection.connection.create_function("txid_visible_in_snapshot", 2, visible)
+    head = {"position": "5:5:"}
+    monkeypatch.setattr(bus, "uses_snapshots", lambda using="default": True)
+    monkeypatch.setattr(bus, "outbox_head", lambda using="default": head["position"])
+    assert len(graph.search(kabul, herat).legs) == 2
+
+    def commit(pkid, txid, route):
+        OutboxEvent.objects.create(
+            pkid=pkid, txid=txid, aggregate_type="route", aggregate_id=str(route.pk), event_type="route.updated"
+        )
+
+    # Transaction 5 took pkid 1001 and cuts the direct fare; transaction 6
+    # took 1002 and commits first
+    Route.objects.filter(pk=routes["direct"].pk).update(price_af=100)
+    commit(1002, 6, routes["to_mazar"])
+    head["position"] = "5:7:5"
+    assert len(graph.search(kabul, herat).legs) == 2
+
+    commit(1001, 5, routes["direct"])
+    head["position"] = "7:7:"
+    assert [edge.route for edge in graph.search(kabul, herat).legs] == [routes["direct"].pk]
+
+
+def test_searches_run_on_an_immutable_snapshot(network, django_capture_on_commit_callbacks):
+    places, routes = network
+    kabul, herat = places["Kabul"].pk, places["Herat"].pk
+    graph.search(kabul, herat)
+    before = graph.network
+    edges = {pickup: dict(outgoing) for pickup, outgoing in before.edges.items()}
+    direct = routes["direct"].pk
+
+    with django_capture_on_commit_callbacks(execute=True):
+        routes["direct"].delete()
+        Route.objects.create(pickup=places["Herat"], drop=places["Kabul"], price_af=100)
+    assert graph.network is not before and len(graph.network.routes) == 5
+    assert before.edges == edges and len(before.routes) == 5
+    assert direct in before.routes and direct not in graph.network.routes
+
+
+def test_itinerary_api(client, network):
+    places, routes = network
+    params = {"origin": places["Kabul"].pk, "destination": places["Herat"].pk}
+
+    response = client.get(SEARCH, params)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["optimize"] == "price" and body["price_af"] == "1200.00"
+    assert [leg["drop"]["name"] for leg in body["legs"]] == ["Kandahar", "Herat"]
+    assert body["legs"][0]["price_af"] == "500.00"
+    assert body["eta_minutes"] >= sum(leg["eta_minutes"] for leg in body["legs"]) - 1
+    assert client.get(SEARCH, dict(params, optimize="duration")).json()["legs"][0]["route"] == routes["direct"].pk
+
+    assert client.get(SEARCH, {"origin": places["Herat"].pk, "destination": places["Kabul"].pk}).status_code == 404
+    assert client.get(SEARCH, {"origin": 1, "destination": 1}).status_code == 400
+    assert client.get(SEARCH, dict(params, optimize="scenic")).status_code == 400
@@ -0,0 +1,158 @@
+import io
+import math
+import threading
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.routing import matrix
+from apps.tracking.geohash import haversine_km
+from apps.users.factories import PassengerFactory
+from apps.vehicle.models import Location, Route
+
+pytestmark = pytest.mark.django_db
+
+KABUL = (34.5553, 69.2075)
+HERAT = (34.3529, 62.2040)
+
+
+@pytest.fixture(autouse=True)
+def matrix_dir(settings, tmp_path):
+    settings.DISTANCE_MATRIX_DIR = str(tmp_path / "matrix")
+    settings.DISTANCE_MATRIX_CHECK_SECONDS = 0
+    settings.DISTANCE_MATRIX_IN_BACKGROUND = False
+    settings.DISTANCE_ROAD_GRAPH = ""
+    settings.DISTANCE_ROAD_FACTOR = 1.0
+    settings.DISTANCE_AVERAGE_SPEED_KMH = 60
+    return tmp_path
+
+
+@pytest.fixture
+def places():
+    return {
+        "kabul": Location.objects.create(name="Kabul", latitude=KABUL[0], longitude=KABUL[1]),
+        "herat": Location.objects.create(name="Herat", latitude=HERAT[0], longitude=HERAT[1]),
+        "nowhere": Location.objects.create(name="Nowhere"),
+    }
+
+
+def test_coordinates_give_great_circle_legs(places):
+    assert matrix.leg(places["kabul"].pk, places["herat"].pk) is None
+    built = matrix.build()
+
+    assert len(built) == 3
+    assert built.distance_km.dtype == np.float32 and isinstance(built.distance_km, np.memmap)
+    found = matrix.leg(places["kabul"].pk, places["herat"].pk)
+    assert found.distance_km == pytest.approx(haversine_km(*KABUL, *HERAT), rel=1e-5)
+    # 60 km/h: one minute per km
+    assert found.duration_min == pytest.approx(found.distance_km, rel=1e-5)
+    assert matrix.leg(places["herat"].pk, places["kabul"].pk) == found
+    assert matrix.leg(places["kabul"].pk, places["kabul"].pk) == (0, 0)
+    assert matrix.leg(places["kabul"].pk, places["nowhere"].pk) is None
+
+
+def test_road_graph_overrides_connected_pairs(places, tmp_path):
+    mazar = Location.objects.create(name="Mazar", latitude=36.7090, longitude=67.1109)
+    bamyan = Location.objects.create(name="Bamyan", latitude=34.8213, longitude=67.8210)
+    roads = tmp_path / "roads.csv"
+    roads.write_text(
+        "from,to,distance_km,duration_min\n"
+        "Kabul,Mazar,420,540\n"
+        "Mazar,Herat,650,720\n"
+        "Kabul,Herat,1000,1500\n"
+        "Kabul,Kandahar,480,600\n"
+    )
+    matrix.build(road_graph=str(roads))
+
+    # Fastest is through Mazar; Kandahar isn't a location and is skipped
+    assert matrix.leg(places["kabul"].pk, places["herat"].pk) == (1070, 1260)
+    assert matrix.leg(places["herat"].pk, mazar.pk) == (650, 720)
+    # No road to Bamyan, but coordinates: the great-circle estimate stays
+    assert matrix.leg(places["kabul"].pk, bamyan.pk).distance_km == pytest.approx(
+        haversine_km(*KABUL, 34.8213, 67.8210), rel=1e-5
+    )
+    assert matrix.leg(places["kabul"].pk, places["nowhere"].pk) is None
+
+    roads.write_text("from,to,distance_km\nKabul,Herat,1\n")
+    with pytest.raises(ValueError, match="line 2"):
+        matrix.build(road_graph=str(roads))
+
+
+def test_publishing_switches_readers_and_prunes_old_builds(places, matrix_dir):
+    first = matrix.build()
+    assert matrix.current().path == first.path
+    for _ in range(3):
+        latest = matrix.build()
+    assert matrix.current().path == latest.path
+    builds = sorted(path for path in (matrix_dir / "matrix").iterdir() if path.is_dir())
+    assert len(builds) == matrix.KEEP_BUILDS and latest.path in builds and first.path not in builds
+
+
+def test_stale_and_unfinished_builds_never_replace_or_lose_newer_ones(places, matrix_dir):
+    root = matrix_dir / "matrix"
+    first = matrix.build()
+    # Another process, without the lock, has started writing a build
+    unfinished = root / f"{matrix._started(first.path) + 1}-unfinished"
+    unfinished.mkdir()
+    latest = matrix.build()
+
+    # A build that read the locations before the published one finishes last
+    matrix._publish(root, first.path)
+    assert matrix._published(root) == latest.path
+    for _ in range(3):
+        matrix.build()
+    assert unfinished.is_dir()
+
+
+@pytest.mark.skipif(matrix.fcntl is None, reason="needs fcntl")
+def test_builds_wait_for_the_lock(matrix_dir):
+    root = matrix_dir / "matrix"
+    acquired = threading.Event()
+
+    def other_build():
+        with matrix._exclusive(root):
+            acquired.set()
+
+    with matrix._exclusive(root):
+        thread = threading.Thread(target=other_build)
+        thread.start()
+        assert not acquired.wait(0.2)
+    assert acquired.wait(5)
+    thread.join()
+
+
+def test_location_edits_rebuild_once_a_matrix_exists(places, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        Location.objects.create(name="Ignored", latitude=1, longitude=1)
+    assert matrix.schedule_rebuild not in callbacks
+
+    matrix.build()
+    with django_capture_on_commit_callbacks(execute=True):
+        places["nowhere"].latitude, places["nowhere"].longitude = 31.6133, 65.7101
+        places["nowhere"].save()
+    assert matrix.leg(places["kabul"].pk, places["nowhere"].pk).distance_km == pytest.approx(
+        haversine_km(*KABUL, 31.6133, 65.7101), rel=1e-5
+    )
+
+
+def test_routes_and_new_trips_carry_distance_and_eta(client, places):
+    route = Route.objects.create(pickup=places["kabul"], drop=places["herat"], price_af=900)
+    blind = Route.objects.create(pickup=places["kabul"], drop=places["nowhere"], price_af=100)
+    call_command("build_distance_matrix", stdout=io.StringIO())
+    expected = haversine_km(*KABUL, *HERAT)
+
+    listing = {row["pk"]: row for row in client.get("/api/v1/vehicle/vehicle/routes/").json()}
+    assert listing[route.pk]["distance_km"] == round(expected, 1)
+    assert listing[route.pk]["eta_minutes"] == math.ceil(expected)
+    assert listing[blind.pk]["distance_km"] is None and listing[blind.pk]["eta_minutes"] is None
+    projected = client.get("/api/v1/vehicle/vehicle/routes/?fields=pk,eta_minutes").json()
+    assert {row["pk"]: row["eta_minutes"] for row in projected}[route.pk] == math.ceil(expected)
+
+    passenger = PassengerFactory()
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(passenger).access_token}"}
+    trip = client.post("/api/v1/vehicle/trips/", {"route_id": route.pk}, **headers).json()
+    assert trip["distance_km"] == round(expected, 1) and trip["eta_minutes"] == math.ceil(expected)
+    trip = client.post("/api/v1/vehicle/trips/", {"route_id": blind.pk, "distance_km": 12}, **headers).json()
+    assert trip["distance_km"] == 12 and trip["eta_minutes"] is None
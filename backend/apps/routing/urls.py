@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import ItinerarySearchView
+
+urlpatterns = [
+    path("itineraries/", ItinerarySearchView.as_view(), name="itinerary-search"),
+]
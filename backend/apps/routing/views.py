@@ -0,0 +1,65 @@
+import math
+
+from rest_framework.exceptions import NotFound
+from rest_framework.fields import DecimalField
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.vehicle.models import Location
+
+from .graph import graph
+from .serializers import ItineraryQuerySerializer
+
+_price = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _rounded(distance_km, duration_min):
+    return (
+        None if distance_km is None else round(distance_km, 1),
+        None if duration_min is None else math.ceil(duration_min),
+    )
+
+
+class ItinerarySearchView(APIView):
+    """
+    The cheapest (``?optimize=price``) or fastest (``?optimize=duration``)
+    chain of routes from ``?origin=`` to ``?destination=`` (location pks), of
+    at most ``?max_legs=`` legs. 404 when no chain connects them.
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, format=None):
+        query = ItineraryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        itinerary = graph.search(params["origin"], params["destination"], params["optimize"], params.get("max_legs"))
+        if itinerary is None:
+            raise NotFound("No itinerary connects these locations.")
+
+        stops = {edge.pickup for edge in itinerary.legs} | {edge.drop for edge in itinerary.legs}
+        names = dict(Location.objects.filter(pkid__in=stops).values_list("pkid", "name"))
+        legs = []
+        for edge in itinerary.legs:
+            distance_km, eta_minutes = _rounded(edge.distance_km, edge.duration_min)
+            legs.append(
+                {
+                    "route": edge.route,
+                    "pickup": {"pk": edge.pickup, "name": names.get(edge.pickup)},
+                    "drop": {"pk": edge.drop, "name": names.get(edge.drop)},
+                    "price_af": _price.to_representation(edge.price_af),
+                    "distance_km": distance_km,
+                    "eta_minutes": eta_minutes,
+                }
+            )
+        distance_km, eta_minutes = _rounded(itinerary.distance_km, itinerary.duration_min)
+        return Response(
+            {
+                "optimize": params["optimize"],
+                "price_af": _price.to_representation(itinerary.price_af),
+                "distance_km": distance_km,
+                "eta_minutes": eta_minutes,
+                "legs": legs,
+            }
+        )
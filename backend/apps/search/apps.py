@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.search"
+    verbose_name = _("Search")
+
+    def ready(self):
+        from apps.events import bus
+        from apps.search import index
+
+        post_migrate.connect(index.install_after_migrate, sender=self)
+        bus.register("search-index", index.handle_events, aggregate_types=[*index.SOURCES, *index.DEPENDENTS])
@@ -0,0 +1,21 @@
+from django.db import connections
+from rest_framework.filters import SearchFilter
+
+from . import index
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    ``?search=`` answered from the full-text index rather than ``icontains``
+    over ``search_fields``, which stay in use on databases without a
+    full-text engine. The view sets ``search_kind`` to the ``index.SOURCES``
+    key of the documents to match and, when its rows are not those objects,
+    ``search_path`` to the lookup from a row to the object's pk.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, "")
+        if not index.terms(term) or connections[queryset.db].vendor not in ("sqlite", "postgresql"):
+            return super().filter_queryset(request, queryset, view)
+        documents = index.matching(term, [view.search_kind], queryset.db).values("object_pk")
+        return queryset.filter(**{f"{getattr(view, 'search_path', 'pk')}__in": documents})
@@ -0,0 +1,314 @@
+"""
+Full-text search over users, vehicles and trips for the admin console.
+
+Each object is flattened into a ``SearchDocument``. On SQLite an FTS5 table
+indexes those rows through triggers; on PostgreSQL a generated ``tsvector``
+column with a GIN index does. Other databases fall back to ``icontains`` on
+the documents. The ``search-index`` outbox consumer refreshes the documents
+of changed objects, and of the objects whose documents copy from them (see
+``DEPENDENTS``), and ``rebuild_search_index`` recreates them all.
+"""
+import logging
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from apps.users.models import User
+from apps.vehicle.archive import TripHistory
+from apps.vehicle.models import ArchivedTrip, Trip, Vehicle
+
+from .models import SearchDocument
+
+logger = logging.getLogger(__name__)
+
+TABLE = SearchDocument._meta.db_table
+FTS_TABLE = TABLE + "_fts"
+
+SQLITE_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"kind, title, body, content='{TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, kind, title, body) "
+    "VALUES ('delete', old.id, old.kind, old.title, old.body); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_au AFTER UPDATE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, kind, title, body) "
+    "VALUES ('delete', old.id, old.kind, old.title, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, kind, title, body) VALUES (new.id, new.kind, new.title, new.body); END",
+]
+
+# Punctuation is replaced with spaces so emails and plate numbers split into
+# the same words as ``terms()`` produces for a query
+POSTGRES_SCHEMA = [
+    f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', regexp_replace(title, '\\W+', ' ', 'g')), 'A') || "
+    "setweight(to_tsvector('simple', regexp_replace(body, '\\W+', ' ', 'g')), 'B')) STORED",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_vector_idx ON {TABLE} USING gin (vector)",
+]
+
+
+def user_document(user):
+    return user.get_full_name, f"{user.email} {user.username or ''} {user.get_role_display()}"
+
+
+def vehicle_document(vehicle):
+    return vehicle.plate_number, f"{vehicle.model} {vehicle.get_type_display()} {vehicle.driver.get_full_name}"
+
+
+def trip_document(trip):
+    title = f"{trip.route.pickup} ➜ {trip.route.drop} - {trip.passenger.get_full_name}"
+    driver = trip.driver.get_full_name if trip.driver_id else ""
+    body = " ".join([trip.passenger.email, driver, trip.get_status_display(), trip.notes_for_driver])
+    return title, body
+
+
+def _users():
+    return [User.objects.all()]
+
+
+def _vehicles():
+    return [Vehicle.objects.select_related("driver")]
+
+
+def _trips():
+    # Archived trips keep their pkid, so their documents survive archival
+    return [Trip.objects.select_related(*TripHistory.related), ArchivedTrip.objects.select_related(*TripHistory.related)]
+
+
+# kind (the outbox aggregate name) -> (querysets to load objects from, document builder)
+SOURCES = {
+    "user": (_users, user_document),
+    "vehicle": (_vehicles, vehicle_document),
+    "trip": (_trips, trip_document),
+}
+
+
+# aggregate -> (kind, filter on that kind's querysets) for the documents that
+# copy a name from the aggregate. A deletion can cascade without events, so
+# it sweeps the kind for documents whose object is gone.
+DEPENDENTS = {
+    "user": [
+        ("vehicle", lambda pks: Q(driver__in=pks)),
+        ("trip", lambda pks: Q(passenger__in=pks) | Q(driver__in=pks)),
+    ],
+    "location": [("trip", lambda pks: Q(route__pickup__in=pks) | Q(route__drop__in=pks))],
+    "route": [("trip", lambda pks: Q(route__in=pks))],
+}
+
+
+def install(using="default"):
+    """
+    Create the full-text index on the ``using`` database. Safe to run again;
+    returns False when the database has no supported full-text engine.
+    """
+    connection = connections[using]
+    schema = {"sqlite": SQLITE_SCHEMA, "postgresql": POSTGRES_SCHEMA}.get(connection.vendor)
+    if schema is None:
+        logger.warning("No full-text index for %s, search falls back to icontains", connection.vendor)
+        return False
+    with connection.cursor() as cursor:
+        for statement in schema:
+            cursor.execute(statement)
+    return True
+
+
+def install_after_migrate(using="default", **kwargs):
+    install(using)
+
+
+def _store(kind, objects, using):
+    """Insert or update the documents of ``objects``, a ``{pk: instance}`` dict."""
+    build = SOURCES[kind][1]
+    documents = SearchDocument.objects.using(using)
+    existing = {d.object_pk: d for d in documents.filter(kind=kind, object_pk__in=list(objects))}
+    created, changed = [], []
+    for pk, instance in objects.items():
+        title, body = build(instance)
+        title = title[:255]
+        document = existing.get(pk)
+        if document is None:
+            created.append(SearchDocument(kind=kind, object_pk=pk, object_id=instance.id, title=title, body=body))
+        elif (document.title, document.body) != (title, body):
+            document.title, document.body = title, body
+            changed.append(document)
+    documents.bulk_create(created)
+    documents.bulk_update(changed, ["title", "body"])
+
+
+def index_objects(kind, pks, using="default"):
+    """Refresh the documents of the ``kind`` objects ``pks``, dropping those that no longer exist."""
+    missing = set(pks)
+    found = {}
+    for queryset in SOURCES[kind][0]():
+        if not missing:
+            break
+        for instance in queryset.using(using).filter(pk__in=missing):
+            found[instance.pk] = instance
+        missing -= set(found)
+    with transaction.atomic(using=using):
+        _store(kind, found, using)
+        if missing:
+            SearchDocument.objects.using(using).filter(kind=kind, object_pk__in=missing).delete()
+
+
+def dependents(aggregate, pks, using="default"):
+    """``{kind: pks}`` of the objects whose documents copy from the ``aggregate`` objects ``pks``."""
+    found = defaultdict(set)
+    for kind, related in DEPENDENTS.get(aggregate, ()):
+        for queryset in SOURCES[kind][0]():
+            found[kind].update(queryset.using(using).filter(related(pks)).values_list("pk", flat=True))
+    return found
+
+
+def sweep(kind, using="default"):
+    """Drop the ``kind`` documents whose object no longer exists. Returns how many."""
+    documents = SearchDocument.objects.using(using).filter(kind=kind)
+    for queryset in SOURCES[kind][0]():
+        documents = documents.exclude(object_pk__in=queryset.using(using).values("pk"))
+    return documents.delete()[0]
+
+
+def handle_events(events, batch_size=2000):
+    """
+    The ``search-index`` consumer: refresh every object touched by ``events``
+    and the documents that copy from them.
+    """
+    changed, deleted = defaultdict(set), set()
+    for event in events:
+        # Route assignments change no document
+        if "m2m" in event.payload:
+            continue
+        changed[event.aggregate_type].add(int(event.aggregate_id))
+        if event.event_type.endswith(".deleted"):
+            deleted.update(kind for kind, _ in DEPENDENTS.get(event.aggregate_type, ()))
+    pks = defaultdict(set)
+    for aggregate, ids in changed.items():
+        if aggregate in SOURCES:
+            pks[aggregate].update(ids)
+        for kind, related in dependents(aggregate, ids).items():
+            pks[kind].update(related)
+    for kind, ids in pks.items():
+        ids = sorted(ids)
+        for start in range(0, len(ids), batch_size):
+            index_objects(kind, ids[start:start + batch_size])
+    for kind in deleted:
+        sweep(kind)
+
+
+def rebuild(kinds=None, batch_size=2000, using="default"):
+    """Recreate the documents of ``kinds`` (default: all). Returns ``{kind: documents}``."""
+    install(using)
+    counts = {}
+    for kind in kinds or SOURCES:
+        counts[kind] = 0
+        with transaction.atomic(using=using):
+            SearchDocument.objects.using(using).filter(kind=kind).delete()
+            for queryset in SOURCES[kind][0]():
+                queryset = queryset.using(using).order_by("pk")
+                batch = list(queryset[:batch_size])
+                while batch:
+                    _store(kind, {instance.pk: instance for instance in batch}, using)
+                    counts[kind] += len(batch)
+                    batch = list(queryset.filter(pk__gt=batch[-1].pk)[:batch_size])
+    return counts
+
+
+def terms(query):
+    """
+    The lower-cased words of ``query``. The last one is matched as a prefix and
+    the others as whole words, as in search-as-you-type: a prefix has to be
+    expanded to every indexed word it starts, which for a short or common
+    prefix such as "com" in an email is most of the index.
+    """
+    return re.findall(r"\w+", query.lower())[: settings.SEARCH_MAX_TERMS]
+
+
+def _sqlite_match(words, kinds):
+    match = "{title body} : (" + " AND ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*']) + ")"
+    if kinds:
+        match += " AND kind : (" + " OR ".join(f'"{kind}"' for kind in kinds) + ")"
+    return match
+
+
+def _postgres_query(words):
+    return " & ".join(words[:-1] + [f"{words[-1]}:*"])
+
+
+def _ranked_sqlite(words, kinds, limit, using):
+    # Title matches outrank body matches; kind is only used as a filter.
+    # bm25() is lower for better matches.
+    rank = f"bm25({FTS_TABLE}, 0.0, 10.0, 1.0)"
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, -{rank} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY {rank}, rowid DESC LIMIT %s",
+            [_sqlite_match(words, kinds), limit],
+        )
+        return cursor.fetchall()
+
+
+def _ranked_postgres(words, kinds, limit, using):
+    sql = f"SELECT id, ts_rank(vector, query) AS rank FROM {TABLE}, to_tsquery('simple', %s) query WHERE vector @@ query"
+    params = [_postgres_query(words)]
+    if kinds:
+        sql += " AND kind = ANY(%s)"
+        params.append(list(kinds))
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql + " ORDER BY rank DESC, id DESC LIMIT %s", params + [limit])
+        return cursor.fetchall()
+
+
+RANKERS = {"sqlite": _ranked_sqlite, "postgresql": _ranked_postgres}
+
+
+def search(query, kinds=None, limit=20, using="default"):
+    """
+    Documents matching every word of ``query`` (see ``terms``), optionally only of
+    the given ``kinds``, best match first. Each carries a ``score`` (higher is
+    better, None on the ``icontains`` fallback); equal scores come newest first.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    vendor = connections[using].vendor
+    if vendor in ("sqlite", "postgresql"):
+        ranked = RANKERS[vendor](words, kinds, limit, using)
+    else:
+        documents = matching(query, kinds, using).order_by("-pk")
+        ranked = [(pk, None) for pk in documents.values_list("pk", flat=True)[:limit]]
+
+    documents = SearchDocument.objects.using(using).in_bulk([pk for pk, _ in ranked])
+    results = []
+    for pk, score in ranked:
+        if pk in documents:
+            documents[pk].score = score
+            results.append(documents[pk])
+    return results
+
+
+def matching(query, kinds=None, using="default"):
+    """
+    Every ``SearchDocument`` matching ``query`` as ``search()`` does, unranked
+    and unlimited, as a queryset that can serve as a subquery.
+    """
+    documents = SearchDocument.objects.using(using)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    words = terms(query)
+    if not words:
+        return documents.none()
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        return documents.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                                              [_sqlite_match(words, kinds)]))
+    if vendor == "postgresql":
+        return documents.filter(RawSQL("vector @@ to_tsquery('simple', %s)", [_postgres_query(words)],
+                                       output_field=BooleanField()))
+    for word in words:
+        documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return documents
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.search import index
+
+
+class Command(BaseCommand):
+    help = "Recreate the admin search documents and full-text index."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            action="append",
+            dest="kinds",
+            help=f"Only rebuild this kind ({', '.join(index.SOURCES)}); can be repeated.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        unknown = set(options["kinds"] or ()) - set(index.SOURCES)
+        if unknown:
+            raise CommandError(f"Unknown kind(s): {', '.join(sorted(unknown))}")
+        counts = index.rebuild(options["kinds"], batch_size=options["batch_size"])
+        for kind, count in counts.items():
+            self.stdout.write(f"Indexed {count} {kind} documents.")
@@ -0,0 +1,26 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of one user, vehicle or trip. The full-text index over
+    ``title`` and ``body`` lives next to this table (see ``apps.search.index``)
+    and is kept in step with it by the database.
+    """
+
+    kind = models.CharField(verbose_name=_("kind"), max_length=20)
+    object_pk = models.BigIntegerField()
+    object_id = models.UUIDField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = _("search document")
+        verbose_name_plural = _("search documents")
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_pk"], name="unique_search_document"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_pk} {self.title}"
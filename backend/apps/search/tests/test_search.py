@@ -0,0 +1,158 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import RequestFactory
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.events import bus
+from apps.search import index
+from apps.search.models import SearchDocument
+from apps.search.views import AdminSearchView
+from apps.users.admin import UserAdmin
+from apps.users.factories import UserFactory
+from apps.users.models import User
+from apps.vehicle.archive import archive_trips
+from apps.vehicle.models import Location, Route, Trip, Vehicle
+
+# Committed for real: on PostgreSQL an event is only past the outbox position
+# once its transaction commits, so sync() can't see uncommitted test data
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def route():
+    return Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"),
+        drop=Location.objects.create(name="Herat"),
+        price_af=500,
+    )
+
+
+def sync():
+    bus.dispatch(names=["search-index"])
+
+
+def found(query, kinds=None):
+    return [(document.kind, document.object_pk) for document in index.search(query, kinds)]
+
+
+def test_changes_reach_the_index_through_the_outbox(route):
+    driver = UserFactory(role="driver", first_name="Zarghuna", last_name="Ahmadi")
+    vehicle = Vehicle.objects.create(
+        driver=driver, model="Corolla", plate_number="KBL-4711", license="license/a.jpg", type="economy"
+    )
+    trip = Trip.objects.create(passenger=UserFactory(), driver=driver, route=route, notes_for_driver="Blue gate")
+    sync()
+
+    assert set(found("zargh")) == {("user", driver.pkid), ("vehicle", vehicle.pkid), ("trip", trip.pkid)}
+    assert found("kbl 4711") == [("vehicle", vehicle.pkid)]
+    assert found("blue gate", ["trip"]) == [("trip", trip.pkid)]
+    assert found("zargh", ["user"]) == [("user", driver.pkid)]
+
+    driver.first_name = "Mina"
+    driver.save()
+    vehicle.delete()
+    sync()
+    assert found("zargh", ["user"]) == []
+    assert found("mina", ["user"]) == [("user", driver.pkid)]
+    assert found("kbl") == []
+
+
+def test_title_matches_rank_first(route):
+    trip = Trip.objects.create(passenger=UserFactory(), route=route, notes_for_driver="Gulbahar street")
+    titled = UserFactory(first_name="Gulbahar", last_name="Khan")
+    sync()
+    assert found("gulbahar") == [("user", titled.pkid), ("trip", trip.pkid)]
+
+
+def test_the_best_match_is_found_however_many_newer_matches_there_are(route):
+    titled = UserFactory(first_name="Gulbahar")
+    for _ in range(5):
+        Trip.objects.create(passenger=UserFactory(), route=route, notes_for_driver="Gulbahar")
+    sync()
+    assert [(document.kind, document.object_pk) for document in index.search("gulbahar", limit=1)] == [
+        ("user", titled.pkid)
+    ]
+
+
+def test_renames_reach_the_documents_that_copy_them(route):
+    driver = UserFactory(role="driver", first_name="Zarghuna")
+    passenger = UserFactory(first_name="Shabnam")
+    vehicle = Vehicle.objects.create(
+        driver=driver, model="Corolla", plate_number="KBL-4711", license="license/a.jpg", type="economy"
+    )
+    trip = Trip.objects.create(passenger=passenger, driver=driver, route=route)
+    sync()
+
+    driver.first_name = "Mina"
+    driver.save()
+    passenger.first_name = "Laila"
+    passenger.save()
+    route.pickup.name = "Mazar"
+    route.pickup.save()
+    sync()
+    assert found("zarghuna") == found("shabnam") == found("kabul") == []
+    assert set(found("mina")) == {("user", driver.pkid), ("vehicle", vehicle.pkid), ("trip", trip.pkid)}
+    assert found("laila", ["trip"]) == found("mazar") == [("trip", trip.pkid)]
+
+    route.drop = Location.objects.create(name="Kandahar")
+    route.save()
+    sync()
+    assert found("herat") == []
+    assert found("kandahar") == [("trip", trip.pkid)]
+
+    # Deleting the route cascades to its trips without events of their own
+    route.delete()
+    sync()
+    assert found("laila", ["trip"]) == []
+
+
+def test_archived_trips_stay_searchable(route):
+    trip = Trip.objects.create(passenger=UserFactory(), route=route, status="completed", notes_for_driver="Fragile")
+    sync()
+    archive_trips(before=trip.updated_at.replace(year=trip.updated_at.year + 1))
+    sync()
+    assert found("fragile") == [("trip", trip.pkid)]
+
+
+def test_rebuild_command(route):
+    user = UserFactory(first_name="Parwana")
+    SearchDocument.objects.all().delete()
+    out = StringIO()
+    call_command("rebuild_search_index", kinds=["user"], stdout=out)
+    assert "user documents" in out.getvalue()
+    assert found("parwana") == [("user", user.pkid)]
+
+
+def test_admin_search_api():
+    admin = UserFactory(role="admin")
+    passenger = UserFactory(first_name="Soraya", email="soraya@example.com")
+    sync()
+
+    def get(**params):
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user=admin)
+        return AdminSearchView.as_view()(request)
+
+    response = get(q="soraya@example.com", type="user")
+    assert response.status_code == 200
+    assert [(row["type"], row["id"]) for row in response.data["results"]] == [("user", passenger.id)]
+    assert get(q="", type="user").data["results"] == []
+    assert get(q="soraya", type="bicycle").status_code == 400
+
+
+def test_admin_changelist_search_uses_the_index():
+    user = UserFactory(first_name="Nilofar")
+    UserFactory(first_name="Other")
+    sync()
+    model_admin = UserAdmin(User, None)
+    request = RequestFactory().get("/")
+    queryset, duplicates = model_admin.get_search_results(request, User.objects.all(), "nilo")
+    assert list(queryset) == [user] and duplicates is False
+
+    # Not capped: every match is listed
+    many = {UserFactory(first_name="Nilab").pk for _ in range(3)}
+    sync()
+    queryset, _ = model_admin.get_search_results(request, User.objects.all(), "nila")
+    assert set(queryset.values_list("pk", flat=True)) == many
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import AdminSearchView
+
+urlpatterns = [
+    path("admin/search/", AdminSearchView.as_view(), name="admin-search"),
+]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.vehicle.permissions import IsAdmin
+
+from . import index
+
+
+class AdminSearchView(APIView):
+    """
+    ``?q=ahmad kbl&type=user,vehicle&limit=20``: users, vehicles and trips
+    whose name, email, plate number, route or driver notes start with every
+    word of ``q``, best match first.
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, format=None):
+        query = request.query_params.get("q", "")
+        kinds = [kind for kind in request.query_params.get("type", "").split(",") if kind]
+        unknown = set(kinds) - set(index.SOURCES)
+        if unknown:
+            raise ValidationError({"type": [f"Unknown type(s): {', '.join(sorted(unknown))}"]})
+        try:
+            limit = min(int(request.query_params.get("limit", 20)), settings.SEARCH_MAX_RESULTS)
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+
+        results = [
+            {
+                "type": document.kind,
+                "id": document.object_id,
+                "pkid": document.object_pk,
+                "title": document.title,
+                "body": document.body,
+                "score": document.score,
+            }
+            for document in index.search(query, kinds, max(limit, 1))
+        ]
+        return Response({"query": query, "results": results})
@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from .models import DriverLocation
+
+
+class DriverLocationAdmin(admin.ModelAdmin):
+    list_display = ["pkid", "driver", "latitude", "longitude", "speed_kmh", "recorded_at"]
+    list_select_related = ["driver"]
+    raw_id_fields = ["driver"]
+    date_hierarchy = "recorded_at"
+
+
+admin.site.register(DriverLocation, DriverLocationAdmin)
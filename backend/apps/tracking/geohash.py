@@ -0,0 +1,81 @@
+"""
+Geohash cells. A geohash of ``precision`` characters interleaves
+``5 * precision`` bits of longitude and latitude (longitude first), so nearby
+points share a prefix and a cell is a fixed-size lat/lng rectangle: about
+4.9 x 4.9 km at precision 5 on the equator.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def _bits(precision):
+    total = 5 * precision
+    return total - total // 2, total // 2  # longitude, latitude
+
+
+def cell_size(precision):
+    """``(lat_degrees, lng_degrees)`` of one cell."""
+    lng_bits, lat_bits = _bits(precision)
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def encode(lat, lng, precision=5):
+    lng_bits, lat_bits = _bits(precision)
+    x = min(int((lng + 180.0) / 360.0 * (1 << lng_bits)), (1 << lng_bits) - 1)
+    y = min(int((lat + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    code = 0
+    for k in range(lng_bits + lat_bits):
+        # Even bits are longitude, odd bits latitude, most significant first
+        if k % 2 == 0:
+            lng_bits -= 1
+            code = (code << 1) | ((x >> lng_bits) & 1)
+        else:
+            lat_bits -= 1
+            code = (code << 1) | ((y >> lat_bits) & 1)
+    chars = []
+    for _ in range(precision):
+        chars.append(BASE32[code & 31])
+        code >>= 5
+    return "".join(reversed(chars))
+
+
+def decode(geohash):
+    """The centre ``(lat, lng)`` of a cell."""
+    lng_bits, lat_bits = _bits(len(geohash))
+    code = 0
+    for char in geohash:
+        code = (code << 5) | BASE32.index(char)
+    total = lng_bits + lat_bits
+    x = y = 0
+    for k in range(total):
+        bit = (code >> (total - 1 - k)) & 1
+        if k % 2 == 0:
+            x = (x << 1) | bit
+        else:
+            y = (y << 1) | bit
+    lat_size, lng_size = cell_size(len(geohash))
+    return -90.0 + (y + 0.5) * lat_size, -180.0 + (x + 0.5) * lng_size
+
+
+def ring(lat, lng, radius, precision=5):
+    """The cells ``radius`` steps away from the cell of ``(lat, lng)``: its border at that distance."""
+    if radius == 0:
+        return {encode(lat, lng, precision)}
+    lat_size, lng_size = cell_size(precision)
+    cells = set()
+    for i in range(-radius, radius + 1):
+        for j in (-radius, radius) if abs(i) != radius else range(-radius, radius + 1):
+            cell_lat = lat + i * lat_size
+            if -90.0 <= cell_lat <= 90.0:
+                cell_lng = (lng + j * lng_size + 180.0) % 360.0 - 180.0
+                cells.add(encode(cell_lat, cell_lng, precision))
+    return cells
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
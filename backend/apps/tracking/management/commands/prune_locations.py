@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.tracking.models import DriverLocation
+
+
+class Command(BaseCommand):
+    help = "Delete driver location history older than the retention window, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention window in days (default: LOCATION_HISTORY_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.LOCATION_HISTORY_DAYS
+        old = DriverLocation.objects.filter(recorded_at__lt=timezone.now() - timedelta(days=days))
+        deleted = 0
+        while True:
+            # Short deletes keep the table writable for the flusher
+            pks = list(old.order_by("pkid").values_list("pkid", flat=True)[: options["batch_size"]])
+            if not pks:
+                break
+            deleted += DriverLocation.objects.filter(pkid__in=pks).delete()[0]
+        self.stdout.write(f"Deleted {deleted} driver locations.")
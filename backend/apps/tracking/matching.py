@@ -0,0 +1,55 @@
+"""
+Driver-to-pickup distances for the trip board and trip acceptance, from the
+drivers' live positions and the pickup ``Location`` coordinates. Trips
+whose pickup has no coordinates, and drivers without a fresh position, are
+never penalised.
+"""
+from django.conf import settings
+
+from apps.vehicle.models import Route, Trip
+
+from .geohash import haversine_km
+from .store import store
+
+
+def pickup_points(trip_pks):
+    """``{trip pk: (latitude, longitude)}`` of the pickups that have coordinates."""
+    rows = Trip.objects.filter(
+        pk__in=trip_pks, route__pickup__latitude__isnull=False, route__pickup__longitude__isnull=False
+    ).values_list("pk", "route__pickup__latitude", "route__pickup__longitude")
+    return {pk: (latitude, longitude) for pk, latitude, longitude in rows}
+
+
+def nearest_first(trips, driver):
+    """
+    ``trips`` ordered by the distance from ``driver``'s live position to
+    their pickup; trips without a known distance follow in their original
+    order. Unchanged when the driver's position is unknown.
+    """
+    position = store.position(driver)
+    if position is None or not trips:
+        return trips
+    points = pickup_points([trip.pk for trip in trips])
+
+    def key(item):
+        index, trip = item
+        point = points.get(trip.pk)
+        if point is None:
+            return (1, index)
+        return (0, haversine_km(position.latitude, position.longitude, *point))
+
+    return [trip for _, trip in sorted(enumerate(trips), key=key)]
+
+
+def too_far_to_accept(driver, route_id):
+    """Whether ``driver`` is farther than ``LOCATION_ACCEPT_RADIUS_KM`` from the pickup of ``route_id``."""
+    limit = settings.LOCATION_ACCEPT_RADIUS_KM
+    if not limit or store.position(driver) is None:
+        return False
+    point = Route.objects.filter(
+        pk=route_id, pickup__latitude__isnull=False, pickup__longitude__isnull=False
+    ).values_list("pickup__latitude", "pickup__longitude").first()
+    if point is None:
+        return False
+    distance = store.distance_km(driver, *point)
+    return distance is not None and distance > limit
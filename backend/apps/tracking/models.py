@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class DriverLocation(models.Model):
+    """
+    One location ping of a driver. Written in bulk by ``LocationStore.flush``,
+    never one row per request; the latest positions live in memory.
+    """
+
+    pkid = models.BigAutoField(primary_key=True, editable=False)
+    driver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="locations")
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    heading = models.PositiveSmallIntegerField(null=True, blank=True)
+    speed_kmh = models.FloatField(null=True, blank=True)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _("driver location")
+        verbose_name_plural = _("driver locations")
+        indexes = [
+            models.Index(fields=["driver", "recorded_at"], name="location_driver_recorded_idx"),
+            models.Index(fields=["recorded_at"], name="location_recorded_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.driver_id} @ {self.latitude:.5f},{self.longitude:.5f}"
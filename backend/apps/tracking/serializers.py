@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0.1, max_value=500, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    route = serializers.IntegerField(min_value=1, required=False)
@@ -0,0 +1,399 @@
+"""
+Latest driver positions, in memory and bucketed by geohash cell, plus the
+buffer of pings waiting to be written to ``DriverLocation``.
+
+``ingest()`` is the hot path: it moves the driver to the cell of its newest
+ping and appends the batch to the history buffer under one lock, without
+touching the database. The buffer is written with ``bulk_create`` every
+``LOCATION_FLUSH_SECONDS`` or ``LOCATION_FLUSH_BATCH`` pings, on a
+background thread unless ``LOCATION_FLUSH_IN_BACKGROUND`` is off; pings still
+buffered when a process dies are lost. ``nearest()`` scans rings of cells
+around a point until the closest drivers are certain.
+
+``LocationStore`` keeps positions in the process that received them, which
+only suits a single process. With ``LOCATION_STORE_URL`` (by default a Redis
+``CACHE_URL``) ``store`` is a ``RedisLocationStore`` instead: positions live
+in a Redis GEO set shared by every worker, so the trip board and trip
+acceptance see the same drivers whichever process serves them. The ping
+buffer stays per process either way.
+"""
+import json
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, IntegrityError, close_old_connections
+
+from .geohash import KM_PER_DEGREE, cell_size, encode, haversine_km, ring
+from .models import DriverLocation
+
+logger = logging.getLogger(__name__)
+
+# Rings to scan before a full scan of every position is cheaper
+MAX_RINGS = 32
+
+Position = namedtuple("Position", "driver latitude longitude recorded_at heading speed_kmh cell")
+
+
+class InvalidPings(ValueError):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def _number(ping, name, low, high, errors, required=True):
+    value = ping.get(name)
+    if value is None:
+        if required:
+            errors[name] = ["This field is required."]
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        errors[name] = ["A number is required."]
+        return None
+    if not low <= value <= high:
+        errors[name] = [f"Ensure this value is between {low} and {high}."]
+        return None
+    return float(value)
+
+
+def clean_pings(raw, now=None):
+    """
+    ``(latitude, longitude, recorded_at, heading, speed_kmh)`` tuples from a
+    list of ping objects. ``recorded_at`` is a Unix timestamp in seconds and
+    defaults to ``now``. Raises ``InvalidPings`` with errors by ping index.
+    """
+    now = time.time() if now is None else now
+    if not isinstance(raw, list) or not raw:
+        raise InvalidPings(["Expected a non-empty list of pings."])
+    if len(raw) > settings.LOCATION_MAX_BATCH:
+        raise InvalidPings([f"Send at most {settings.LOCATION_MAX_BATCH} pings per request."])
+    pings, errors = [], {}
+    latest = now + settings.LOCATION_MAX_SKEW_SECONDS
+    for index, ping in enumerate(raw):
+        if not isinstance(ping, dict):
+            errors[index] = {"non_field_errors": ["Expected an object."]}
+            continue
+        problems = {}
+        latitude = _number(ping, "latitude", -90, 90, problems)
+        longitude = _number(ping, "longitude", -180, 180, problems)
+        recorded_at = _number(ping, "recorded_at", 0, latest, problems, required=False)
+        heading = _number(ping, "heading", 0, 360, problems, required=False)
+        speed = _number(ping, "speed_kmh", 0, 400, problems, required=False)
+        if problems:
+            errors[index] = problems
+            continue
+        pings.append(
+            (latitude, longitude, now if recorded_at is None else recorded_at, None if heading is None else int(heading), speed)
+        )
+    if errors:
+        raise InvalidPings(errors)
+    return pings
+
+
+class LocationStore:
+    def __init__(self, precision=None):
+        self.precision = precision or settings.LOCATION_GEOHASH_PRECISION
+        self._lock = threading.Lock()
+        self._executor = None
+        self.positions = {}
+        self._cells = {}
+        self._clear_buffer()
+
+    def _clear_buffer(self):
+        self._buffer = []
+        self._flushed_at = time.monotonic()
+        self._flushing = False
+        self.counters = {"ingested": 0, "flushed": 0, "dropped": 0, "flush_failures": 0}
+
+    def reset(self):
+        """Forget every position and buffered ping."""
+        with self._lock:
+            self._forget()
+            self._clear_buffer()
+
+    def _forget(self):
+        self.positions = {}
+        self._cells = {}
+
+    def ingest(self, driver, pings):
+        """Record one driver's cleaned pings (see ``clean_pings``)."""
+        newest = max(pings, key=lambda ping: ping[2])
+        cell = encode(newest[0], newest[1], self.precision)
+        with self._lock:
+            self._place(driver, newest, cell)
+            self._buffer.extend((driver, *ping) for ping in pings)
+            self.counters["ingested"] += len(pings)
+            self._trim()
+            due = (
+                len(self._buffer) >= settings.LOCATION_FLUSH_BATCH
+                or time.monotonic() - self._flushed_at >= settings.LOCATION_FLUSH_SECONDS
+            )
+        if due:
+            self.schedule_flush()
+
+    def _place(self, driver, newest, cell):
+        current = self.positions.get(driver)
+        # Batches can arrive out of order; an older one only adds history
+        if current is None or newest[2] >= current.recorded_at:
+            if current is not None and current.cell != cell:
+                self._leave(current)
+            self._cells.setdefault(cell, set()).add(driver)
+            self.positions[driver] = Position(driver, *newest, cell)
+
+    def _leave(self, position):
+        members = self._cells.get(position.cell)
+        if members is not None:
+            members.discard(position.driver)
+            if not members:
+                del self._cells[position.cell]
+
+    def _trim(self):
+        overflow = len(self._buffer) - settings.LOCATION_BUFFER_MAX
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.counters["dropped"] += overflow
+
+    def position(self, driver, fresh=True):
+        """The driver's latest position; None if unknown or, with ``fresh``, older than ``LOCATION_STALE_SECONDS``."""
+        position = self.positions.get(driver)
+        if position is None or (fresh and position.recorded_at < time.time() - settings.LOCATION_STALE_SECONDS):
+            return None
+        return position
+
+    def distance_km(self, driver, latitude, longitude):
+        position = self.position(driver)
+        if position is None:
+            return None
+        return haversine_km(position.latitude, position.longitude, latitude, longitude)
+
+    def nearest(self, latitude, longitude, limit=10, radius_km=None, drivers=None):
+        """
+        Up to ``limit`` ``(distance_km, position)`` pairs, closest first, of
+        drivers with a fresh position within ``radius_km``. ``drivers``
+        restricts the search to those driver pks.
+        """
+        radius_km = radius_km or settings.LOCATION_SEARCH_RADIUS_KM
+        cutoff = time.time() - settings.LOCATION_STALE_SECONDS
+        found = []
+
+        def consider(position):
+            if position.recorded_at >= cutoff:
+                distance = haversine_km(latitude, longitude, position.latitude, position.longitude)
+                if distance <= radius_km:
+                    found.append((distance, position))
+
+        lat_size, lng_size = cell_size(self.precision)
+        # The shortest cell side around the point: ring r + 1 is at least r sides away
+        step_km = min(lat_size, lng_size * math.cos(math.radians(min(abs(latitude), 89.0)))) * KM_PER_DEGREE
+        rings = int(radius_km // step_km) + 1
+        with self._lock:
+            if drivers is not None:
+                for driver in drivers:
+                    position = self.positions.get(driver)
+                    if position is not None:
+                        consider(position)
+            elif rings > MAX_RINGS:
+                for position in self.positions.values():
+                    consider(position)
+            else:
+                seen = set()
+                for radius in range(rings + 1):
+                    for cell in ring(latitude, longitude, radius, self.precision) - seen:
+                        seen.add(cell)
+                        for driver in self._cells.get(cell, ()):
+                            consider(self.positions[driver])
+                    if len(found) >= limit and sorted(d for d, _ in found)[limit - 1] <= radius * step_km:
+                        break
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
+
+    def schedule_flush(self):
+        if not settings.LOCATION_FLUSH_IN_BACKGROUND:
+            self.flush()
+            return
+        with self._lock:
+            if self._flushing:
+                return
+            self._flushing = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="location-flush")
+        self._executor.submit(self._flush_in_background)
+
+    def join(self):
+        """Wait for the background flush, if one is running."""
+        if self._executor is not None:
+            self._executor.submit(lambda: None).result()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Driver location flush failed")
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._flushing = False
+
+    def flush(self):
+        """Write the buffered pings and forget stale positions. Returns the number of rows written."""
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            self._flushed_at = time.monotonic()
+            self._expire()
+        if not rows:
+            return 0
+        try:
+            try:
+                self._write(rows)
+            except IntegrityError:
+                # A driver was deleted while their pings were buffered
+                known = set(
+                    get_user_model().objects.filter(pk__in={row[0] for row in rows}).values_list("pk", flat=True)
+                )
+                rows = [row for row in rows if row[0] in known]
+                self._write(rows)
+        except DatabaseError:
+            logger.exception("Could not write %d driver locations; keeping them for the next flush", len(rows))
+            self._requeue(rows)
+            return 0
+        with self._lock:
+            self.counters["flushed"] += len(rows)
+        return len(rows)
+
+    def _write(self, rows):
+        DriverLocation.objects.bulk_create(
+            [
+                DriverLocation(
+                    driver_id=driver,
+                    latitude=latitude,
+                    longitude=longitude,
+                    recorded_at=datetime.fromtimestamp(recorded_at, tz=timezone.utc),
+                    heading=heading,
+                    speed_kmh=speed,
+                )
+                for driver, latitude, longitude, recorded_at, heading, speed in rows
+            ],
+            batch_size=settings.LOCATION_INSERT_BATCH,
+        )
+
+    def _requeue(self, rows):
+        with self._lock:
+            self._buffer[:0] = rows
+            self.counters["flush_failures"] += 1
+            self._trim()
+
+    def _expire(self):
+        cutoff = time.time() - settings.LOCATION_STALE_SECONDS
+        for driver in [driver for driver, position in self.positions.items() if position.recorded_at < cutoff]:
+            self._leave(self.positions.pop(driver))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "drivers": len(self.positions),
+                "cells": len(self._cells),
+                "buffered": len(self._buffer),
+                **self.counters,
+            }
+
+
+# KEYS: GEO set, positions hash, recorded_at sorted set
+# ARGV: driver, longitude, latitude (clamped to what GEO accepts), recorded_at, packed position
+PLACE_SCRIPT = """
+local current = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if current and tonumber(current) > tonumber(ARGV[4]) then return 0 end
+redis.call('GEOADD', KEYS[1], ARGV[2], ARGV[3], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[5])
+redis.call('ZADD', KEYS[3], ARGV[4], ARGV[1])
+return 1
+"""
+# ARGV: cutoff; removes drivers last seen before it, in chunks below Lua's unpack limit
+EXPIRE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', '(' .. ARGV[1])
+for i = 1, #stale, 1000 do
+    local chunk = {unpack(stale, i, math.min(i + 999, #stale))}
+    redis.call('ZREM', KEYS[1], unpack(chunk))
+    redis.call('HDEL', KEYS[2], unpack(chunk))
+    redis.call('ZREM', KEYS[3], unpack(chunk))
+end
+return #stale
+"""
+# Web Mercator bounds of Redis GEO sets
+GEO_MAX_LATITUDE = 85.05112878
+
+
+class RedisLocationStore(LocationStore):
+    """
+    Positions in Redis, shared by every process: a GEO set for ``nearest()``,
+    a hash of packed positions and a sorted set of ``recorded_at`` for
+    expiry. Updates run as scripts, so concurrent workers keep the newest
+    ping per driver.
+    """
+
+    def __init__(self, url, precision=None, prefix=None):
+        import redis
+
+        super().__init__(precision)
+        self.redis = redis.Redis.from_url(url)
+        prefix = prefix or settings.LOCATION_STORE_PREFIX
+        self.keys = [f"{prefix}:geo", f"{prefix}:positions", f"{prefix}:recorded"]
+        self._place_script = self.redis.register_script(PLACE_SCRIPT)
+        self._expire_script = self.redis.register_script(EXPIRE_SCRIPT)
+
+    def _forget(self):
+        self.redis.delete(*self.keys)
+
+    def _place(self, driver, newest, cell):
+        latitude = max(-GEO_MAX_LATITUDE, min(GEO_MAX_LATITUDE, newest[0]))
+        self._place_script(keys=self.keys, args=[driver, newest[1], latitude, newest[2], json.dumps(newest)])
+
+    def _positions(self, drivers):
+        drivers = list(drivers)
+        if not drivers:
+            return []
+        packed = self.redis.hmget(self.keys[1], drivers)
+        return [
+            Position(driver, *values, encode(values[0], values[1], self.precision))
+            for driver, values in ((driver, json.loads(raw)) for driver, raw in zip(drivers, packed) if raw is not None)
+        ]
+
+    def position(self, driver, fresh=True):
+        found = self._positions([driver])
+        position = found[0] if found else None
+        if position is None or (fresh and position.recorded_at < time.time() - settings.LOCATION_STALE_SECONDS):
+            return None
+        return position
+
+    def nearest(self, latitude, longitude, limit=10, radius_km=None, drivers=None):
+        radius_km = radius_km or settings.LOCATION_SEARCH_RADIUS_KM
+        if drivers is None:
+            members = self.redis.geosearch(
+                self.keys[0], longitude=longitude, latitude=latitude, radius=radius_km, unit="km", sort="ASC"
+            )
+            drivers = [int(member) for member in members]
+        cutoff = time.time() - settings.LOCATION_STALE_SECONDS
+        found = []
+        for position in self._positions(drivers):
+            if position.recorded_at >= cutoff:
+                distance = haversine_km(latitude, longitude, position.latitude, position.longitude)
+                if distance <= radius_km:
+                    found.append((distance, position))
+        found.sort(key=lambda item: item[0])
+        return found[:limit]
+
+    def _expire(self):
+        self._expire_script(keys=self.keys, args=[time.time() - settings.LOCATION_STALE_SECONDS])
+
+    def stats(self):
+        drivers = self.redis.zcard(self.keys[2])
+        with self._lock:
+            return {"drivers": drivers, "buffered": len(self._buffer), **self.counters}
+
+
+store = RedisLocationStore(settings.LOCATION_STORE_URL) if settings.LOCATION_STORE_URL else LocationStore()
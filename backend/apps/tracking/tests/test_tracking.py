@@ -0,0 +1,208 @@
+import os
+import random
+import time
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.tracking.geohash import encode, haversine_km
+from apps.tracking.models import DriverLocation
+from apps.tracking.store import LocationStore, RedisLocationStore, store
+from apps.users.factories import AdminFactory, DriverFactory, PassengerFactory
+from apps.vehicle.models import Location, Route, Trip
+
+PINGS = "/api/v1/tracking/pings/"
+KABUL = (34.5553, 69.2075)
+
+
+@pytest.fixture(autouse=True)
+def clean_store(settings):
+    settings.LOCATION_FLUSH_IN_BACKGROUND = False
+    settings.LOCATION_FLUSH_SECONDS = 3600
+    store.reset()
+    yield
+    store.reset()
+
+
+def bearer(user):
+    return {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+
+def test_geohash_matches_reference_encoding():
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert encode(*KABUL, 5) == "tw1hw"
+
+
+def test_nearest_matches_brute_force(settings):
+    rng = random.Random(7)
+    local = LocationStore(precision=6)
+    now = time.time()
+    points = {}
+    for driver in range(2000):
+        point = (KABUL[0] + rng.uniform(-0.5, 0.5), KABUL[1] + rng.uniform(-0.5, 0.5))
+        points[driver] = point
+        local.ingest(driver, [(*point, now, None, None)])
+
+    found = local.nearest(*KABUL, limit=15, radius_km=30)
+    expected = sorted(
+        (haversine_km(*KABUL, *point), driver) for driver, point in points.items() if haversine_km(*KABUL, *point) <= 30
+    )[:15]
+    assert [position.driver for _, position in found] == [driver for _, driver in expected]
+    assert local.nearest(*KABUL, limit=5, radius_km=30, drivers={1, 2, 3})[0][1].driver in {1, 2, 3}
+
+
+@pytest.fixture
+def redis_url():
+    redis = pytest.importorskip("redis")
+    url = os.environ.get("LOCATION_TEST_STORE_URL", "redis://localhost:6379/15")
+    try:
+        redis.Redis.from_url(url).ping()
+    except redis.ConnectionError:
+        pytest.skip(f"No Redis at {url}")
+    RedisLocationStore(url, prefix="tracking-test").reset()
+    yield url
+    RedisLocationStore(url, prefix="tracking-test").reset()
+
+
+def test_workers_share_positions_through_redis(redis_url):
+    rng = random.Random(7)
+    # Two processes' stores over the same Redis
+    shared_store = RedisLocationStore(redis_url, precision=6, prefix="tracking-test")
+    other_worker = RedisLocationStore(redis_url, precision=6, prefix="tracking-test")
+    now = time.time()
+    points = {}
+    for driver in range(500):
+        point = (KABUL[0] + rng.uniform(-0.3, 0.3), KABUL[1] + rng.uniform(-0.3, 0.3))
+        points[driver] = point
+        (shared_store if driver % 2 else other_worker).ingest(driver, [(*point, now, None, None)])
+
+    found = other_worker.nearest(*KABUL, limit=15, radius_km=20)
+    expected = sorted(
+        (haversine_km(*KABUL, *point), driver) for driver, point in points.items() if haversine_km(*KABUL, *point) <= 20
+    )[:15]
+    assert [position.driver for _, position in found] == [driver for _, driver in expected]
+
+    # An older batch handled by another worker doesn't move the driver back
+    other_worker.ingest(1, [(34.0, 69.0, now - 30, None, None)])
+    assert shared_store.position(1).latitude == pytest.approx(points[1][0])
+    shared_store.ingest(1001, [(*KABUL, now - 1000, None, None)])
+    shared_store._expire()
+    assert other_worker.position(1001, fresh=False) is None
+    assert other_worker.stats()["drivers"] == 500 and other_worker.nearest(*KABUL, drivers={1001}) == []
+
+
+def test_stale_and_out_of_order_pings(settings):
+    now = time.time()
+    store.ingest(1, [(*KABUL, now, None, None)])
+    store.ingest(1, [(34.0, 69.0, now - 30, None, None)])
+    assert store.position(1).latitude == KABUL[0]
+    store.ingest(2, [(*KABUL, now - settings.LOCATION_STALE_SECONDS - 1, None, None)])
+    assert store.position(2) is None
+    assert [position.driver for _, position in store.nearest(*KABUL)] == [1]
+
+
+@pytest.mark.django_db
+def test_pings_update_the_store_and_flush_in_bulk(client, settings, django_assert_max_num_queries):
+    settings.LOCATION_FLUSH_BATCH = 5
+    driver = DriverFactory()
+    now = time.time()
+    headers = bearer(driver)
+    batch = {"pings": [{"latitude": KABUL[0], "longitude": KABUL[1] + i / 1000, "recorded_at": now - 3 + i} for i in range(3)]}
+
+    response = client.post(PINGS, batch, content_type="application/json", **headers)
+    assert response.status_code == 202 and response.json() == {"accepted": 3}
+    assert store.position(driver.pk).longitude == pytest.approx(KABUL[1] + 0.002)
+    assert DriverLocation.objects.count() == 0
+
+    # The second batch crosses LOCATION_FLUSH_BATCH: one INSERT for all six pings
+    with django_assert_max_num_queries(2):
+        store.ingest(driver.pk, [(*KABUL, now, 90, 40.0)] * 3)
+    assert DriverLocation.objects.filter(driver=driver).count() == 6
+    assert store.stats()["flushed"] == 6
+
+
+@pytest.mark.django_db
+def test_invalid_pings_are_rejected(client):
+    driver = DriverFactory()
+    response = client.post(
+        PINGS,
+        {"pings": [{"latitude": 120, "longitude": 69}, {"longitude": "x"}]},
+        content_type="application/json",
+        **bearer(driver),
+    )
+    assert response.status_code == 400
+    errors = response.json()["pings"]
+    assert set(errors) == {"0", "1"} and "latitude" in errors["0"] and set(errors["1"]) == {"latitude", "longitude"}
+    passenger = PassengerFactory()
+    ping = {"pings": [{"latitude": 1, "longitude": 1}]}
+    assert client.post(PINGS, ping, content_type="application/json", **bearer(passenger)).status_code == 403
+    assert store.stats()["ingested"] == 0
+
+
+@pytest.fixture
+def route():
+    return Route.objects.create(
+        pickup=Location.objects.create(name="Kabul", latitude=KABUL[0], longitude=KABUL[1]),
+        drop=Location.objects.create(name="Herat", latitude=34.3529, longitude=62.2040),
+        price_af=900,
+    )
+
+
+@pytest.mark.django_db
+def test_nearby_drivers_for_a_route(client, route):
+    near, far, other = DriverFactory(), DriverFactory(), DriverFactory()
+    route.drivers.add(near, far)
+    now = time.time()
+    store.ingest(near.pk, [(KABUL[0] + 0.01, KABUL[1], now, None, None)])
+    store.ingest(far.pk, [(KABUL[0] + 0.1, KABUL[1], now, None, None)])
+    store.ingest(other.pk, [(*KABUL, now, None, None)])
+
+    response = client.get(
+        f"/api/v1/tracking/drivers/nearby/?latitude={KABUL[0]}&longitude={KABUL[1]}&route={route.pk}",
+        **bearer(AdminFactory()),
+    )
+    assert response.status_code == 200
+    assert [row["driver"] for row in response.json()] == [near.pk, far.pk]
+    assert response.json()[0]["distance_km"] == pytest.approx(1.11, abs=0.01)
+
+
+@pytest.mark.django_db
+def test_board_orders_by_pickup_distance_and_accept_checks_radius(client, route, settings):
+    elsewhere = Route.objects.create(
+        pickup=Location.objects.create(name="Mazar", latitude=36.7090, longitude=67.1109),
+        drop=route.pickup,
+        price_af=700,
+    )
+    unknown = Route.objects.create(pickup=Location.objects.create(name="Somewhere"), drop=route.drop, price_af=100)
+    driver = DriverFactory()
+    driver.available_routes.add(route, elsewhere, unknown)
+    passenger = PassengerFactory()
+    trips = [Trip.objects.create(passenger=passenger, route=r, fare=1) for r in (unknown, elsewhere, route)]
+    store.ingest(driver.pk, [(KABUL[0], KABUL[1] + 0.01, time.time(), None, None)])
+
+    path = "/api/v1/vehicle/driver/available-trips/"
+    board = client.get(path + "?ordering=nearest&fields=pk", **bearer(driver)).json()
+    assert [row["pk"] for row in board] == [trips[2].pk, trips[1].pk, trips[0].pk]
+    assert [row["pk"] for row in client.get(path + "?fields=pk", **bearer(driver)).json()] == [t.pk for t in trips]
+
+    settings.LOCATION_ACCEPT_RADIUS_KM = 50
+    far = client.post(f"/api/v1/vehicle/trips/{trips[1].pk}/accept/", **bearer(driver))
+    assert far.status_code == 403 and "too far" in far.json()["detail"]
+    assert client.post(f"/api/v1/vehicle/trips/{trips[2].pk}/accept/", **bearer(driver)).status_code == 200
+
+
+@pytest.mark.django_db
+def test_prune_locations_keeps_recent_history():
+    driver = DriverFactory()
+    now = timezone.now()
+    DriverLocation.objects.bulk_create(
+        [
+            DriverLocation(driver=driver, latitude=1, longitude=1, recorded_at=now - timedelta(days=days))
+            for days in (1, 20, 30)
+        ]
+    )
+    call_command("prune_locations", days=14, batch_size=1)
+    assert list(DriverLocation.objects.values_list("recorded_at", flat=True)) == [now - timedelta(days=1)]
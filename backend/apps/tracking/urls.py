@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import LocationPingView, LocationStatsView, NearbyDriversView
+
+urlpatterns = [
+    path("pings/", LocationPingView.as_view(), name="location-pings"),
+    path("drivers/nearby/", NearbyDriversView.as_view(), name="nearby-drivers"),
+    path("stats/", LocationStatsView.as_view(), name="location-stats"),
+]
@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.vehicle.permissions import IsAdmin, IsDriver
+
+from .serializers import NearbyQuerySerializer
+from .store import InvalidPings, clean_pings, store
+
+User = get_user_model()
+
+
+class LocationPingView(APIView):
+    """
+    A batch of the driver's location pings, as the app collects them between
+    uploads: ``{"pings": [{"latitude", "longitude", "recorded_at",
+    "heading", "speed_kmh"}]}``, with ``recorded_at`` a Unix timestamp
+    (defaults to now) and the last three optional. Updates the live position
+    only; history reaches the database in bulk later.
+    """
+
+    permission_classes = [IsDriver]
+
+    def post(self, request, format=None):
+        raw = request.data.get("pings") if isinstance(request.data, dict) else None
+        try:
+            pings = clean_pings(raw)
+        except InvalidPings as exc:
+            raise ValidationError({"pings": exc.errors})
+        store.ingest(request.user.pk, pings)
+        return Response({"accepted": len(pings)}, status=status.HTTP_202_ACCEPTED)
+
+
+class NearbyDriversView(APIView):
+    """
+    Drivers with a live position near ``?latitude=&longitude=``, closest
+    first. ``?route=`` keeps only the drivers serving that route;
+    ``?radius_km=`` and ``?limit=`` bound the search.
+    """
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, format=None):
+        query = NearbyQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        drivers = None
+        if "route" in params:
+            drivers = set(User.objects.filter(available_routes=params["route"]).values_list("pk", flat=True))
+        found = store.nearest(
+            params["latitude"], params["longitude"], params["limit"], params.get("radius_km"), drivers
+        )
+        return Response(
+            [
+                {
+                    "driver": position.driver,
+                    "distance_km": round(distance, 3),
+                    "latitude": position.latitude,
+                    "longitude": position.longitude,
+                    "heading": position.heading,
+                    "speed_kmh": position.speed_kmh,
+                    "recorded_at": datetime.fromtimestamp(position.recorded_at, tz=timezone.utc),
+                }
+                for distance, position in found
+            ]
+        )
+
+
+class LocationStatsView(APIView):
+    """Positions held, and the pings buffered and ingest/flush counters of this process."""
+
+    permission_classes = [IsAdmin]
+
+    def get(self, request, format=None):
+        return Response(store.stats())
@@ -2,11 +2,13 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
+from apps.search.admin import IndexedSearchMixin
+
 from .forms import UserChangeForm, UserCreationForm
 from .models import User
 
 
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(IndexedSearchMixin, BaseUserAdmin):
     ordering = ["email"]
     form = UserChangeForm
     add_form = UserCreationForm
@@ -67,6 +69,7 @@ class UserAdmin(BaseUserAdmin):
     )
 
     search_fields = ["email", "first_name", "last_name"]
+    search_kind = "user"
 
 
 admin.site.register(User, UserAdmin)
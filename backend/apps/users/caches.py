@@ -0,0 +1,5 @@
+from apps.common.cache import ReadCache
+
+from .models import User
+
+user_details_cache = ReadCache("user-details", depends_on={User: lambda user: [user.pk]})
@@ -14,7 +14,8 @@ class UserFactory(factory.django.DjangoModelFactory):
 
     first_name = factory.LazyAttribute(lambda x: faker.first_name())
     last_name = factory.LazyAttribute(lambda x: faker.last_name())
-    email = factory.LazyAttribute(lambda x: faker.email())
+    # Numbered so large batches never repeat an address
+    email = factory.Sequence(lambda n: f"user{n}.{faker.user_name()}@{faker.free_email_domain()}")
     password = factory.LazyAttribute(lambda x: faker.password())
     is_active = True
     is_staff = False
@@ -25,3 +26,32 @@ class UserFactory(factory.django.DjangoModelFactory):
         if kwargs.get("is_superuser"):
             return manager.create_superuser(*args, **kwargs)
         return manager.create_user(*args, **kwargs)
+
+    @classmethod
+    def create_bulk(cls, size, **kwargs):
+        """
+        Build ``size`` users with the factory's attributes and insert them, with
+        their profiles, through ``User.objects.bulk_create_users``.
+        """
+        rows = [
+            {
+                field: getattr(user, field)
+                for field in ("first_name", "last_name", "email", "password", "role", "is_active", "is_staff")
+            }
+            for user in cls.build_batch(size, **kwargs)
+        ]
+        extra = {k: v for k, v in kwargs.items() if k not in rows[0]} if rows else {}
+        return User.objects.bulk_create_users([dict(row, **extra) for row in rows])
+
+
+class PassengerFactory(UserFactory):
+    role = User.Role.PASSENGER
+
+
+class DriverFactory(UserFactory):
+    role = User.Role.DRIVER
+
+
+class AdminFactory(UserFactory):
+    role = User.Role.ADMIN
+    is_staff = True
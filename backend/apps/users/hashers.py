@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+
+def _tuning(name, default):
+    return getattr(settings, "PASSWORD_HASHER_TUNING", {}).get(name, default)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the iteration count from ``PASSWORD_HASHER_TUNING``. The
+    algorithm name is unchanged, so existing hashes keep verifying and are
+    re-hashed on login when the iteration count changes.
+    """
+
+    @property
+    def iterations(self):
+        return _tuning("pbkdf2_iterations", PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return _tuning("argon2_time_cost", Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _tuning("argon2_memory_cost", Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _tuning("argon2_parallelism", Argon2PasswordHasher.parallelism)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _tuning("scrypt_work_factor", ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _tuning("scrypt_block_size", ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _tuning("scrypt_parallelism", ScryptPasswordHasher.parallelism)
@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+
+def _init_worker(settings_module, hashers, tuning):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+    # Hash exactly like the parent, even under override_settings()
+    settings.PASSWORD_HASHERS = hashers
+    settings.PASSWORD_HASHER_TUNING = tuning
+
+
+def _hash(password):
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None, chunksize=32):
+    """
+    Hash ``passwords`` with the preferred hasher, spreading the work over a pool
+    of ``workers`` processes (default ``PASSWORD_HASHING_WORKERS``, then the CPU
+    count). Small inputs are hashed inline, as starting the pool would cost more
+    than it saves. Results are in input order.
+    """
+    passwords = list(passwords)
+    workers = workers or settings.PASSWORD_HASHING_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < settings.PASSWORD_HASHING_POOL_THRESHOLD:
+        return [make_password(password) for password in passwords]
+
+    # spawn rather than fork: the caller may hold DB connections or run threads
+    context = multiprocessing.get_context("spawn")
+    settings_module = os.environ.get("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(passwords)),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(settings_module, settings.PASSWORD_HASHERS, settings.PASSWORD_HASHER_TUNING),
+    ) as pool:
+        return list(pool.map(_hash, passwords, chunksize=chunksize))
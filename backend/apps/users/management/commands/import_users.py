@@ -0,0 +1,63 @@
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.hashing import hash_passwords
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create users and their profiles from a CSV file with the columns "
+        "first_name, last_name, email and optionally password and role."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument(
+            "--role",
+            choices=User.Role.values,
+            default=User.Role.DRIVER,
+            help="Role for rows without a role column (default: driver).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Password hashing processes (default: PASSWORD_HASHING_WORKERS or CPU count).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["csv_file"], newline="", encoding="utf-8") as handle:
+                rows = list(csv.DictReader(handle))
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for row in rows:
+            row["role"] = row.get("role") or options["role"]
+            if not row.get("password"):
+                row.pop("password", None)
+
+        started = time.perf_counter()
+        try:
+            users = User.objects.bulk_create_users(
+                rows,
+                batch_size=options["batch_size"],
+                hash_passwords=lambda raw: hash_passwords(raw, workers=options["workers"]),
+            )
+        except ValueError as exc:
+            # Rows are numbered from the first one after the header
+            raise CommandError(f"{options['csv_file']}: {exc}")
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users)} of {len(rows)} users in {elapsed:.2f}s "
+                f"({len(users) / elapsed if elapsed else 0:.0f} users/s)."
+            )
+        )
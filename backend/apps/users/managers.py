@@ -50,3 +50,101 @@ class CustomUserManager(BaseUserManager):
             raise ValueError(_("Superuser must have an email address."))
 
         return self.create_user(first_name, last_name, email, password, **extra_fields)
+
+    def derive_usernames(self, emails, taken=()):
+        """
+        Map each email to a username derived from its local part, suffixing a
+        counter where the local part is already taken in ``taken`` or in the
+        database. Uses a single query.
+        """
+        bases = {email: email.split("@")[0] for email in emails}
+        taken = set(taken) | set(
+            self.filter(username__in=set(bases.values())).values_list("username", flat=True)
+        )
+        usernames = {}
+        for email, base in bases.items():
+            candidate, counter = base, 1
+            while candidate in taken:
+                counter += 1
+                candidate = f"{base}{counter}"
+            taken.add(candidate)
+            usernames[email] = candidate
+        return usernames
+
+    def bulk_create_users(self, rows, batch_size=1000, hash_passwords=None, profile_defaults=None):
+        """
+        Create users and their profiles from ``rows`` (dicts with ``first_name``,
+        ``last_name``, ``email`` and optionally ``password``, ``role`` and any
+        other user field) with a handful of queries per batch instead of several
+        per user. ``save()`` and the ``post_save`` profile signal are bypassed,
+        so profiles and outbox events are bulk-inserted in the same transaction.
+
+        ``hash_passwords`` takes a list of raw passwords and returns hashes; it
+        defaults to ``apps.users.hashing.hash_passwords``, which uses a process
+        pool for large batches. Hashing happens before the batch transaction is
+        opened. Rows whose email already exists are skipped. Returns the created
+        users.
+        """
+        from django.apps import apps
+        from django.db import transaction
+
+        from apps.events.models import record_events_bulk
+        from apps.users.hashing import hash_passwords as pool_hash_passwords
+
+        Profile = apps.get_model("profiles", "Profile")
+        hash_passwords = hash_passwords or pool_hash_passwords
+        profile_defaults = profile_defaults or {}
+        created = []
+
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            users, seen = [], set()
+            for number, row in enumerate(batch, start=start + 1):
+                row = dict(row)
+                try:
+                    email = row.pop("email", None)
+                    if email:
+                        email = self.normalize_email(email)
+                        self.email_validator(email)
+                    if not email or email in seen:
+                        continue
+                    if not row.get("first_name") or not row.get("last_name"):
+                        raise ValueError(_("Users must have a first and last name."))
+                    raw_password = row.pop("password", None)
+                    # Unknown columns, or the None key of a row with more cells than the header
+                    user = self.model(email=email, **row)
+                except (TypeError, ValueError) as exc:
+                    raise ValueError(_("Row %(number)d: %(error)s") % {"number": number, "error": exc}) from exc
+                seen.add(email)
+                users.append((user, raw_password))
+
+            # Skip existing emails before paying for their password hashes
+            existing = set(self.filter(email__in=seen).values_list("email", flat=True))
+            users = [(user, raw) for user, raw in users if user.email not in existing]
+            if not users:
+                continue
+            hashed = iter(hash_passwords([raw for user, raw in users if raw]))
+
+            with transaction.atomic(using=self.db):
+                usernames = self.derive_usernames(
+                    [user.email for user, raw in users if not user.username],
+                    taken=[user.username for user, raw in users if user.username],
+                )
+
+                objs = []
+                for user, raw in users:
+                    user.username = user.username or usernames.get(user.email)
+                    if raw:
+                        user.password = next(hashed)
+                    else:
+                        user.set_unusable_password()
+                    objs.append(user)
+
+                objs = self.bulk_create(objs, batch_size=batch_size)
+                Profile.objects.using(self.db).bulk_create(
+                    [Profile(user=user, **profile_defaults) for user in objs],
+                    batch_size=batch_size,
+                )
+                record_events_bulk(objs, "created", using=self.db)
+            created.extend(objs)
+        return created
@@ -5,6 +5,8 @@ from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from apps.events.models import OutboxMixin
+
 from .managers import CustomUserManager
 
 # ----------------------------
@@ -12,7 +14,7 @@ from .managers import CustomUserManager
 # ----------------------------
 
 
-class User(AbstractBaseUser, PermissionsMixin):
+class User(OutboxMixin, AbstractBaseUser, PermissionsMixin):
     class Role(models.TextChoices):
         PASSENGER = "passenger", _("Passenger")
         DRIVER = "driver", _("Driver")
@@ -41,9 +43,17 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    outbox_ignored_fields = frozenset({"last_login"})
+
     class Meta:
         verbose_name = _("user")
         verbose_name_plural = _("users")
+        # Back the admin user list filters (see apps.profiles.filters)
+        indexes = [
+            models.Index(fields=["role", "date_joined"], name="user_role_joined_idx"),
+            models.Index(fields=["is_active", "date_joined"], name="user_active_joined_idx"),
+            models.Index(fields=["date_joined"], name="user_joined_idx"),
+        ]
 
     def __str__(self):
         return self.get_full_name
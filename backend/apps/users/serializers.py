@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django_countries.serializer_fields import CountryField
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
@@ -58,39 +60,61 @@ class CustomRegisterSerializer(serializers.ModelSerializer):
             "password",
             "password2",
         ]
-        # Make sure the 'role' field is included as it is required by the frontend
+        # Make sure the 'role' field is included as it is required by the frontend.
+        # Uniqueness is checked in validate() with a single query instead of
+        # one UniqueValidator query per field.
         extra_kwargs = {
-            'role': {'required': True}
+            'role': {'required': True},
+            'email': {'validators': []},
+            'username': {'validators': [], 'required': False},
         }
 
     def validate(self, attrs):
         """
         Validate that the user doesn't already exist and that passwords match.
         """
-        # Check if email exists
-        if User.objects.filter(email=attrs["email"]).exists():
-            raise serializers.ValidationError({"email": "A user with this email address already exists."})
-
-        # Check if username exists
-        if User.objects.filter(username=attrs["username"]).exists():
-            raise serializers.ValidationError({"username": "This username is already taken. Please choose another."})
-
         # Check if passwords match
         if attrs["password"] != attrs["password2"]:
             raise serializers.ValidationError({"password": "Passwords must match."})
 
+        attrs["email"] = User.objects.normalize_email(attrs["email"])
+        email = attrs["email"]
+        username = attrs.get("username") or email.split("@")[0]
+
+        # Check email and username in one round trip
+        clashes = list(
+            User.objects.filter(Q(email=email) | Q(username=username))
+            .values_list("email", "username")[:2]
+        )
+        if any(found_email == email for found_email, _ in clashes):
+            raise serializers.ValidationError({"email": "A user with this email address already exists."})
+        if clashes and attrs.get("username"):
+            raise serializers.ValidationError({"username": "This username is already taken. Please choose another."})
+        if clashes:
+            # The username derived from the email is taken, pick the next free one
+            username = User.objects.derive_usernames([email])[email]
+        attrs["username"] = username
+
         return attrs
 
     def create(self, validated_data):
         """
         Create and return a new user instance, given the validated data.
+        The user, its profile and its outbox event are written in one transaction.
         """
         # Remove the confirmation password as it's not part of the User model
         validated_data.pop('password2')
-        
+
         # Use the custom manager's create_user method which correctly handles password hashing
-        user = User.objects.create_user(**validated_data)
-        
+        # validate() checked uniqueness, but a concurrent signup can still win the insert
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(**validated_data)
+        except IntegrityError:
+            if User.objects.filter(email=validated_data["email"]).exists():
+                raise serializers.ValidationError({"email": "A user with this email address already exists."})
+            raise serializers.ValidationError({"username": "This username is already taken. Please choose another."})
+
         return user
 
 class PasswordChangeSerializer(serializers.Serializer):
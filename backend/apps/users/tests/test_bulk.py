@@ -0,0 +1,119 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+
+from apps.events.models import OutboxEvent
+from apps.profiles.models import Profile
+from apps.users.factories import UserFactory
+from apps.users.models import User
+from apps.users.serializers import CustomRegisterSerializer
+
+
+def registration_data(**overrides):
+    data = {
+        "first_name": "john",
+        "last_name": "doe",
+        "email": "john.doe@gmail.com",
+        "role": "passenger",
+        "password": "secure_password123",
+        "password2": "secure_password123",
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.mark.django_db
+def test_registration_uses_one_lookup_and_one_transaction():
+    serializer = CustomRegisterSerializer(data=registration_data())
+    with CaptureQueriesContext(connection) as queries:
+        assert serializer.is_valid(), serializer.errors
+        user = serializer.save()
+
+    statements = [q["sql"].split()[0] for q in queries]
+    assert statements.count("SELECT") == 1
+    assert statements.count("INSERT") == 3
+    assert user.username == "john.doe"
+    assert Profile.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+def test_registration_rejects_existing_email():
+    UserFactory(email="john.doe@gmail.com")
+    serializer = CustomRegisterSerializer(data=registration_data())
+    assert not serializer.is_valid()
+    assert "email" in serializer.errors
+
+
+@pytest.mark.django_db
+def test_registration_picks_free_username_when_derived_one_is_taken():
+    UserFactory(email="john.doe@yahoo.com")
+    serializer = CustomRegisterSerializer(data=registration_data())
+    assert serializer.is_valid(), serializer.errors
+    assert serializer.save().username == "john.doe2"
+
+
+@pytest.mark.django_db
+def test_registration_losing_a_concurrent_signup_is_a_validation_error():
+    serializer = CustomRegisterSerializer(data=registration_data())
+    assert serializer.is_valid(), serializer.errors
+    # Another request registers the same email between validation and insert
+    UserFactory(email="john.doe@gmail.com")
+
+    with pytest.raises(ValidationError) as excinfo:
+        serializer.save()
+    assert "email" in excinfo.value.detail
+    assert User.objects.filter(email="john.doe@gmail.com").count() == 1
+
+
+@pytest.mark.django_db
+def test_bulk_create_users_creates_profiles_and_events():
+    UserFactory(email="existing@fleet.com")
+    rows = [
+        {"first_name": "Driver", "last_name": str(i), "email": f"driver{i}@fleet.com", "role": "driver"}
+        for i in range(25)
+    ]
+    rows.append({"first_name": "Old", "last_name": "Driver", "email": "existing@fleet.com"})
+
+    with CaptureQueriesContext(connection) as queries:
+        users = User.objects.bulk_create_users(rows, batch_size=10)
+
+    assert len(users) == 25
+    assert len(queries) < 25
+    assert Profile.objects.filter(user__in=users).count() == 25
+    assert OutboxEvent.objects.filter(event_type="user.created").count() >= 25
+    assert not users[0].has_usable_password()
+
+
+@pytest.mark.django_db
+def test_bulk_create_users_derives_unique_usernames():
+    users = User.objects.bulk_create_users(
+        [
+            {"first_name": "A", "last_name": "A", "email": "ali@one.com", "password": "pw12345678"},
+            {"first_name": "B", "last_name": "B", "email": "ali@two.com", "password": "pw12345678"},
+        ]
+    )
+    assert sorted(u.username for u in users) == ["ali", "ali2"]
+    assert users[0].check_password("pw12345678")
+
+
+@pytest.mark.django_db
+def test_user_factory_create_bulk():
+    users = UserFactory.create_bulk(5, role="driver")
+    assert User.objects.filter(role="driver").count() == 5
+    assert all(u.pk for u in users)
+
+
+@pytest.mark.django_db
+def test_import_users_reports_malformed_rows(tmp_path):
+    csv_file = tmp_path / "drivers.csv"
+    csv_file.write_text(
+        "first_name,last_name,email\n"
+        "Ali,Ahmadi,ali@fleet.com\n"
+        "Sara,Karimi,sara@fleet.com,extra\n"
+    )
+
+    with pytest.raises(CommandError, match="Row 2"):
+        call_command("import_users", str(csv_file))
+    assert not User.objects.filter(email__endswith="@fleet.com").exists()
@@ -0,0 +1,35 @@
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.test import override_settings
+
+from apps.users.hashing import hash_passwords
+
+TUNED_PBKDF2 = ["apps.users.hashers.TunedPBKDF2PasswordHasher"]
+MD5 = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+@override_settings(PASSWORD_HASHERS=TUNED_PBKDF2, PASSWORD_HASHER_TUNING={"pbkdf2_iterations": 1000})
+def test_tuned_pbkdf2_uses_configured_iterations():
+    encoded = make_password("secure_password123")
+    assert encoded.startswith("pbkdf2_sha256$1000$")
+    assert check_password("secure_password123", encoded)
+
+
+@override_settings(PASSWORD_HASHERS=TUNED_PBKDF2, PASSWORD_HASHER_TUNING={"pbkdf2_iterations": 2000})
+def test_tuned_pbkdf2_flags_old_iteration_counts_for_upgrade():
+    with override_settings(PASSWORD_HASHER_TUNING={"pbkdf2_iterations": 1000}):
+        encoded = make_password("secure_password123")
+    assert identify_hasher(encoded).must_update(encoded)
+
+
+@override_settings(PASSWORD_HASHERS=MD5)
+def test_hash_passwords_inline_for_small_inputs():
+    hashed = hash_passwords(["one", "two"], workers=4)
+    assert [check_password(p, h) for p, h in zip(["one", "two"], hashed)] == [True, True]
+
+
+@override_settings(PASSWORD_HASHERS=MD5, PASSWORD_HASHING_POOL_THRESHOLD=2)
+def test_hash_passwords_pool_preserves_order_and_hasher():
+    passwords = [f"password-{i}" for i in range(6)]
+    hashed = hash_passwords(passwords, workers=2, chunksize=2)
+    assert all(h.startswith("md5$") for h in hashed)
+    assert all(check_password(p, h) for p, h in zip(passwords, hashed))
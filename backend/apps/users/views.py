@@ -11,6 +11,10 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from apps.common.cache import CachedReadMixin
+from apps.common.routers import primary_db
+
+from .caches import user_details_cache
 from .serializers import CustomRegisterSerializer, UserSerializer
 from .utils import send_email_notification
 
@@ -18,9 +22,10 @@ User = get_user_model()
 import random
 
 
-class CustomUserDetailsView(generics.RetrieveUpdateAPIView):
+class CustomUserDetailsView(CachedReadMixin, generics.RetrieveUpdateAPIView):
     serializer_class = CustomRegisterSerializer
     permission_classes = [IsAuthenticated]
+    read_cache = user_details_cache
 
     def get_object(self):
         return self.request.user
@@ -40,6 +45,7 @@ def generate_random_opt_code(length=8):
     return otp
 
 
+@primary_db
 class PasswordRegisterEmailVerifyApiView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
@@ -1,8 +1,43 @@
 from django.contrib import admin
 
-from .models import Location, Route, Trip, Vehicle
+from apps.search.admin import IndexedSearchMixin
 
-admin.site.register(Trip)
+from .models import ArchivedTrip, Location, Route, SharedRide, Trip, Vehicle
+
+
+class ArchivedTripAdmin(admin.ModelAdmin):
+    list_display = ["pkid", "passenger", "route", "status", "request_time", "archived_at"]
+    list_filter = ["status"]
+    list_select_related = ["passenger", "route__pickup", "route__drop"]
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class SharedRideAdmin(admin.ModelAdmin):
+    list_display = ["pkid", "route", "departure", "vehicle_type", "seats", "seat_fare", "driver"]
+    list_filter = ["vehicle_type"]
+    list_select_related = ["route__pickup", "route__drop", "driver"]
+
+
+class TripAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ["pkid", "passenger", "route", "status", "request_time"]
+    list_filter = ["status"]
+    list_select_related = ["passenger", "route__pickup", "route__drop"]
+    search_fields = ["passenger__email", "notes_for_driver"]
+    search_kind = "trip"
+
+
+class VehicleAdmin(IndexedSearchMixin, admin.ModelAdmin):
+    list_display = ["plate_number", "model", "type", "driver"]
+    list_select_related = ["driver"]
+    search_fields = ["plate_number", "model"]
+    search_kind = "vehicle"
+
+
+admin.site.register(Trip, TripAdmin)
 admin.site.register(Location)
-admin.site.register(Vehicle)
+admin.site.register(Vehicle, VehicleAdmin)
 admin.site.register(Route)
+admin.site.register(ArchivedTrip, ArchivedTripAdmin)
+admin.site.register(SharedRide, SharedRideAdmin)
@@ -6,3 +6,6 @@ class VehicleConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.vehicle"
     verbose_name = _("Vehicle")
+
+    def ready(self):
+        from apps.vehicle import caches, signals  # noqa
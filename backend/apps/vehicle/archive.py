@@ -0,0 +1,102 @@
+"""
+Trip archival. Completed and cancelled trips that have not changed for
+``TRIP_ARCHIVE_AFTER_DAYS`` move from ``Trip`` to ``ArchivedTrip``, which keeps
+the hot table (and every board and list query on it) bounded by the retention
+window instead of by total history. ``TripHistory`` reads both tables as one.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Value
+from django.utils import timezone
+
+from apps.events.models import record_events_bulk
+
+from .models import ArchivedTrip, Trip
+
+ARCHIVABLE_STATUSES = ("completed", "cancelled")
+
+
+def archivable(before=None, using="default"):
+    if before is None:
+        before = timezone.now() - timedelta(days=settings.TRIP_ARCHIVE_AFTER_DAYS)
+    return Trip.objects.using(using).filter(status__in=ARCHIVABLE_STATUSES, updated_at__lt=before)
+
+
+def archive_trips(before=None, batch_size=1000, using="default"):
+    """
+    Move archivable trips in batches, each in its own transaction, and record a
+    ``trip.archived`` event for each. Returns the number of trips moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic(using=using):
+            trips = list(archivable(before, using).select_for_update().order_by("pkid")[:batch_size])
+            if not trips:
+                return moved
+            ArchivedTrip.objects.using(using).bulk_create([ArchivedTrip.from_trip(trip) for trip in trips])
+            record_events_bulk(trips, "archived", using)
+            Trip.objects.using(using).filter(pkid__in=[trip.pkid for trip in trips]).delete()
+        moved += len(trips)
+
+
+class TripHistory:
+    """
+    ``Trip`` and ``ArchivedTrip`` as one read-only sequence, newest request
+    first unless ``order_by()`` says otherwise. Supports ``filter()``,
+    ``order_by()``, ``count()``, slicing and iteration, so it can be handed to
+    a FilterSet and DRF pagination in place of a queryset. Slices are resolved
+    with a UNION of keys and then one query per table.
+    """
+
+    model = Trip
+    related = ("passenger", "driver", "route__pickup", "route__drop")
+
+    def __init__(self, trips=None, archived=None, ordering=("-request_time", "-pkid")):
+        self.trips = trips if trips is not None else Trip.objects.all()
+        self.archived = archived if archived is not None else ArchivedTrip.objects.all()
+        self.ordering = tuple(ordering)
+
+    def all(self):
+        return TripHistory(self.trips.all(), self.archived.all(), self.ordering)
+
+    def filter(self, *args, **kwargs):
+        return TripHistory(self.trips.filter(*args, **kwargs), self.archived.filter(*args, **kwargs), self.ordering)
+
+    def order_by(self, *ordering):
+        """Order by fields both tables share; ``pkid`` breaks ties."""
+        if "pkid" not in {field.lstrip("-") for field in ordering}:
+            ordering += ("-pkid",)
+        return TripHistory(self.trips, self.archived, ordering)
+
+    def count(self):
+        return self.trips.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def keys(self):
+        """``(pkid, *ordering fields, archived)`` rows in order."""
+        columns = list(dict.fromkeys(["pkid", *(field.lstrip("-") for field in self.ordering)]))
+        live = self.trips.order_by().annotate(archived=Value(False)).values_list(*columns, "archived")
+        old = self.archived.order_by().annotate(archived=Value(True)).values_list(*columns, "archived")
+        return live.union(old, all=True).order_by(*self.ordering)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self[key : key + 1][0]
+        keys = list(self.keys()[key])
+        live = {key[0] for key in keys if not key[-1]}
+        old = {key[0] for key in keys if key[-1]}
+        objects = {}
+        if live:
+            for trip in self.trips.select_related(*self.related).filter(pkid__in=live):
+                objects[(trip.pkid, False)] = trip
+        if old:
+            for trip in self.archived.select_related(*self.related).filter(pkid__in=old):
+                objects[(trip.pkid, True)] = trip
+        return [objects[(key[0], key[-1])] for key in keys if (key[0], key[-1]) in objects]
+
+    def __iter__(self):
+        return iter(self[:])
@@ -0,0 +1,137 @@
+"""
+Async versions of the polled read endpoints, routed instead of the DRF views
+in ``urls.py`` when ``ASYNC_READ_VIEWS`` is set (see ``apps.common.asyncviews``).
+Each returns the same JSON as its synchronous counterpart, archived trips and
+pinned clients included; ``tests/test_async_views.py`` checks every view.
+"""
+from datetime import date, timedelta
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from rest_framework import permissions
+
+from apps.common.asyncviews import AsyncReadView, run_queries
+from apps.common.cache import AsyncSingleFlight
+from apps.common.coalesce import CoalescedReadMixin, coalescable, coalesce_key
+from apps.common.routers import primary_db
+from apps.tracking.matching import nearest_first
+
+from .archive import TripHistory
+from .caches import driver_trips_cache
+from .models import DriverApplication, Route, Trip
+from .permissions import IsAdmin, IsDriver
+from .serializers import AvailableTripRequestSerializer, DashboardRecentTripSerializer, RouteSerializer
+
+User = get_user_model()
+
+_routes_flight = AsyncSingleFlight()
+
+
+@primary_db
+class AsyncAvailableTripRequestListView(AsyncReadView):
+    """
+    Unassigned trips on the driver's routes, oldest request first or, with
+    ``?ordering=nearest``, closest pickup first.
+    """
+
+    serializer_class = AvailableTripRequestSerializer
+    permission_classes = [IsDriver]
+
+    async def get(self, request):
+        trips = Trip.objects.filter(
+            status="requested", driver__isnull=True, route__in=request.user.available_routes.all()
+        ).order_by("request_time")
+        trips = [trip async for trip in self.project(trips)]
+        if request.GET.get("ordering") == "nearest":
+            trips = await sync_to_async(nearest_first)(trips, request.user.pk)
+        return self.render(self.get_serializer(trips, many=True).data)
+
+
+class AsyncDriverTripListView(AsyncReadView):
+    """
+    The driver's live and archived trips, newest first, through the same read
+    cache and under the same keys as the DRF view, so both fill it alike.
+    """
+
+    serializer_class = AvailableTripRequestSerializer
+    permission_classes = [permissions.IsAuthenticated, IsDriver]
+
+    async def get(self, request):
+        def compute():
+            trips = list(TripHistory().filter(driver=request.user))
+            return 200, self.serializer_class(trips, many=True, context={"request": request}).data
+
+        # The cache itself is synchronous; a hit costs one hop, a miss one more query
+        status, data = await sync_to_async(driver_trips_cache.get_or_set)(
+            request.user.pk, request.get_full_path(), compute, cache_if=lambda result: result[0] == 200
+        )
+        return self.render(data, status=status)
+
+
+class AsyncRouteListView(AsyncReadView):
+    """
+    The public route list. Concurrent identical requests share one query and
+    one rendering under the same rules as ``CoalescedReadMixin`` on the DRF
+    viewset: pinned clients run their own and the key includes the same
+    ``coalesce_vary`` headers.
+    """
+
+    serializer_class = RouteSerializer
+    permission_classes = [permissions.AllowAny]
+    coalesce_vary = CoalescedReadMixin.coalesce_vary
+
+    async def get(self, request):
+        async def run():
+            return self.encode(await self.serialize_list(Route.objects.all()))
+
+        if not coalescable(request):
+            return self.respond(await run())
+        public = all(issubclass(permission, permissions.AllowAny) for permission in self.permission_classes)
+        content, _ = await _routes_flight.do(coalesce_key(self, request, self.coalesce_vary, public), run)
+        return self.respond(content)
+
+
+class AsyncAdminDashboardStatsView(AsyncReadView):
+    """KPI counts, the latest trips and trips per day for the last week."""
+
+    permission_classes = [IsAdmin]
+
+    async def get(self, request):
+        seven_days_ago = date.today() - timedelta(days=7)
+        recent_trips = Trip.objects.select_related("passenger", "route__pickup", "route__drop").order_by(
+            "-request_time"
+        )[:5]
+        trips_per_day = (
+            Trip.objects.filter(request_time__date__gte=seven_days_ago)
+            .annotate(day=TruncDate("request_time"))
+            .values("day")
+            .annotate(count=Count("id"))
+            .order_by("day")
+        )
+        # Independent queries; they overlap with ASYNC_PARALLEL_QUERIES
+        (
+            total_users, total_drivers, total_passengers, total_trips, pending_applications, recent, per_day
+        ) = await run_queries(
+            User.objects.count,
+            User.objects.filter(role=User.Role.DRIVER).count,
+            User.objects.filter(role=User.Role.PASSENGER).count,
+            TripHistory().count,
+            DriverApplication.objects.filter(status="pending").count,
+            lambda: list(recent_trips),
+            lambda: list(trips_per_day),
+        )
+        return self.render(
+            {
+                "kpi": {
+                    "total_users": total_users,
+                    "total_drivers": total_drivers,
+                    "total_passengers": total_passengers,
+                    "total_trips": total_trips,
+                    "pending_applications": pending_applications,
+                },
+                "recent_trips": DashboardRecentTripSerializer(recent, many=True).data,
+                "chart_data": [{"date": item["day"].strftime("%b %d"), "trips": item["count"]} for item in per_day],
+            }
+        )
@@ -0,0 +1,7 @@
+from apps.common.cache import ReadCache
+
+from .models import Trip, Vehicle
+
+driver_vehicles_cache = ReadCache("driver-vehicles", depends_on={Vehicle: lambda vehicle: [vehicle.driver_id]})
+
+driver_trips_cache = ReadCache("driver-trips", depends_on={Trip: lambda trip: [trip.driver_id]})
@@ -0,0 +1,59 @@
+import random
+
+import factory
+from faker import Factory as FakerFactory
+
+from apps.users.factories import DriverFactory, PassengerFactory
+
+from .models import Location, Route, Trip, Vehicle
+
+faker = FakerFactory.create()
+
+
+class BulkFactoryMixin:
+    @classmethod
+    def create_bulk(cls, size, batch_size=1000, **kwargs):
+        """
+        Build ``size`` objects with the factory's attributes and insert them with
+        ``bulk_create``. ``save()`` and signals are bypassed, so no outbox events
+        are recorded; pass saved related objects in ``kwargs``.
+        """
+        objs = cls.build_batch(size, **kwargs)
+        return cls._meta.model.objects.bulk_create(objs, batch_size=batch_size)
+
+
+class LocationFactory(BulkFactoryMixin, factory.django.DjangoModelFactory):
+    class Meta:
+        model = Location
+
+    name = factory.Sequence(lambda n: f"{faker.city()} {n}")
+
+
+class RouteFactory(BulkFactoryMixin, factory.django.DjangoModelFactory):
+    class Meta:
+        model = Route
+
+    pickup = factory.SubFactory(LocationFactory)
+    drop = factory.SubFactory(LocationFactory)
+    price_af = factory.LazyAttribute(lambda x: random.randrange(200, 3000, 50))
+
+
+class VehicleFactory(BulkFactoryMixin, factory.django.DjangoModelFactory):
+    class Meta:
+        model = Vehicle
+
+    driver = factory.SubFactory(DriverFactory)
+    model = factory.LazyAttribute(lambda x: f"{faker.company()} {faker.word().title()}")
+    plate_number = factory.Sequence(lambda n: f"KBL-{n:06d}")
+    license = "license/sample.jpg"
+    type = factory.LazyAttribute(lambda x: random.choice(Vehicle.VEHICLE_TYPE_CHOICES)[0])
+
+
+class TripFactory(BulkFactoryMixin, factory.django.DjangoModelFactory):
+    class Meta:
+        model = Trip
+
+    passenger = factory.SubFactory(PassengerFactory)
+    route = factory.SubFactory(RouteFactory)
+    fare = factory.LazyAttribute(lambda trip: trip.route.price_af)
+    passenger_count = factory.LazyAttribute(lambda x: random.randint(1, 4))
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.vehicle.archive import archivable, archive_trips
+
+
+class Command(BaseCommand):
+    help = "Move completed and cancelled trips past the retention window to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Retention window in days (default: TRIP_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report how many trips would be moved."
+        )
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else settings.TRIP_ARCHIVE_AFTER_DAYS
+        before = timezone.now() - timedelta(days=days)
+        if options["dry_run"]:
+            self.stdout.write(f"{archivable(before).count()} trips would be archived.")
+            return
+        moved = archive_trips(before, batch_size=options["batch_size"])
+        self.stdout.write(f"Archived {moved} trips.")
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.vehicle.pooling import pool_trips
+
+
+class Command(BaseCommand):
+    help = "Group open requests that allow pooling onto shared rides."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Run a batch every POOL_BATCH_SECONDS until interrupted.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            result = pool_trips()
+            self.stdout.write(
+                f"Pooled {result.pooled} of {result.requests} requests: "
+                f"{result.rides_created} new rides, {result.rides_extended} extended "
+                f"({time.monotonic() - started:.2f}s)."
+            )
+            if not options["loop"]:
+                return
+            time.sleep(max(0.0, settings.POOL_BATCH_SECONDS - (time.monotonic() - started)))
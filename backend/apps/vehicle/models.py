@@ -1,12 +1,14 @@
 from apps.common.models import TimeStampedModel
+from apps.events.models import OutboxMixin
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 User = get_user_model()
 
 
-class Vehicle(TimeStampedModel):
+class Vehicle(OutboxMixin, TimeStampedModel):
     LUXURY = "luxury"
     ECONOMY = "economy"
     SUV = "suv"
@@ -20,6 +22,8 @@ class Vehicle(TimeStampedModel):
         (VAN, "Van"),
         (ELECTRIC, "Electric"),
     ]
+    # Passenger seats by type; the capacity of a shared ride
+    SEATS = {LUXURY: 3, ECONOMY: 4, SUV: 6, VAN: 12, ELECTRIC: 4}
 
     driver = models.ForeignKey(
         User,
@@ -30,25 +34,39 @@ class Vehicle(TimeStampedModel):
     model = models.CharField(max_length=200)
     plate_number = models.CharField(max_length=20, unique=True)
     license = models.ImageField(upload_to="license/")
+    # Set once the WebP thumbnail of the license exists, see apps.common.thumbnails
+    license_thumbnail = models.CharField(max_length=255, blank=True, default="", editable=False)
     type = models.CharField(max_length=20, choices=VEHICLE_TYPE_CHOICES)
 
     def __str__(self):
         return f"{self.model} - {self.plate_number}"
 
+    @property
+    def seats(self):
+        return self.SEATS[self.type]
+
 
 # ----------------------------
 # LOCATION MODEL
 # ----------------------------
 
 
-class Location(TimeStampedModel):
+class Location(OutboxMixin, TimeStampedModel):
+    # Names appear in trip search documents, so edits go through the outbox
     name = models.CharField(max_length=255, unique=True)
+    # WGS84; optional, but distance-based features skip locations without them
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
 
     def __str__(self):
         return self.name
 
 
-class Route(TimeStampedModel):
+class Route(OutboxMixin, TimeStampedModel):
     pickup = models.ForeignKey(
         Location, related_name="routes_from", on_delete=models.CASCADE
     )
@@ -80,7 +98,47 @@ class Route(TimeStampedModel):
         return f"{self.pickup} ➜ {self.drop} - {self.price_af} AF"
 
 
-class Trip(TimeStampedModel):
+class SharedRide(OutboxMixin, TimeStampedModel):
+    """
+    Pooled requests on one route travelling in one vehicle, grouped by
+    ``apps.vehicle.pooling``. Each passenger pays ``seat_fare`` per seat.
+    """
+
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="shared_rides")
+    # Earliest departure of its trips; later requests join within POOL_WINDOW_MINUTES
+    departure = models.DateTimeField()
+    # The smallest vehicle type on the route that seats everyone
+    vehicle_type = models.CharField(max_length=20, choices=Vehicle.VEHICLE_TYPE_CHOICES)
+    seats = models.PositiveSmallIntegerField(default=0)
+    seat_fare = models.DecimalField(max_digits=10, decimal_places=2)
+    driver = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="shared_rides",
+    )
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            models.Index(fields=["route", "departure"], name="ride_route_departure_idx"),
+        ]
+
+    def __str__(self):
+        return f"Shared ride {self.id} on {self.route_id}: {self.seats}/{self.capacity} seats"
+
+    @property
+    def capacity(self):
+        return Vehicle.SEATS[self.vehicle_type]
+
+    def outbox_payload(self):
+        payload = super().outbox_payload()
+        payload.update(route=self.route_id, seats=self.seats, driver=self.driver_id)
+        return payload
+
+
+class Trip(OutboxMixin, TimeStampedModel):
     passenger = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="passenger_trips"
     )
@@ -97,13 +155,20 @@ class Trip(TimeStampedModel):
     route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="trips")
 
     distance_km = models.FloatField(default=0)
+    # Pickup to drop driving time, estimated from the distance matrix on request
+    eta_minutes = models.PositiveIntegerField(null=True, blank=True)
     fare = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
     # --- NEW FIELDS TO STORE MORE DETAILS ---
-    passenger_count = models.PositiveSmallIntegerField(default=1)
+    # The column range as a validator, so the API schema doesn't vary with the backend
+    passenger_count = models.PositiveSmallIntegerField(default=1, validators=[MaxValueValidator(32767)])
     notes_for_driver = models.TextField(blank=True)
     scheduled_for = models.DateTimeField(null=True, blank=True, help_text="If not null, the trip is scheduled for a future time.")
     # --- END OF NEW FIELDS ---
+    allow_pooling = models.BooleanField(default=False, help_text="The passenger accepts sharing the vehicle.")
+    shared_ride = models.ForeignKey(
+        SharedRide, on_delete=models.SET_NULL, null=True, blank=True, related_name="trips"
+    )
 
     STATUS_CHOICES = [
         ("requested", "Requested"),
@@ -118,9 +183,83 @@ class Trip(TimeStampedModel):
     start_time = models.DateTimeField(null=True, blank=True)
     end_time = models.DateTimeField(null=True, blank=True)
 
+    class Meta(TimeStampedModel.Meta):
+        # One index per TripFilter filter, each ending in request_time so the
+        # admin list's default ordering can be read straight from it.
+        indexes = [
+            models.Index(fields=["status", "request_time"], name="trip_status_requested_idx"),
+            models.Index(fields=["route", "request_time"], name="trip_route_requested_idx"),
+            models.Index(fields=["driver", "request_time"], name="trip_driver_requested_idx"),
+            models.Index(fields=["request_time"], name="trip_requested_idx"),
+            models.Index(fields=["fare"], name="trip_fare_idx"),
+        ]
+
     def __str__(self):
         return f"Trip {self.id} by {self.passenger.get_full_name}"
 
+    def outbox_payload(self):
+        payload = super().outbox_payload()
+        payload.update(
+            status=self.status,
+            route=self.route_id,
+            passenger=self.passenger_id,
+            driver=self.driver_id,
+            shared_ride=self.shared_ride_id,
+        )
+        return payload
+
+
+class ArchivedTrip(models.Model):
+    """
+    A completed or cancelled trip moved out of ``Trip`` by ``archive_trips``.
+    Keeps the original ``pkid``, ``id`` and timestamps so history reads and
+    references stay stable.
+    """
+
+    pkid = models.BigIntegerField(primary_key=True, editable=False)
+    id = models.UUIDField(editable=False, unique=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    passenger = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="archived_passenger_trips"
+    )
+    driver = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_driver_trips",
+    )
+    vehicle = models.ForeignKey(
+        Vehicle, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    route = models.ForeignKey(Route, on_delete=models.CASCADE, related_name="archived_trips")
+    distance_km = models.FloatField(default=0)
+    eta_minutes = models.PositiveIntegerField(null=True, blank=True)
+    fare = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    passenger_count = models.PositiveSmallIntegerField(default=1, validators=[MaxValueValidator(32767)])
+    notes_for_driver = models.TextField(blank=True)
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+    allow_pooling = models.BooleanField(default=False)
+    shared_ride = models.ForeignKey(
+        SharedRide, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_trips"
+    )
+    status = models.CharField(max_length=50, choices=Trip.STATUS_CHOICES)
+    request_time = models.DateTimeField(db_index=True)
+    start_time = models.DateTimeField(null=True, blank=True)
+    end_time = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-request_time"]
+
+    def __str__(self):
+        return f"Archived trip {self.id} by {self.passenger.get_full_name}"
+
+    @classmethod
+    def from_trip(cls, trip):
+        return cls(**{field.attname: getattr(trip, field.attname) for field in Trip._meta.concrete_fields})
+
 class DriverApplication(TimeStampedModel):
     class Status(models.TextChoices):
         PENDING = "pending", "Pending"
@@ -134,7 +273,7 @@ class DriverApplication(TimeStampedModel):
         limit_choices_to={'role': User.Role.PASSENGER}
     )
     license_number = models.CharField(max_length=100)
-    years_of_experience = models.PositiveIntegerField()
+    years_of_experience = models.PositiveIntegerField(validators=[MaxValueValidator(2147483647)])
     
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     reviewed_by = models.ForeignKey(
@@ -144,6 +283,12 @@ class DriverApplication(TimeStampedModel):
         related_name="reviewed_applications",
         limit_choices_to={'role': User.Role.ADMIN}
     )
+
+    class Meta(TimeStampedModel.Meta):
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="application_status_idx"),
+            models.Index(fields=["created_at"], name="application_created_idx"),
+        ]
     
     def __str__(self):
         return f"Application for {self.user.get_full_name}"
\ No newline at end of file
@@ -42,4 +42,13 @@ class IsAdmin(permissions.BasePermission):
     Allows access only to users with role 'admin'.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'admin'
\ No newline at end of file
+        return request.user.is_authenticated and request.user.role == 'admin'
+
+
+class IsAdminOrVehicleDriver(permissions.BasePermission):
+    """
+    Object-level permission for a vehicle's private files: admins and the vehicle's driver.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        return request.user.role == "admin" or obj.driver_id == request.user.pk
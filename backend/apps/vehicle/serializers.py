@@ -1,11 +1,26 @@
 from django.contrib.auth import get_user_model
+from django.urls import reverse
 from rest_framework import serializers
 
-from .models import Location, Route, Trip, Vehicle, DriverApplication
+from apps.common.projection import ProjectedSerializerMixin
+from apps.routing.matrix import estimate
+
+from .models import ArchivedTrip, Location, Route, Trip, Vehicle, DriverApplication
 
 User = get_user_model()
 
 
+class LicenseImageField(serializers.ImageField):
+    """Takes the license upload; reads back as the URL of ``VehicleLicenseView``, which checks the user."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = reverse("vehicle-license", kwargs={"id": value.instance.id})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
 class VehicleSerializer(serializers.ModelSerializer):
     driver_name = serializers.CharField(source="driver.get_full_name", read_only=True)
     driver = serializers.PrimaryKeyRelatedField(
@@ -13,6 +28,9 @@ class VehicleSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
+    license = LicenseImageField()
+    license_thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Vehicle
         fields = [
@@ -23,18 +41,43 @@ class VehicleSerializer(serializers.ModelSerializer):
             "model",
             "plate_number",
             "license",
+            "license_thumbnail",
             "type",
         ]
         read_only_fields = ["driver_name"]
 
+    def get_license_thumbnail(self, obj):
+        url = self.fields["license"].to_representation(obj.license)
+        return f"{url}?thumbnail=1" if url else None
 
-class LocationSerializer(serializers.ModelSerializer):
+
+class LocationSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Location
-        fields = ["id", "name","pk"]
+        fields = ["id", "name", "pk", "latitude", "longitude"]
+
+
+class RouteDistanceField(serializers.FloatField):
+    """Pickup to drop driving distance from the distance matrix; null until one is built."""
+
+    def __init__(self, **kwargs):
+        super().__init__(source="*", read_only=True, allow_null=True, **kwargs)
 
+    def to_representation(self, route):
+        return estimate(route)[0]
 
-class RouteSerializer(serializers.ModelSerializer):
+
+class RouteETAField(serializers.IntegerField):
+    """Pickup to drop driving time in minutes, like ``RouteDistanceField``."""
+
+    def __init__(self, **kwargs):
+        super().__init__(source="*", read_only=True, allow_null=True, **kwargs)
+
+    def to_representation(self, route):
+        return estimate(route)[1]
+
+
+class RouteSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     pickup = LocationSerializer(read_only=True)
     drop = LocationSerializer(read_only=True)
     pickup_id = serializers.PrimaryKeyRelatedField(
@@ -43,6 +86,11 @@ class RouteSerializer(serializers.ModelSerializer):
     drop_id = serializers.PrimaryKeyRelatedField(
         queryset=Location.objects.all(), source='drop', write_only=True
     )
+    distance_km = RouteDistanceField()
+    eta_minutes = RouteETAField()
+
+    projection_sources = {"distance_km": ["pickup", "drop"], "eta_minutes": ["pickup", "drop"]}
+
     class Meta:
         model = Route
         fields = [
@@ -51,6 +99,8 @@ class RouteSerializer(serializers.ModelSerializer):
             'pickup',
             'drop',
             'price_af',
+            'distance_km',
+            'eta_minutes',
             'drivers',
             'vehicles',
             'pickup_id', 
@@ -111,6 +161,7 @@ class TripRequestSerializer(serializers.ModelSerializer):
             "route_id",
             "route",
             "distance_km",
+            "eta_minutes",
             "fare",
             "status",
             "request_time",
@@ -119,16 +170,23 @@ class TripRequestSerializer(serializers.ModelSerializer):
             "passenger_count",    # New
             "notes_for_driver",   # New
             "scheduled_for",      # New
+            "allow_pooling",
+            "shared_ride",
         ]
         read_only_fields = [
-            "fare", "status", "request_time", "start_time", "end_time", "route",
-            "passenger_count", "notes_for_driver", "scheduled_for"
+            "eta_minutes", "fare", "status", "request_time", "start_time", "end_time", "route",
+            "passenger_count", "notes_for_driver", "scheduled_for", "shared_ride"
         ]
 
     def create(self, validated_data):
         route = validated_data.get('route')
         if route:
             validated_data['fare'] = route.price_af
+            # Without a matrix entry the client's distance (or 0) stays
+            distance_km, eta_minutes = estimate(route)
+            if distance_km is not None:
+                validated_data['distance_km'] = distance_km
+                validated_data['eta_minutes'] = eta_minutes
         
         validated_data['passenger'] = self.context['request'].user
         
@@ -177,20 +235,27 @@ class AdminTripUpdateSerializer(serializers.ModelSerializer):
         fields = ['driver', 'status']
 
 
-class AdminTripListSerializer(serializers.ModelSerializer):
+class AdminTripListSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     """
     A read-only serializer for the admin trip management page.
     It includes nested details for the passenger, driver, and route.
     """
+    projection_sources = {
+        "passenger": ["passenger__first_name", "passenger__last_name"],
+        "driver_name": ["driver__first_name", "driver__last_name"],
+        "archived": [],
+    }
     passenger = serializers.SerializerMethodField()
     route = RouteSerializer(read_only=True)
     driver_name = serializers.CharField(source='driver.get_full_name', read_only=True, allow_null=True)
+    archived = serializers.SerializerMethodField()
 
     class Meta:
         model = Trip
         # --- ADD THE NEW FIELDS TO THIS LIST ---
         fields = [
             'id',
+            'archived',
             'passenger',
             'driver', 
             'driver_name',
@@ -207,6 +272,9 @@ class AdminTripListSerializer(serializers.ModelSerializer):
         if obj.passenger:
             return obj.passenger.get_full_name
         return "N/A"
+
+    def get_archived(self, obj):
+        return isinstance(obj, ArchivedTrip)
     
 class DriverApplicationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -231,10 +299,11 @@ class AdminDriverApplicationSerializer(serializers.ModelSerializer):
             'id', 'applicant_name', 'license_number', 'years_of_experience',
             'status', 'reviewed_by'
         ]
-class AvailableTripRequestSerializer(serializers.ModelSerializer):
+class AvailableTripRequestSerializer(ProjectedSerializerMixin, serializers.ModelSerializer):
     """
     Shows detailed trip info for the "Trip Request Board" for drivers.
     """
+    projection_sources = {"passenger_name": ["passenger__first_name", "passenger__last_name"]}
     route = RouteSerializer(read_only=True)
     passenger_name = serializers.CharField(source='passenger.get_full_name', read_only=True)
 
@@ -242,7 +311,7 @@ class AvailableTripRequestSerializer(serializers.ModelSerializer):
         model = Trip
         fields = [
             'id', 'pk', 'passenger_name', 'route', 'fare', 'passenger_count',
-            'notes_for_driver', 'scheduled_for', 'request_time', 'status'
+            'notes_for_driver', 'scheduled_for', 'request_time', 'status', 'shared_ride'
         ]
 
 class DashboardRecentTripSerializer(serializers.ModelSerializer):
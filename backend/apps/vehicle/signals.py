@@ -0,0 +1,30 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from apps.common.thumbnails import schedule_thumbnail
+from apps.events.models import record_event
+
+from .models import Route, Vehicle
+
+
+@receiver(m2m_changed, sender=Route.drivers.through)
+@receiver(m2m_changed, sender=Route.vehicles.through)
+def record_route_assignment_change(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+    Driver and vehicle assignments change matching results, so they count as
+    route updates. ``set()``/``add()`` run these inside their own transaction.
+    """
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    field = "drivers" if sender is Route.drivers.through else "vehicles"
+    if not reverse:
+        record_event(instance, "updated", {"pkid": instance.pk, "m2m": field}, using)
+        return
+    for route in Route.objects.using(using).filter(pk__in=pk_set or ()):
+        record_event(route, "updated", {"pkid": route.pk, "m2m": field}, using)
+
+
+@receiver(post_save, sender=Vehicle)
+def create_license_thumbnail(sender, instance, **kwargs):
+    transaction.on_commit(lambda: schedule_thumbnail(instance.license))
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.events.models import OutboxEvent
+from apps.users.factories import DriverFactory, UserFactory
+from apps.vehicle.archive import TripHistory, archive_trips
+from apps.vehicle.models import ArchivedTrip, Location, Route, Trip
+from apps.vehicle.views import AdminTripListView
+
+
+@pytest.fixture
+def route():
+    return Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"),
+        drop=Location.objects.create(name="Herat"),
+        price_af=500,
+    )
+
+
+def make_trip(route, status, age_days=0):
+    trip = Trip.objects.create(passenger=UserFactory(), route=route, fare=route.price_af, status=status)
+    if age_days:
+        old = timezone.now() - timedelta(days=age_days)
+        Trip.objects.filter(pkid=trip.pkid).update(updated_at=old, request_time=old)
+        trip.refresh_from_db()
+    return trip
+
+
+@pytest.mark.django_db
+def test_archive_moves_only_finished_trips_past_retention(route, settings):
+    settings.TRIP_ARCHIVE_AFTER_DAYS = 30
+    old_done = make_trip(route, "completed", age_days=40)
+    old_cancelled = make_trip(route, "cancelled", age_days=40)
+    old_open = make_trip(route, "requested", age_days=40)
+    recent_done = make_trip(route, "completed")
+
+    assert archive_trips(batch_size=1) == 2
+
+    assert set(Trip.objects.values_list("pkid", flat=True)) == {old_open.pkid, recent_done.pkid}
+    archived = ArchivedTrip.objects.get(pkid=old_done.pkid)
+    assert (archived.id, archived.request_time, archived.fare) == (
+        old_done.id,
+        old_done.request_time,
+        old_done.fare,
+    )
+    assert ArchivedTrip.objects.filter(pkid=old_cancelled.pkid).exists()
+    assert OutboxEvent.objects.filter(event_type="trip.archived").count() == 2
+
+
+@pytest.mark.django_db
+def test_trip_history_merges_tables_newest_first(route):
+    oldest = make_trip(route, "completed", age_days=60)
+    older = make_trip(route, "cancelled", age_days=50)
+    archive_trips(before=timezone.now() - timedelta(days=45))
+    newest = make_trip(route, "requested")
+
+    history = TripHistory()
+    assert history.count() == 3
+    assert [t.pkid for t in history] == [newest.pkid, older.pkid, oldest.pkid]
+    assert [type(t) for t in history[1:]] == [ArchivedTrip, ArchivedTrip]
+    assert history.filter(status="cancelled")[0].pkid == older.pkid
+
+
+@pytest.mark.django_db
+def test_admin_trip_list_reaches_archive(route):
+    make_trip(route, "completed", age_days=400)
+    call_command("archive_trips", days=90, stdout=StringIO())
+    live = make_trip(route, "requested")
+    admin = UserFactory(role="admin")
+    view = AdminTripListView.as_view()
+
+    def get(**params):
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user=admin)
+        return view(request).data
+
+    assert [row["id"] for row in get()] == [str(live.id)]
+    page = get(history="all", limit=1, offset=1)
+    assert page["count"] == 2
+    assert page["results"][0]["archived"] is True
+
+
+@pytest.mark.django_db
+def test_passenger_and_driver_lists_include_archived_trips(client, route):
+    driver = DriverFactory()
+    old = make_trip(route, "completed", age_days=400)
+    Trip.objects.filter(pkid=old.pkid).update(driver=driver)
+    archive_trips(before=timezone.now() - timedelta(days=90))
+    live = Trip.objects.create(passenger=old.passenger, driver=driver, route=route, fare=route.price_af)
+
+    def ids(path, user):
+        response = client.get(path, HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        assert response.status_code == 200, response.content
+        return [row["id"] for row in response.json()]
+
+    assert ids("/api/v1/vehicle/trips/", old.passenger) == [str(live.id), str(old.id)]
+    assert ids("/api/v1/vehicle/driver/trips/", driver) == [str(live.id), str(old.id)]
@@ -0,0 +1,150 @@
+import asyncio
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common import profiling
+from apps.common.asyncviews import AsyncReadView
+from apps.common.cache import registered_caches
+from apps.common.routers import routing
+from apps.users.factories import AdminFactory, DriverFactory, PassengerFactory
+from apps.vehicle import async_views
+from apps.vehicle.archive import archive_trips
+from apps.vehicle.async_views import (
+    AsyncAdminDashboardStatsView,
+    AsyncAvailableTripRequestListView,
+    AsyncDriverTripListView,
+    AsyncRouteListView,
+)
+from apps.vehicle.models import Location, Route, Trip
+
+pytestmark = pytest.mark.django_db
+
+
+def token(user):
+    return f"Bearer {RefreshToken.for_user(user).access_token}"
+
+
+def call_async(view, path, user=None):
+    headers = {"Authorization": token(user)} if user else {}
+    response = async_to_sync(view.as_view())(AsyncRequestFactory().get(path, headers=headers))
+    return response.status_code, json.loads(response.content)
+
+
+def clear_read_caches():
+    cache.clear()
+    for read_cache in registered_caches().values():
+        read_cache.local.clear()
+
+
+@pytest.fixture(autouse=True)
+def fresh_read_caches():
+    # Users and paths repeat across tests, and so would their cache keys
+    clear_read_caches()
+
+
+@pytest.fixture
+def board():
+    routes = [
+        Route.objects.create(
+            pickup=Location.objects.create(name=f"From {n}"), drop=Location.objects.create(name=f"To {n}"), price_af=500
+        )
+        for n in range(3)
+    ]
+    driver = DriverFactory()
+    driver.available_routes.add(*routes[:2])
+    passenger = PassengerFactory()
+    for route in routes:
+        Trip.objects.create(passenger=passenger, route=route, fare=500, passenger_count=2)
+    Trip.objects.create(passenger=passenger, route=routes[0], fare=500, driver=driver, status="in_progress")
+    done = Trip.objects.create(passenger=passenger, route=routes[1], fare=500, driver=driver, status="completed")
+    Trip.objects.filter(pkid=done.pkid).update(updated_at=timezone.now() - timedelta(days=60))
+    assert archive_trips(before=timezone.now() - timedelta(days=30)) == 1
+    return driver
+
+
+PARITY = [
+    (AsyncAvailableTripRequestListView, "/api/v1/vehicle/driver/available-trips/", "driver"),
+    (AsyncAvailableTripRequestListView, "/api/v1/vehicle/driver/available-trips/?fields=id,route.pickup", "driver"),
+    (AsyncDriverTripListView, "/api/v1/vehicle/driver/trips/", "driver"),
+    (AsyncRouteListView, "/api/v1/vehicle/vehicle/routes/", None),
+    (AsyncAdminDashboardStatsView, "/api/v1/vehicle/admin/dashboard-stats/", "admin"),
+]
+
+
+def test_parity_covers_every_async_view():
+    views = {value for value in vars(async_views).values() if isinstance(value, type) and issubclass(value, AsyncReadView)}
+    assert views - {AsyncReadView} == {view for view, _, _ in PARITY}
+
+
+@pytest.mark.parametrize("pinned", [False, True], ids=["unpinned", "pinned"])
+@pytest.mark.parametrize("view, path, who", PARITY)
+def test_async_views_match_the_drf_views(client, board, view, path, who, pinned):
+    user = {"driver": board, "admin": AdminFactory(), None: None}[who]
+    # A client pinned to the primary after a write skips coalescing on both sides
+    with routing(False) as state:
+        state.pinned = pinned
+        expected = client.get(path, **({"HTTP_AUTHORIZATION": token(user)} if user else {}))
+        assert expected.status_code == 200
+        # Both views share the read caches; the async one has to compute its own
+        clear_read_caches()
+        assert call_async(view, path, user) == (200, expected.json())
+
+
+def test_async_views_deny_like_drf(client, board):
+    path = "/api/v1/vehicle/driver/available-trips/"
+    passenger = PassengerFactory()
+    for user in (None, passenger):
+        expected = client.get(path, **({"HTTP_AUTHORIZATION": token(user)} if user else {}))
+        assert call_async(AsyncAvailableTripRequestListView, path, user) == (expected.status_code, expected.json())
+    assert expected.status_code == 403
+
+
+def test_route_list_coalesces_like_the_drf_viewset(monkeypatch):
+    calls = []
+
+    async def slow_list(self, queryset):
+        calls.append(self.request.headers.get("Accept-Language"))
+        number = len(calls)
+        # Keep the leader in flight until every request has arrived
+        await asyncio.sleep(0.1)
+        return [number]
+
+    monkeypatch.setattr(AsyncRouteListView, "serialize_list", slow_list)
+    view = AsyncRouteListView.as_view()
+    path = "/api/v1/vehicle/vehicle/routes/"
+
+    async def get(pinned=False, **headers):
+        with routing(False) as state:
+            state.pinned = pinned
+            response = await view(AsyncRequestFactory().get(path, headers=headers))
+        return json.loads(response.content)
+
+    async def burst():
+        return await asyncio.gather(get(), get(), get(pinned=True), get(**{"Accept-Language": "fa"}))
+
+    leader, follower, pinned, persian = async_to_sync(burst)()
+    assert leader == follower
+    assert len(calls) == 3
+    assert len({tuple(leader), tuple(pinned), tuple(persian)}) == 3
+
+
+@override_settings(PROFILING_ENABLED=True, COMPRESSION_MIN_SIZE=0)
+def test_middleware_runs_natively_under_asgi(async_client, board):
+    profiling.metrics.reset()
+    response = async_to_sync(async_client.get)(
+        "/api/v1/vehicle/vehicle/routes/", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.content))) == 3
+    assert "Server-Timing" in response
+    assert profiling.metrics.queries["apps.vehicle.views.RouteViewSet"] >= 1
+    profiling.metrics.reset()
@@ -0,0 +1,146 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.events.models import OutboxEvent
+from apps.users.factories import DriverFactory, PassengerFactory
+from apps.vehicle.factories import VehicleFactory
+from apps.vehicle.models import Location, Route, SharedRide, Trip, Vehicle
+from apps.vehicle.pooling import Group, Request, plan, pool_trips
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def pooling_settings(settings):
+    settings.POOL_WINDOW_MINUTES = 10
+    settings.POOL_HORIZON_MINUTES = 30
+    settings.POOL_SEAT_FARE_SHARE = "0.6"
+    settings.POOL_DEFAULT_VEHICLE_TYPE = Vehicle.ECONOMY
+    settings.LOCATION_ACCEPT_RADIUS_KM = 0
+
+
+@pytest.fixture
+def route():
+    return Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"),
+        drop=Location.objects.create(name="Jalalabad"),
+        price_af=500,
+    )
+
+
+def request_trip(route, seats=1, minutes=0, allow_pooling=True):
+    return Trip.objects.create(
+        passenger=PassengerFactory(),
+        route=route,
+        fare=route.price_af,
+        passenger_count=seats,
+        allow_pooling=allow_pooling,
+        scheduled_for=timezone.now() + timedelta(minutes=minutes),
+    )
+
+
+def test_plan_keeps_groups_within_capacity_and_window():
+    rng = random.Random(3)
+    start = timezone.now()
+    window = timedelta(minutes=10)
+    requests = [
+        Request(key, rng.choice("ab"), start + timedelta(minutes=rng.uniform(0, 60)), rng.choice([1, 1, 2, 3]))
+        for key in range(500)
+    ]
+    groups = plan(requests, {"a": 4, "b": 12}, window)
+
+    placed = [request.key for group in groups for request in group.requests]
+    assert sorted(placed) == list(range(500))
+    for group in groups:
+        assert group.seats == sum(request.seats for request in group.requests) <= group.capacity
+        assert {request.route for request in group.requests} == {group.route}
+        departures = [request.departure for request in group.requests]
+        assert max(departures) - min(departures) <= window
+    # Best fit fills vans well past one passenger each
+    vans = [group for group in groups if group.route == "b"]
+    assert sum(group.seats for group in vans) / len(vans) > 8
+
+
+def test_plan_fills_existing_rides_first():
+    start = timezone.now()
+    ride = Group("a", 6, start, seats=4, ride=7)
+    groups = plan([Request(1, "a", start + timedelta(minutes=5), 2)], {"a": 6}, timedelta(minutes=10), [ride])
+    assert groups == [ride]
+    assert (ride.seats, [request.key for request in ride.requests]) == (6, [1])
+
+
+def test_pool_trips_groups_compatible_requests(route):
+    VehicleFactory(type=Vehicle.SUV).available_routes.add(route)
+    VehicleFactory(type=Vehicle.ECONOMY).available_routes.add(route)
+    first = request_trip(route, seats=2)
+    second = request_trip(route, seats=2, minutes=5)
+    third = request_trip(route, seats=1, minutes=8)
+    solo = request_trip(route, allow_pooling=False)
+    later = request_trip(route, minutes=20)
+    beyond_horizon = request_trip(route, minutes=45)
+
+    result = pool_trips()
+
+    assert (result.requests, result.pooled, result.rides_created) == (4, 3, 1)
+    ride = SharedRide.objects.get()
+    # Five seats need the SUV rather than the economy car
+    assert (ride.seats, ride.vehicle_type, ride.capacity, ride.seat_fare) == (5, Vehicle.SUV, 6, Decimal("300.00"))
+    assert set(ride.trips.values_list("pkid", flat=True)) == {first.pkid, second.pkid, third.pkid}
+    for trip in (first, second, third):
+        trip.refresh_from_db()
+        assert trip.fare == ride.seat_fare * trip.passenger_count
+    for trip in (solo, later, beyond_horizon):
+        trip.refresh_from_db()
+        assert (trip.shared_ride_id, trip.fare) == (None, route.price_af)
+    assert OutboxEvent.objects.filter(event_type="sharedride.created").count() == 1
+
+
+def test_later_batches_extend_rides_and_release_cancelled_seats(route):
+    first, second = request_trip(route, seats=2), request_trip(route, seats=1, minutes=2)
+    pool_trips()
+    ride = SharedRide.objects.get()
+    assert (ride.seats, ride.vehicle_type) == (3, Vehicle.ECONOMY)
+
+    Trip.objects.filter(pkid=second.pkid).update(status="cancelled")
+    newcomer = request_trip(route, seats=2, minutes=4)
+    result = pool_trips()
+
+    assert (result.pooled, result.rides_created, result.rides_extended) == (1, 0, 1)
+    ride.refresh_from_db()
+    assert ride.seats == 4
+    assert set(ride.trips.filter(status="requested").values_list("pkid", flat=True)) == {first.pkid, newcomer.pkid}
+
+    Trip.objects.filter(shared_ride=ride).update(status="cancelled")
+    request_trip(route, minutes=5)
+    pool_trips()
+    assert not SharedRide.objects.filter(pkid=ride.pkid).exists()
+
+
+def test_accepting_a_pooled_trip_assigns_the_whole_ride(client, route):
+    VehicleFactory(type=Vehicle.VAN).available_routes.add(route)
+    trips = [request_trip(route, seats=2), request_trip(route, seats=2, minutes=1), request_trip(route, minutes=2)]
+    pool_trips()
+    ride = SharedRide.objects.get()
+    driver = DriverFactory()
+    driver.available_routes.add(route)
+    VehicleFactory(driver=driver, type=Vehicle.ECONOMY)
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(driver).access_token}"}
+
+    response = client.post(f"/api/v1/vehicle/trips/{trips[0].pk}/accept/", **headers)
+    assert response.status_code == 403
+    assert "at least 5 seats" in response.json()["detail"]
+
+    van = VehicleFactory(driver=driver, type=Vehicle.VAN)
+    response = client.post(f"/api/v1/vehicle/trips/{trips[1].pk}/accept/", **headers)
+    assert response.status_code == 200, response.content
+
+    ride.refresh_from_db()
+    assert (ride.driver_id, ride.vehicle_id) == (driver.pk, van.pk)
+    for trip in trips:
+        trip.refresh_from_db()
+        assert (trip.driver_id, trip.vehicle_id, trip.status) == (driver.pk, van.pk, "in_progress")
@@ -1,5 +1,6 @@
 # apps/vehicle/urls.py
 
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -16,6 +17,7 @@ from .views import (
     TripDetailView,
     TripRequestCreateView,
     VehicleDetailView,
+    VehicleLicenseView,
     VehicleListCreateView,
     AvailableTripRequestListView,
     AcceptTripView,   
@@ -23,6 +25,12 @@ from .views import (
     AdminDashboardStatsView
 )
 # --- END OF FIX ---
+from .async_views import (
+    AsyncAdminDashboardStatsView,
+    AsyncAvailableTripRequestListView,
+    AsyncDriverTripListView,
+    AsyncRouteListView,
+)
 
 router = DefaultRouter()
 router.register("vehicle/routes", RouteViewSet, basename="routes")
@@ -31,6 +39,7 @@ urlpatterns = [
     path("", include(router.urls)),
     path("vehicles/", VehicleListCreateView.as_view(), name="vehicle-list-create"),
     path("vehicles/<uuid:id>/", VehicleDetailView.as_view(), name="vehicle-detail"),
+    path("vehicles/<uuid:id>/license/", VehicleLicenseView.as_view(), name="vehicle-license"),
     path("locations/", LocationListCreateView.as_view(), name="location-list-create"),
     path("locations/<uuid:id>/", LocationDetailView.as_view(), name="location-detail"),
     path("trips/", TripRequestCreateView.as_view(), name="trip-list-create"),
@@ -45,4 +54,29 @@ urlpatterns = [
     path("driver/vehicles/", DriverVehicleManageView.as_view(), name="driver-vehicle-list-create"),
     path("admin/vehicles/", VehicleListCreateView.as_view(), name="admin-vehicle-list-create"),
     path("admin/dashboard-stats/", AdminDashboardStatsView.as_view(), name="admin-dashboard-stats"),
-]
\ No newline at end of file
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Matched first; other methods than GET and HEAD go to the DRF views
+    urlpatterns = [
+        path(
+            "vehicle/routes/",
+            AsyncRouteListView.as_view(fallback=RouteViewSet.as_view({"get": "list", "post": "create"})),
+            name="routes-list",
+        ),
+        path(
+            "driver/trips/",
+            AsyncDriverTripListView.as_view(fallback=DriverTripListView.as_view()),
+            name="driver-trip-list",
+        ),
+        path(
+            "driver/available-trips/",
+            AsyncAvailableTripRequestListView.as_view(fallback=AvailableTripRequestListView.as_view()),
+            name="driver-available-trips",
+        ),
+        path(
+            "admin/dashboard-stats/",
+            AsyncAdminDashboardStatsView.as_view(fallback=AdminDashboardStatsView.as_view()),
+            name="admin-dashboard-stats",
+        ),
+    ] + urlpatterns
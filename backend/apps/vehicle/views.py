@@ -2,10 +2,16 @@
 from datetime import date, timedelta
 from django.db.models.functions import TruncDate
 from django.db.models import Count 
-from rest_framework import generics, permissions, viewsets
+from django.http import Http404
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, generics, permissions, viewsets
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from .models import Location, Route, Trip, Vehicle, DriverApplication
-from .permissions import IsAdmin, IsDriver, IsOwnerOrReadOnly, IsPassenger
+from .archive import TripHistory
+from .caches import driver_trips_cache, driver_vehicles_cache
+from .filters import DriverApplicationFilter, TripFilter
+from .models import Location, Route, SharedRide, Trip, Vehicle, DriverApplication
+from .permissions import IsAdmin, IsAdminOrVehicleDriver, IsDriver, IsOwnerOrReadOnly, IsPassenger
 from rest_framework.permissions import IsAuthenticated, AllowAny 
 from .serializers import (
     AdminDriverApplicationSerializer, AdminTripListSerializer, AdminTripUpdateSerializer,
@@ -13,6 +19,15 @@ from .serializers import (
     TripRequestSerializer, TripUpdateSerializer, VehicleSerializer, AvailableTripRequestSerializer,DashboardRecentTripSerializer
 )
 from django.contrib.auth import get_user_model
+from apps.common.cache import CachedReadMixin
+from apps.common.coalesce import CoalescedReadMixin
+from apps.common.projection import ProjectionMixin
+from apps.common.routers import primary_db
+from apps.common.thumbnails import has_thumbnail, thumbnail_name
+from apps.common.transactions import write_transaction
+from apps.common.views import FileContentNegotiation, media_response
+from apps.search.filters import IndexedSearchFilter
+from apps.tracking.matching import nearest_first, too_far_to_accept
 from rest_framework import status
 from rest_framework.response import Response # <-- Add Response
 from rest_framework.views import APIView
@@ -28,12 +43,13 @@ class VehicleListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         # This logic is for an admin creating a vehicle for a driver
         serializer.save()
-class DriverVehicleManageView(generics.ListCreateAPIView):
+class DriverVehicleManageView(CachedReadMixin, generics.ListCreateAPIView):
     """
     Allows a logged-in driver to list and create THEIR OWN vehicles.
     """
     serializer_class = VehicleSerializer
     permission_classes = [IsDriver] # <-- Only drivers can access this
+    read_cache = driver_vehicles_cache
 
     def get_queryset(self):
         """
@@ -54,6 +70,28 @@ class VehicleDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "id"
 
 
+class VehicleLicenseView(generics.GenericAPIView):
+    """
+    The vehicle's license image, or with ``?thumbnail=1`` its WebP thumbnail
+    once generated, for admins and the vehicle's driver. License images are
+    not served from ``MEDIA_URL``.
+    """
+
+    queryset = Vehicle.objects.all()
+    permission_classes = [IsAuthenticated, IsAdminOrVehicleDriver]
+    content_negotiation_class = FileContentNegotiation
+    lookup_field = "id"
+
+    def get(self, request, id):
+        vehicle = self.get_object()
+        if not vehicle.license:
+            raise Http404("No license image.")
+        name = vehicle.license.name
+        if request.query_params.get("thumbnail") and has_thumbnail(vehicle.license):
+            name = thumbnail_name(name)
+        return media_response(request, name, public=False)
+
+
 class LocationListCreateView(generics.ListCreateAPIView):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
@@ -67,9 +105,12 @@ class LocationDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = "id"
 
 
-class RouteViewSet(viewsets.ModelViewSet):
+class RouteViewSet(CoalescedReadMixin, ProjectionMixin, viewsets.ModelViewSet):
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
+    # Public reads; concurrent identical requests share one rendered response
+    coalesce_actions = ("list", "retrieve")
+    coalesce_public = True
 
     def get_permissions(self):
        
@@ -88,31 +129,69 @@ class TripRequestCreateView(generics.ListCreateAPIView):
     permission_classes = [AllowAny]
 
     def get_queryset(self):
-        return Trip.objects.filter(passenger=self.request.user)
+        # Archived trips are still the passenger's history
+        return TripHistory().filter(passenger=self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(passenger=self.request.user)
 
 
-class AdminTripListView(generics.ListAPIView):
+class AdminTripListView(ProjectionMixin, generics.ListAPIView):
+    """
+    Live trips, newest first. ``?history=all`` also includes archived trips;
+    pass ``?limit=&offset=`` to page through them and ``?fields=``/``?exclude=``
+    to trim rows. Filters are described on ``TripFilter``; ``?search=`` goes
+    through the trip search index (passenger and driver names, passenger
+    email, route and notes), and ``?ordering=`` accepts request_time, fare and
+    status. All three apply to the merged history too.
+    """
     queryset = Trip.objects.select_related('passenger', 'route__pickup', 'route__drop', 'driver').all().order_by('-request_time')
     serializer_class = AdminTripListSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    # Unpaginated unless ?limit= is given, so the default response is unchanged
+    pagination_class = LimitOffsetPagination
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
+    filterset_class = TripFilter
+    search_kind = 'trip'
+    # Only used on databases without a full-text index
+    search_fields = [
+        'passenger__first_name', 'passenger__last_name', 'passenger__email',
+        'driver__first_name', 'driver__last_name',
+    ]
+    ordering_fields = ['request_time', 'fare', 'status']
 
-
-class DriverTripListView(generics.ListAPIView):
+    def get_queryset(self):
+        if self.request.query_params.get('history') == 'all':
+            return TripHistory()
+        return super().get_queryset()
+
+    def filter_queryset(self, queryset):
+        if isinstance(queryset, TripHistory):
+            # The filterset and search apply to the live and archived tables
+            # separately; archived trips keep their pkid, so their documents too
+            history = TripHistory(self.filter_trips(queryset.trips), self.filter_trips(queryset.archived))
+            ordering = filters.OrderingFilter().get_ordering(self.request, queryset, self)
+            return history.order_by(*ordering) if ordering else history
+        return super().filter_queryset(queryset)
+
+    def filter_trips(self, queryset):
+        filterset = self.filterset_class(self.request.query_params, queryset=queryset, request=self.request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        return IndexedSearchFilter().filter_queryset(self.request, filterset.qs, self)
+
+
+class DriverTripListView(CachedReadMixin, generics.ListAPIView):
     serializer_class = AvailableTripRequestSerializer 
     permission_classes = [permissions.IsAuthenticated, IsDriver]
+    read_cache = driver_trips_cache
 
     def get_queryset(self):
         """
-        This queryset is correct and pre-fetches all necessary data.
+        The driver's live and archived trips, newest first. ``TripHistory``
+        loads the passenger and route with each page.
         """
-        return Trip.objects.filter(
-            driver=self.request.user
-        ).select_related(
-            'passenger', 'route__pickup', 'route__drop'
-        ).order_by('-request_time')
+        return TripHistory().filter(driver=self.request.user)
 
 
 class TripDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -140,6 +219,12 @@ class AdminApplicationListView(generics.ListAPIView):
     queryset = DriverApplication.objects.all().order_by('status', '-created_at')
     serializer_class = AdminDriverApplicationSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter]
+    filterset_class = DriverApplicationFilter
+    # ?search= matches the applicant's user document
+    search_kind = 'user'
+    search_path = 'user'
+    search_fields = ['user__first_name', 'user__last_name', 'user__email']
 
 # --- THIS IS THE MISSING VIEW CLASS ---
 class AdminApplicationDetailView(generics.RetrieveUpdateAPIView):
@@ -151,13 +236,22 @@ class AdminApplicationDetailView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsAdmin]
     lookup_field = 'id' # Use the application's UUID for the lookup
 
-class AvailableTripRequestListView(generics.ListAPIView):
+@primary_db
+class AvailableTripRequestListView(ProjectionMixin, generics.ListAPIView):
     """
     Provides a list of unassigned trips on routes the logged-in driver services.
+    ``?ordering=nearest`` puts the pickups closest to the driver's live
+    position first.
     """
     serializer_class = AvailableTripRequestSerializer # <-- ERROR HAPPENS HERE
     permission_classes = [IsDriver]
 
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.query_params.get('ordering') == 'nearest':
+            return nearest_first(list(queryset), self.request.user.pk)
+        return queryset
+
     def get_queryset(self):
         driver = self.request.user
         # Get all routes this driver is assigned to
@@ -179,27 +273,55 @@ class AcceptTripView(APIView):
 
     def post(self, request, pk, format=None):
         driver = request.user
-        try:
-            trip = Trip.objects.get(pk=pk)
-        except Trip.DoesNotExist:
-            return Response({'detail': 'Trip not found.'}, status=status.HTTP_404_NOT_FOUND)
+        # One write transaction (BEGIN IMMEDIATE on SQLite, a row lock on
+        # PostgreSQL) so two drivers can't both pass the checks below.
+        with write_transaction():
+            try:
+                trip = Trip.objects.select_for_update().get(pk=pk)
+            except Trip.DoesNotExist:
+                return Response({'detail': 'Trip not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-        # Security Checks
-        if trip.driver is not None:
-            return Response({'detail': 'This trip has already been assigned.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        if trip.status != 'requested':
-            return Response({'detail': 'This trip is not available for acceptance.'}, status=status.HTTP_400_BAD_REQUEST)
+            # Security Checks
+            if trip.driver_id is not None:
+                return Response({'detail': 'This trip has already been assigned.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        if driver not in trip.route.drivers.all():
-             return Response({'detail': 'You are not authorized to accept trips for this route.'}, status=status.HTTP_403_FORBIDDEN)
+            if trip.status != 'requested':
+                return Response({'detail': 'This trip is not available for acceptance.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Assign the trip
-        trip.driver = driver
-        trip.status = 'in_progress'
-        trip.save()
+            if not driver.available_routes.filter(pk=trip.route_id).exists():
+                 return Response({'detail': 'You are not authorized to accept trips for this route.'}, status=status.HTTP_403_FORBIDDEN)
+
+            if too_far_to_accept(driver.pk, trip.route_id):
+                return Response({'detail': 'You are too far from the pickup to accept this trip.'}, status=status.HTTP_403_FORBIDDEN)
+
+            if trip.shared_ride_id is not None:
+                return self.accept_shared_ride(driver, trip.shared_ride_id)
+
+            # Assign the trip
+            trip.driver = driver
+            trip.status = 'in_progress'
+            trip.save(update_fields=['driver', 'status', 'updated_at'])
 
         return Response({'detail': 'Trip accepted successfully.'}, status=status.HTTP_200_OK)
+
+    def accept_shared_ride(self, driver, ride_pk):
+        """Accepting one trip of a shared ride takes every open trip on it, in the driver's smallest vehicle that fits."""
+        ride = SharedRide.objects.select_for_update().get(pk=ride_pk)
+        if ride.driver_id is not None:
+            return Response({'detail': 'This trip has already been assigned.'}, status=status.HTTP_400_BAD_REQUEST)
+        fitting = [vehicle for vehicle in driver.vehicles.all() if vehicle.seats >= ride.seats]
+        if not fitting:
+            return Response(
+                {'detail': f'You need a vehicle with at least {ride.seats} seats for this shared ride.'},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        vehicle = min(fitting, key=lambda vehicle: vehicle.seats)
+        ride.driver, ride.vehicle = driver, vehicle
+        ride.save(update_fields=['driver', 'vehicle', 'updated_at'])
+        for trip in ride.trips.select_for_update().filter(status='requested', driver__isnull=True):
+            trip.driver, trip.vehicle, trip.status = driver, vehicle, 'in_progress'
+            trip.save(update_fields=['driver', 'vehicle', 'status', 'updated_at'])
+        return Response({'detail': 'Shared ride accepted successfully.'}, status=status.HTTP_200_OK)
     
 
 class AdminDashboardStatsView(APIView):
@@ -211,7 +333,7 @@ class AdminDashboardStatsView(APIView):
         total_users = User.objects.count()
         total_drivers = User.objects.filter(role=User.Role.DRIVER).count()
         total_passengers = User.objects.filter(role=User.Role.PASSENGER).count()
-        total_trips = Trip.objects.count()
+        total_trips = TripHistory().count()
         pending_applications = DriverApplication.objects.filter(status='pending').count()
 
         # Recent Trips List (Last 5)
@@ -0,0 +1,89 @@
+"""
+Benchmarks for the booking backend. Every module is runnable from the backend
+directory with ``python -m benchmarks.<module> --help`` and works on a
+throwaway test database, never on the configured one.
+"""
+import contextlib
+import logging
+import os
+import statistics
+import time
+
+
+def setup():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark-only-secret-key")
+    import django
+
+    django.setup()
+    # Per-row INFO logs (e.g. profile creation) would dominate the timings
+    logging.disable(logging.INFO)
+
+
+@contextlib.contextmanager
+def test_database(verbosity=0, name=None):
+    """
+    Create the test database for the default connection and drop it afterwards.
+    ``name`` overrides the test database name, e.g. a file path so SQLite
+    benchmarks that use threads get a real file instead of a shared-cache
+    in-memory database.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    if name:
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = name
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+class Timer:
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """p50/p95/p99 and mean of a list of durations in seconds, in milliseconds."""
+    return {
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+    }
+
+
+def report(title, rows):
+    """Print ``rows`` (a list of dicts sharing the same keys) as an aligned table."""
+    print(f"\n{title}")
+    if not rows:
+        return
+    columns = list(rows[0])
+    cells = [[_format(row[c]) for c in columns] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def _format(value):
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
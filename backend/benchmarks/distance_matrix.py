@@ -0,0 +1,102 @@
+"""
+Distance/ETA matrix (``apps.routing.matrix``): time to rebuild it for
+``--locations`` locations scattered over Afghanistan, its size on disk and
+the cost of a lookup once it is memory-mapped.
+
+With ``--road-degree N`` a road graph is generated as well, joining every
+location to its N nearest neighbours, and the rebuild includes the fastest
+routes over it (one Dijkstra per location, pure Python).
+
+    python -m benchmarks.distance_matrix
+    python -m benchmarks.distance_matrix --locations 5000 --road-degree 3
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+# Latitude and longitude bounds
+AREA = ((29.4, 38.5), (60.5, 74.9))
+
+
+def write_road_graph(path, names, points, degree, rng):
+    """Two-way segments from each location to its ``degree`` nearest neighbours, at 40-90 km/h."""
+    import numpy as np
+
+    lat, lng = np.radians(points[:, 0]), np.radians(points[:, 1])
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["from", "to", "distance_km", "duration_min"])
+        for i in range(len(points)):
+            # Equirectangular distance is plenty to pick neighbours
+            x = (lng - lng[i]) * np.cos((lat + lat[i]) / 2)
+            km = 6371 * np.hypot(x, lat - lat[i])
+            for j in np.argpartition(km, degree)[: degree + 1]:
+                if j != i:
+                    road_km = km[j] * rng.uniform(1.1, 1.5)
+                    writer.writerow([names[i], names[j], f"{road_km:.2f}", f"{road_km / rng.uniform(40, 90) * 60:.2f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=5000)
+    parser.add_argument("--road-degree", type=int, default=0, help="Road segments per location; 0 for none.")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    setup()
+    import numpy as np
+    from django.conf import settings
+
+    from apps.routing import matrix
+    from apps.vehicle.models import Location
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp, test_database():
+        settings.DISTANCE_MATRIX_DIR = os.path.join(tmp, "matrix")
+        points = np.array([(rng.uniform(*AREA[0]), rng.uniform(*AREA[1])) for _ in range(args.locations)])
+        names = [f"Place {i}" for i in range(args.locations)]
+        Location.objects.bulk_create(
+            [Location(name=name, latitude=lat, longitude=lng) for name, (lat, lng) in zip(names, points)],
+            batch_size=2000,
+        )
+
+        rows = []
+        with Timer() as timer:
+            built = matrix.build(road_graph="")
+        rows.append({"source": "coordinates", "segments": 0, "build_s": timer.elapsed})
+        if args.road_degree:
+            roads = os.path.join(tmp, "roads.csv")
+            write_road_graph(roads, names, points, args.road_degree, rng)
+            with open(roads) as handle:
+                segments = sum(1 for _ in handle) - 1
+            with Timer() as timer:
+                built = matrix.build(road_graph=roads)
+            rows.append({"source": "road graph", "segments": segments, "build_s": timer.elapsed})
+        size_mb = sum(os.path.getsize(built.path / name) for name in os.listdir(built.path)) / 2**20
+        for row in rows:
+            row["locations"] = args.locations
+            row["disk_mb"] = size_mb
+
+        pks = built.pks.tolist()
+        pairs = [(rng.choice(pks), rng.choice(pks)) for _ in range(args.lookups)]
+        with Timer() as total:
+            for origin, destination in pairs:
+                matrix.leg(origin, destination)
+        samples = []
+        for origin, destination in pairs[:10_000]:
+            with Timer() as timer:
+                matrix.leg(origin, destination)
+            samples.append(timer.elapsed)
+        lookup = {"lookups": args.lookups, "per_s": args.lookups / total.elapsed}
+        lookup.update(summarize(samples))
+
+    report("Distance matrix rebuild", rows)
+    report("matrix.leg() on the memory-mapped matrix", [lookup])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Password hashing cost per hasher profile (see PASSWORD_HASHER_PROFILES).
+
+Reports logins/s per core (``authenticate()`` against a test user, which is
+what ``TokenObtainPairView`` does), single-threaded hashes/s, and bulk hashing
+throughput through the ``apps.users.hashing`` process pool.
+
+    python -m benchmarks.hashing --profile pbkdf2 --profile argon2 --logins 50
+"""
+import argparse
+import os
+
+from benchmarks import Timer, report, setup, test_database
+
+PASSWORD = "secure_password123"
+
+
+def run_profile(name, logins, bulk, workers):
+    from django.conf import settings
+    from django.contrib.auth import authenticate, get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.test.utils import override_settings
+
+    from apps.users.hashing import hash_passwords
+
+    User = get_user_model()
+    hashers = [settings.PASSWORD_HASHER_PROFILES[name]] + [
+        h for n, h in settings.PASSWORD_HASHER_PROFILES.items() if n != name
+    ]
+    with override_settings(PASSWORD_HASHERS=hashers):
+        email = f"bench-{name}@example.com"
+        User.objects.create_user("Bench", "User", email, PASSWORD)
+
+        with Timer() as login:
+            for _ in range(logins):
+                assert authenticate(email=email, password=PASSWORD) is not None
+
+        with Timer() as single:
+            for _ in range(logins):
+                make_password(PASSWORD)
+
+        with Timer() as pooled:
+            hashed = hash_passwords([PASSWORD] * bulk, workers=workers)
+        assert len(hashed) == bulk
+
+    return {
+        "profile": name,
+        "logins_per_core_s": logins / login.elapsed,
+        "ms_per_login": login.elapsed / logins * 1000,
+        "hashes_per_s": logins / single.elapsed,
+        f"pool_hashes_per_s({workers}w)": bulk / pooled.elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", action="append", dest="profiles")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--bulk", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+
+    profiles = args.profiles or list(settings.PASSWORD_HASHER_PROFILES)
+    with test_database():
+        rows = [run_profile(name, args.logins, args.bulk, args.workers) for name in profiles]
+    report("Password hashing per profile", rows)
+
+
+if __name__ == "__main__":
+    main()
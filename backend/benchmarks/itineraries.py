@@ -0,0 +1,121 @@
+"""
+Itinerary search (``apps.routing.graph``) over a synthetic network:
+``--locations`` places scattered over Afghanistan, each with routes to its
+nearest neighbours until there are ``--routes`` routes. Reports the time to
+load the graph, search latency for cheapest and fastest itineraries between
+locations ``--max-legs`` legs apart (A* and, for comparison, plain Dijkstra)
+and the cost of picking up a route edit.
+
+    python -m benchmarks.itineraries
+    python -m benchmarks.itineraries --locations 2000 --routes 20000 --searches 500
+"""
+import argparse
+import os
+import random
+import tempfile
+from decimal import Decimal
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+AREA = ((29.4, 38.5), (60.5, 74.9))
+
+
+def neighbours(points, per_location):
+    """Indexes of the ``per_location`` nearest other points of each point."""
+    import numpy as np
+
+    lat, lng = np.radians(points[:, 0]), np.radians(points[:, 1])
+    for i in range(len(points)):
+        km = np.hypot((lng - lng[i]) * np.cos((lat + lat[i]) / 2), lat - lat[i])
+        km[i] = np.inf
+        yield i, np.argpartition(km, per_location)[:per_location]
+
+
+def far_pair(network, rng, max_legs):
+    """A random origin and a destination exactly ``max_legs`` legs away (or as far as it gets)."""
+    origin = rng.choice(list(network.edges))
+    seen, layer = {origin}, [origin]
+    for _ in range(max_legs):
+        following = {edge.drop for node in layer for edge in network.edges.get(node, {}).values()} - seen
+        if not following:
+            break
+        seen |= following
+        layer = sorted(following)
+    return origin, rng.choice(layer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=10_000)
+    parser.add_argument("--routes", type=int, default=100_000)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--max-legs", type=int, default=8)
+    args = parser.parse_args()
+
+    setup()
+    import numpy as np
+    from django.conf import settings
+
+    from apps.routing.graph import WEIGHTS, graph
+    from apps.vehicle.models import Location, Route
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp, test_database(name=os.path.join(tmp, "itineraries.sqlite3")):
+        settings.DISTANCE_MATRIX_DIR = os.path.join(tmp, "matrix")
+        settings.ROUTE_GRAPH_CHECK_SECONDS = 0
+        points = np.array([(rng.uniform(*AREA[0]), rng.uniform(*AREA[1])) for _ in range(args.locations)])
+        places = Location.objects.bulk_create(
+            [Location(name=f"Place {i}", latitude=lat, longitude=lng) for i, (lat, lng) in enumerate(points)],
+            batch_size=2000,
+        )
+        per_location = -(-args.routes // args.locations)
+        routes = []
+        for i, nearest in neighbours(points, per_location):
+            for j in nearest[: args.routes - len(routes)]:
+                # Roughly 3-6 AF per km, so cheap and fast itineraries differ
+                km = 111 * np.hypot(points[i, 0] - points[j, 0], points[i, 1] - points[j, 1])
+                routes.append(Route(pickup=places[i], drop=places[int(j)], price_af=Decimal(int(km * rng.uniform(3, 6)) + 50)))
+        Route.objects.bulk_create(routes, batch_size=5000)
+
+        with Timer() as timer:
+            graph.load()
+        loading = [{"locations": args.locations, "routes": len(graph.network.routes), "load_s": timer.elapsed}]
+
+        pairs = [far_pair(graph.network, rng, args.max_legs) for _ in range(args.searches)]
+        rows = []
+        for optimize in ("price", "duration"):
+            for algorithm in ("A*", "Dijkstra"):
+                samples, found, legs = [], 0, 0
+                for origin, destination in pairs:
+                    with Timer() as timer:
+                        if algorithm == "A*":
+                            itinerary = graph.search(origin, destination, optimize, args.max_legs)
+                        else:
+                            itinerary = graph.network._search(
+                                origin, destination, WEIGHTS[optimize], lambda node: 0.0, args.max_legs
+                            )
+                    samples.append(timer.elapsed)
+                    if itinerary is not None:
+                        found += 1
+                        legs += len(itinerary.legs)
+                row = {"optimize": optimize, "algorithm": algorithm, "found": found, "mean_legs": legs / max(found, 1)}
+                row.update(summarize(samples))
+                rows.append(row)
+
+        edited = rng.sample(routes, 50)
+        samples = []
+        for route in edited:
+            route.price_af += 1
+            route.save()
+            with Timer() as timer:
+                graph.refresh()
+            samples.append(timer.elapsed)
+        patching = [{"edits": len(edited), "via": "outbox refresh", **summarize(samples)}]
+
+    report("Route graph load", loading)
+    report(f"Itinerary search, {args.searches} random pairs, at most {args.max_legs} legs", rows)
+    report("Applying one route edit", patching)
+
+
+if __name__ == "__main__":
+    main()
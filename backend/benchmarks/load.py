@@ -0,0 +1,274 @@
+"""
+Load test for the booking API. Seeds a dataset (see ``benchmarks.seed``),
+then runs scripted scenarios with several concurrent clients against the full
+WSGI or ASGI application, middleware and JWT authentication included, and
+reports latency percentiles, throughput and queries per request.
+
+Scenarios:
+  booking    passengers list routes, request a trip and open it
+  board      drivers poll their request board and their own trips
+  accept     drivers serving the same routes race to accept open requests
+  dashboard  admins load the dashboard stats and filtered trip lists
+
+Baselines live in benchmarks/baselines/load.json, per scale and interface.
+``--check`` exits with status 1 when a scenario makes more queries per
+request or has a slower p95 than its baseline allows. Query counts carry over
+between machines; latencies do not, so record them on the machine that runs
+the check.
+
+    python -m benchmarks.load --scale small --clients 8 --requests 50
+    python -m benchmarks.load --interface asgi --scenario booking accept
+    python -m benchmarks.load --check
+    python -m benchmarks.load --update-baseline
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from benchmarks import Timer, report, setup, summarize, test_database
+from benchmarks.seed import SCALES, seed
+
+BASELINES = Path(__file__).parent / "baselines" / "load.json"
+
+API = "/api/v1/vehicle"
+
+
+class Session:
+    """
+    A client authenticated as ``user`` with a bearer token. Every request
+    records its latency, query count and status code in ``samples``.
+    """
+
+    def __init__(self, user, interface, samples):
+        from django.test import AsyncClient, Client
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        self.headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+        self.interface = interface
+        self.client = AsyncClient() if interface == "asgi" else Client()
+        self.samples = samples
+
+    def request(self, method, path, data=None):
+        from asgiref.sync import async_to_sync
+        from django.db import connection
+
+        send = getattr(self.client, method)
+        if self.interface == "asgi":
+            # Sync views run in this thread, so the query counter sees them
+            send = async_to_sync(send)
+        kwargs = {"headers": self.headers}
+        if data is not None:
+            kwargs.update(data=json.dumps(data), content_type="application/json")
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count), Timer() as timer:
+            response = send(path, **kwargs)
+        self.samples.append((timer.elapsed, len(queries), response.status_code))
+        return response
+
+    def get(self, path):
+        return self.request("get", path)
+
+    def post(self, path, data=None):
+        return self.request("post", path, data)
+
+
+def booking(session, dataset, rng):
+    session.get(f"{API}/vehicle/routes/")
+    route = rng.choice(dataset.routes)
+    response = session.post(f"{API}/trips/", {"route_id": route.pk})
+    if response.status_code == 201:
+        session.get(f"{API}/trips/{response.json()['id']}/")
+
+
+def board(session, dataset, rng):
+    session.get(f"{API}/driver/available-trips/")
+    session.get(f"{API}/driver/trips/")
+
+
+def accept(session, dataset, rng):
+    response = session.get(f"{API}/driver/available-trips/?fields=pk")
+    open_trips = response.json() if response.status_code == 200 else []
+    if open_trips:
+        # Most drivers go for the oldest request, so they collide on it
+        trip = open_trips[0] if rng.random() < 0.7 else rng.choice(open_trips)
+        session.post(f"{API}/trips/{trip['pk']}/accept/")
+
+
+def dashboard(session, dataset, rng):
+    session.get(f"{API}/admin/dashboard-stats/")
+    session.get(f"{API}/admin/trips/?limit=50")
+    session.get(f"{API}/admin/trips/?status=completed&ordering=-fare&limit=50")
+
+
+# name -> (script, users it runs as, status codes that are not errors)
+SCENARIOS = {
+    "booking": (booking, "passengers", {200, 201}),
+    "board": (board, "drivers", {200}),
+    # Losing a race is a 400, not an error
+    "accept": (accept, "racers", {200, 400}),
+    "dashboard": (dashboard, "admin", {200}),
+}
+
+
+def racing_drivers(dataset, clients):
+    """The drivers of the route most of them serve, topped up with other drivers."""
+    from django.db.models import Count
+
+    from apps.vehicle.models import Route
+
+    busiest = Route.objects.annotate(served=Count("drivers")).order_by("-served").first()
+    racers = list(busiest.drivers.all()[:clients]) if busiest else []
+    racers += [driver for driver in dataset.drivers if driver not in racers][: clients - len(racers)]
+    return racers
+
+
+def users_for(kind, dataset, clients, rng):
+    if kind == "admin":
+        return [dataset.admin] * clients
+    if kind == "racers":
+        return racing_drivers(dataset, clients)
+    return rng.sample(getattr(dataset, kind), clients)
+
+
+def worker(script, session, dataset, requests, seed_value):
+    from django.db import connection
+
+    rng = random.Random(seed_value)
+    try:
+        while len(session.samples) < requests:
+            before = len(session.samples)
+            script(session, dataset, rng)
+            if len(session.samples) == before:
+                break
+    finally:
+        connection.close()
+
+
+def run(name, dataset, interface, clients, requests):
+    """Run ``clients`` concurrent sessions of scenario ``name`` until each made ``requests`` requests."""
+    from django.core.cache import cache
+    from django.db import connection
+
+    script, kind, ok = SCENARIOS[name]
+    cache.clear()
+    rng = random.Random(name)
+    sessions = [Session(user, interface, []) for user in users_for(kind, dataset, clients, rng)]
+    threads = [
+        threading.Thread(target=worker, args=(script, session, dataset, requests, i))
+        for i, session in enumerate(sessions)
+    ]
+    connection.close()
+
+    with Timer() as timer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    samples = [sample for session in sessions for sample in session.samples]
+    row = {
+        "scenario": name,
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status in samples if status not in ok),
+        "req_per_s": len(samples) / timer.elapsed if timer.elapsed else 0.0,
+    }
+    row.update(summarize([elapsed for elapsed, _, _ in samples]))
+    row["queries_per_request"] = sum(queries for _, queries, _ in samples) / len(samples) if samples else 0.0
+    return row
+
+
+def regressions(rows, baseline, latency_tolerance, query_tolerance):
+    """Messages for every scenario worse than its ``baseline`` entry."""
+    found = []
+    for row in rows:
+        base = baseline.get(row["scenario"])
+        if base is None:
+            continue
+        if row["errors"]:
+            found.append(f"{row['scenario']}: {row['errors']} failed requests")
+        limit = base["queries_per_request"] * (1 + query_tolerance)
+        if row["queries_per_request"] > limit:
+            found.append(
+                f"{row['scenario']}: {row['queries_per_request']:.2f} queries/request, baseline {base['queries_per_request']:.2f}"
+            )
+        limit = base["p95_ms"] * (1 + latency_tolerance)
+        if row["p95_ms"] > limit:
+            found.append(f"{row['scenario']}: p95 {row['p95_ms']:.1f}ms, baseline {base['p95_ms']:.1f}ms")
+    return found
+
+
+def load_baselines():
+    if BASELINES.exists():
+        return json.loads(BASELINES.read_text())
+    return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--interface", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients per scenario.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client.")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 on a regression.")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed p95 increase (0.5 = 50%%).")
+    parser.add_argument("--query-tolerance", type=float, default=0.1, help="Allowed queries/request increase.")
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    # Lost accept races are logged as bad requests
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Threads need a file, not SQLite's shared-cache in-memory database
+        name = os.path.join(tmp, "load.sqlite3") if connection.vendor == "sqlite" else None
+        with test_database(name=name):
+            dataset = seed(**SCALES[args.scale])
+            for scenario in args.scenario:
+                rows.append(run(scenario, dataset, args.interface, args.clients, args.requests))
+
+    report(f"Load ({args.scale}, {args.interface}, {args.clients} clients)", rows)
+
+    key = f"{args.scale}/{args.interface}"
+    baselines = load_baselines()
+    if args.update_baseline:
+        baselines.setdefault(key, {}).update(
+            {
+                row["scenario"]: {
+                    "p95_ms": round(row["p95_ms"], 2),
+                    "queries_per_request": round(row["queries_per_request"], 2),
+                    "req_per_s": round(row["req_per_s"], 1),
+                }
+                for row in rows
+            }
+        )
+        BASELINES.parent.mkdir(exist_ok=True)
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline {key} written to {BASELINES}")
+    elif args.check:
+        if key not in baselines:
+            sys.exit(f"No baseline for {key}; record one with --update-baseline")
+        found = regressions(rows, baselines[key], args.latency_tolerance, args.query_tolerance)
+        for message in found:
+            print(f"  regression: {message}")
+        if found:
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
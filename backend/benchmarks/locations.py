@@ -0,0 +1,148 @@
+"""
+Driver location ingestion (``apps.tracking``): how many pings per second one
+process takes in, how long nearest-driver queries take and how fast the
+history buffer is written to the database.
+
+* ``ingest``: ``store.ingest()`` alone, batches of ``--batch`` pings from
+  ``--drivers`` drivers moving around Kabul, flushing in the background.
+* ``endpoint``: the same batches posted to ``POST /api/v1/tracking/pings/``
+  through the test client (JWT auth, JSON parsing and validation included).
+* ``nearest``: ``store.nearest()`` around random points.
+* ``flush``: one ``bulk_create`` of the buffered history.
+
+The database is a throwaway SQLite file, so the background flush thread gets
+its own connection.
+
+The target is 10k pings/s on one node; ``endpoint`` is the number that counts.
+
+    python -m benchmarks.locations
+    python -m benchmarks.locations --drivers 5000 --batch 10 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+CENTER = (34.5553, 69.2075)
+# Roughly 40 km across
+SPREAD = 0.2
+
+
+def batches(driver_pks, batch, rng):
+    """Endless ``(driver, pings)`` with each driver drifting from a random start."""
+    positions = {pk: [CENTER[0] + rng.uniform(-SPREAD, SPREAD), CENTER[1] + rng.uniform(-SPREAD, SPREAD)]
+                 for pk in driver_pks}
+    while True:
+        for pk in driver_pks:
+            point = positions[pk]
+            now = time.time()
+            pings = []
+            for i in range(batch):
+                point[0] += rng.uniform(-1e-4, 1e-4)
+                point[1] += rng.uniform(-1e-4, 1e-4)
+                pings.append((point[0], point[1], now - batch + i, rng.randrange(360), rng.uniform(0, 80)))
+            yield pk, pings
+
+
+def bench_ingest(store, stream, seconds):
+    count = 0
+    with Timer() as timer:
+        stop = time.perf_counter() + seconds
+        while time.perf_counter() < stop:
+            driver, pings = next(stream)
+            store.ingest(driver, pings)
+            count += len(pings)
+    return {"step": "ingest", "pings": count, "requests": "", "pings_per_s": count / timer.elapsed, "req_per_s": ""}
+
+
+def bench_endpoint(stream, tokens, seconds):
+    from django.test import Client
+
+    client = Client()
+    count = requests = 0
+    with Timer() as timer:
+        stop = time.perf_counter() + seconds
+        while time.perf_counter() < stop:
+            driver, pings = next(stream)
+            body = json.dumps(
+                {"pings": [dict(zip(("latitude", "longitude", "recorded_at", "heading", "speed_kmh"), p)) for p in pings]}
+            )
+            response = client.post(
+                "/api/v1/tracking/pings/", body, content_type="application/json", HTTP_AUTHORIZATION=tokens[driver]
+            )
+            assert response.status_code == 202, response.content
+            count += len(pings)
+            requests += 1
+    return {
+        "step": "endpoint",
+        "pings": count,
+        "requests": requests,
+        "pings_per_s": count / timer.elapsed,
+        "req_per_s": requests / timer.elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drivers", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=5, help="Pings per request.")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of the ingest and endpoint runs.")
+    parser.add_argument("--queries", type=int, default=2000, help="Nearest-driver queries to time.")
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from apps.tracking.store import store
+    from apps.users.factories import DriverFactory
+
+    rng = random.Random(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, test_database(name=os.path.join(tmp, "locations.sqlite3")):
+        drivers = DriverFactory.create_bulk(args.drivers, password=None)
+        tokens = {driver.pk: f"Bearer {RefreshToken.for_user(driver).access_token}" for driver in drivers}
+        stream = batches(list(tokens), args.batch, rng)
+
+        store.reset()
+        rows.append(bench_ingest(store, stream, args.seconds))
+        # Let the flushes of that run finish so they don't slow down the next one
+        store.join()
+        store.reset()
+        rows.append(bench_endpoint(stream, tokens, args.seconds))
+
+        samples = []
+        for _ in range(args.queries):
+            point = (CENTER[0] + rng.uniform(-SPREAD, SPREAD), CENTER[1] + rng.uniform(-SPREAD, SPREAD))
+            with Timer() as timer:
+                store.nearest(*point, limit=10, radius_km=5)
+            samples.append(timer.elapsed)
+        query_row = {"drivers": args.drivers, "queries": args.queries, "radius_km": 5}
+        query_row.update(summarize(samples))
+
+        # Buffer a fixed amount without flushing, then time one flush
+        settings.LOCATION_FLUSH_BATCH = settings.LOCATION_BUFFER_MAX
+        settings.LOCATION_FLUSH_SECONDS = 3600
+        store.join()
+        store.reset()
+        buffered = 0
+        while buffered < 50_000:
+            driver, pings = next(stream)
+            store.ingest(driver, pings)
+            buffered += len(pings)
+        with Timer() as timer:
+            written = store.flush()
+        flush_row = {"rows": written, "seconds": timer.elapsed, "rows_per_s": written / timer.elapsed}
+        store.reset()
+
+    report(f"Ping ingestion, {args.drivers} drivers, {args.batch} pings per request", rows)
+    report("Nearest 10 drivers within 5 km", [query_row])
+    report("History flush (bulk_create)", [flush_row])
+
+
+if __name__ == "__main__":
+    main()
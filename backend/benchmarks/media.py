@@ -0,0 +1,124 @@
+"""
+Media serving throughput and worker CPU for ``serve_media``.
+
+Modes:
+  stream      Django reads the file in MEDIA_STREAM_BLOCK_SIZE blocks (no file_wrapper)
+  sendfile    the server's wsgi.file_wrapper sendfile()s the file (gunicorn)
+  range       1 MiB Range requests through sendfile
+  revalidate  If-None-Match requests answered with 304
+  accel       X-Accel-Redirect, the reverse proxy sends the bytes
+
+    python -m benchmarks.media --size-mb 8 --requests 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks import report, setup
+
+NAME = "license/" + "f" * 64 + ".jpg"
+
+
+class SendfileWrapper:
+    """What gunicorn does with wsgi.file_wrapper: sendfile() the fd, bounded by Content-Length."""
+
+    def __init__(self, filelike, block_size=8192):
+        self.filelike = filelike
+
+    def __iter__(self):
+        return iter(())
+
+    def close(self):
+        self.filelike.close()
+
+
+def call(app, path, sink, file_wrapper=True, **headers):
+    from django.test import RequestFactory
+
+    environ = RequestFactory().get(path, HTTP_HOST="localhost", **headers).environ
+    if file_wrapper:
+        environ["wsgi.file_wrapper"] = SendfileWrapper
+    status_headers = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        status_headers["status"] = status
+        status_headers["headers"] = dict(response_headers)
+
+    body = app(environ, start_response)
+    sent = 0
+    if isinstance(body, SendfileWrapper):
+        fd = body.filelike.fileno()
+        offset = os.lseek(fd, 0, os.SEEK_CUR)
+        remaining = int(status_headers["headers"]["Content-Length"])
+        while remaining:
+            count = os.sendfile(sink, fd, offset + sent, remaining)
+            sent += count
+            remaining -= count
+    else:
+        for chunk in body:
+            os.write(sink, chunk)
+            sent += len(chunk)
+    body.close()
+    return status_headers["status"], sent
+
+
+def run_mode(app, mode, requests, sink, etag):
+    from django.test.utils import override_settings
+
+    kwargs, settings_overrides = {}, {}
+    if mode == "range":
+        kwargs["HTTP_RANGE"] = "bytes=0-1048575"
+    elif mode == "revalidate":
+        kwargs["HTTP_IF_NONE_MATCH"] = etag
+    elif mode == "accel":
+        settings_overrides["MEDIA_ACCEL_REDIRECT_PREFIX"] = "/protected-media/"
+
+    total = 0
+    with override_settings(**settings_overrides):
+        wall, cpu = time.perf_counter(), time.process_time()
+        for _ in range(requests):
+            status, sent = call(app, f"/media/{NAME}", sink, file_wrapper=mode != "stream", **kwargs)
+            total += sent
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {
+        "mode": mode,
+        "status": status.split()[0],
+        "req_per_s": requests / wall,
+        "MB_per_s": total / wall / 1e6,
+        "worker_cpu_ms_per_req": cpu / requests * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.wsgi import get_wsgi_application
+    from django.test.utils import override_settings
+
+    with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=["localhost"]):
+        os.makedirs(os.path.join(media_root, "license"))
+        with open(os.path.join(media_root, NAME), "wb") as handle:
+            handle.write(os.urandom(args.size_mb * 1024 * 1024))
+
+        app = get_wsgi_application()
+        sink = os.open(os.devnull, os.O_WRONLY)
+        try:
+            from django.test import Client
+
+            etag = Client(HTTP_HOST="localhost").get(f"/media/{NAME}")["ETag"]
+            rows = [
+                run_mode(app, mode, args.requests, sink, etag)
+                for mode in ("stream", "sendfile", "range", "revalidate", "accel")
+            ]
+        finally:
+            os.close(sink)
+    report(f"Media serving, {args.size_mb} MiB file", rows)
+
+
+if __name__ == "__main__":
+    main()
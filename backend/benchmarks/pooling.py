@@ -0,0 +1,180 @@
+"""
+Ride pooling (``apps.vehicle.pooling``) on simulated demand: ``--requests``
+open requests per batch over ``--routes`` routes, route popularity
+Pareto-distributed, 1-4 passengers each and departures spread over the
+pooling horizon. Every route has one to three vehicle types assigned.
+
+The first table runs ``plan()`` alone for each ``--windows`` value and
+compares the vehicles dispatched with one vehicle per request: utilization
+is booked seats over the seats of the smallest vehicle type that fits each
+ride (or each request when unpooled). The second runs ``pool_trips()``
+against the database for ``--batches`` consecutive batches, ``--every``
+minutes apart, so requests left over from one batch and rides with free
+seats are carried into the next.
+
+    python -m benchmarks.pooling
+    python -m benchmarks.pooling --requests 5000 --routes 50 --windows 5 10 20
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks import Timer, report, setup, test_database
+
+# Share of requests by passenger count
+PARTY_SIZES = ([1, 2, 3, 4], [60, 25, 10, 5])
+
+
+def route_types(routes, rng):
+    from apps.vehicle.models import Vehicle
+
+    kinds = list(Vehicle.SEATS)
+    return {route: set(rng.sample(kinds, rng.randint(1, 3))) for route in routes}
+
+
+def demand(count, routes, start, horizon, rng):
+    """``(route, departure, seats)`` for ``count`` requests."""
+    weights = [rng.paretovariate(1.2) for _ in routes]
+    chosen = rng.choices(routes, weights, k=count)
+    return [
+        (route, start + timedelta(minutes=rng.uniform(0, horizon)), rng.choices(*PARTY_SIZES)[0])
+        for route in chosen
+    ]
+
+
+def utilization(groups, types):
+    """Vehicles dispatched and the share of their seats booked; groups of one ride alone."""
+    from apps.vehicle.models import Vehicle
+    from apps.vehicle.pooling import smallest_type
+
+    seats = capacity = 0
+    for group in groups:
+        seats += group.seats
+        capacity += Vehicle.SEATS[smallest_type(group.seats, types[group.route])]
+    return len(groups), seats / capacity if capacity else 0.0
+
+
+def simulate_plans(args, rng):
+    from django.utils import timezone
+
+    from apps.vehicle.models import Vehicle
+    from apps.vehicle.pooling import Group, Request, plan
+
+    routes = list(range(args.routes))
+    types = route_types(routes, rng)
+    capacities = {route: max(Vehicle.SEATS[kind] for kind in kinds) for route, kinds in types.items()}
+    requests = [
+        Request(key, route, departure, seats)
+        for key, (route, departure, seats) in enumerate(
+            demand(args.requests, routes, timezone.now(), args.horizon, rng)
+        )
+        if seats <= capacities[route]
+    ]
+    solo = [Group(request.route, capacities[request.route], request.departure) for request in requests]
+    for group, request in zip(solo, requests):
+        group.add(request)
+    solo_vehicles, solo_utilization = utilization(solo, types)
+
+    rows = []
+    for window in args.windows:
+        timings = []
+        for _ in range(args.repeat):
+            with Timer() as timer:
+                groups = plan(requests, capacities, timedelta(minutes=window))
+            timings.append(timer.elapsed)
+        vehicles, used = utilization(groups, types)
+        rows.append(
+            {
+                "window_min": window,
+                "requests": len(requests),
+                "pooled_pct": 100 * sum(len(g.requests) for g in groups if len(g.requests) > 1) / len(requests),
+                "vehicles": vehicles,
+                "solo_vehicles": solo_vehicles,
+                "utilization_pct": 100 * used,
+                "solo_utilization_pct": 100 * solo_utilization,
+                "plan_ms": min(timings) * 1000,
+            }
+        )
+    return rows
+
+
+def simulate_batches(args, rng):
+    from django.conf import settings
+    from django.utils import timezone
+
+    from apps.users.factories import DriverFactory, PassengerFactory
+    from apps.vehicle.factories import VehicleFactory
+    from apps.vehicle.models import Location, Route, SharedRide, Trip, Vehicle
+    from apps.vehicle.pooling import pool_trips
+
+    settings.POOL_WINDOW_MINUTES = args.windows[0]
+    settings.POOL_HORIZON_MINUTES = args.horizon
+    locations = Location.objects.bulk_create([Location(name=f"Place {i}") for i in range(2 * args.routes)])
+    routes = Route.objects.bulk_create(
+        [Route(pickup=locations[2 * i], drop=locations[2 * i + 1], price_af=rng.randrange(200, 3000, 50))
+         for i in range(args.routes)]
+    )
+    driver = DriverFactory(password=None)
+    assigned = []
+    for route, kinds in route_types(routes, rng).items():
+        for kind in kinds:
+            assigned.append((route, VehicleFactory.create_bulk(1, driver=driver, type=kind)[0]))
+    Route.vehicles.through.objects.bulk_create(
+        [Route.vehicles.through(route_id=route.pk, vehicle_id=vehicle.pk) for route, vehicle in assigned]
+    )
+    passengers = PassengerFactory.create_bulk(args.passengers, password=None)
+
+    rows = []
+    start = timezone.now()
+    for batch in range(args.batches):
+        now = start + timedelta(minutes=batch * args.every)
+        trips = [
+            Trip(passenger=rng.choice(passengers), route=route, fare=route.price_af, passenger_count=seats,
+                 allow_pooling=True, scheduled_for=departure)
+            for route, departure, seats in demand(args.requests, routes, now, args.horizon, rng)
+        ]
+        Trip.objects.bulk_create(trips, batch_size=1000)
+        with Timer() as timer:
+            result = pool_trips(now=now)
+        rides = SharedRide.objects.filter(driver__isnull=True)
+        seats = sum(rides.values_list("seats", flat=True))
+        capacity = sum(Vehicle.SEATS[kind] for kind in rides.values_list("vehicle_type", flat=True))
+        rows.append(
+            {
+                "batch": batch + 1,
+                "candidates": result.requests,
+                "pooled": result.pooled,
+                "rides_created": result.rides_created,
+                "rides_extended": result.rides_extended,
+                "open_rides": rides.count(),
+                "ride_utilization_pct": 100 * seats / capacity if capacity else 0.0,
+                "pool_s": timer.elapsed,
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="New requests per batch.")
+    parser.add_argument("--routes", type=int, default=200)
+    parser.add_argument("--windows", type=int, nargs="+", default=[10, 5, 20], help="Pooling windows in minutes.")
+    parser.add_argument("--horizon", type=int, default=30, help="Departures spread over this many minutes.")
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--every", type=int, default=10, help="Minutes between database batches.")
+    parser.add_argument("--passengers", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    rng = random.Random(0)
+    plans = simulate_plans(args, rng)
+    with test_database():
+        batches = simulate_batches(args, rng)
+
+    report(f"plan(): {args.requests} requests over {args.routes} routes, departures within {args.horizon} min", plans)
+    report(f"pool_trips(): {args.batches} batches {args.every} min apart, window {args.windows[0]} min", batches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Overhead of the request instrumentation in apps.common.profiling: the same
+requests through the full middleware stack before its hooks are installed,
+then alternating rounds with profiling off and on (phase timings, histograms
+and Server-Timing, no cProfile) so drift hits both alike.
+
+    python -m benchmarks.profiling --requests 300 --rows 50
+    python -m benchmarks.profiling --path "/api/v1/vehicle/vehicle/routes/"
+"""
+import argparse
+import statistics
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+
+def seed(rows):
+    from apps.users.factories import AdminFactory, PassengerFactory
+    from apps.vehicle.factories import LocationFactory, RouteFactory, TripFactory
+    from apps.vehicle.models import Route, Trip
+
+    admin = AdminFactory.create_bulk(1, password=None)[0]
+    passengers = PassengerFactory.create_bulk(20, password=None)
+    places = LocationFactory.create_bulk(10)
+    routes = Route.objects.bulk_create(
+        [RouteFactory.build(pickup=a, drop=b) for a in places for b in places if a is not b]
+    )
+    Trip.objects.bulk_create(
+        [
+            TripFactory.build(passenger=passengers[i % len(passengers)], route=routes[i % len(routes)])
+            for i in range(rows * 4)
+        ]
+    )
+    return admin
+
+
+def measure(client, path, headers, requests):
+    samples = []
+    for _ in range(requests):
+        with Timer() as timer:
+            response = client.get(path, **headers)
+        assert response.status_code == 200, response.status_code
+        samples.append(timer.elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per mode and round.")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=50, help="Trips per admin list page.")
+    parser.add_argument("--path", help="Path to request instead of the admin trip list.")
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client, override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    with test_database():
+        admin = seed(args.rows)
+        client = Client()
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RefreshToken.for_user(admin).access_token}"}
+        path = args.path or f"/api/v1/vehicle/admin/trips/?limit={args.rows}"
+        measure(client, path, headers, 20)
+
+        samples = {"no hooks": measure(client, path, headers, args.requests), "off": [], "on": []}
+        for _ in range(args.rounds):
+            for mode in ("off", "on"):
+                with override_settings(PROFILING_ENABLED=mode == "on", PROFILING_CPROFILE_RATE=0.0):
+                    samples[mode].extend(measure(client, path, headers, args.requests))
+
+    base = statistics.median(samples["off"])
+    rows = []
+    for mode, values in samples.items():
+        row = {"mode": mode, "requests": len(values)}
+        row.update(summarize(values))
+        row["overhead_pct"] = (statistics.median(values) / base - 1) * 100
+        rows.append(row)
+    report(f"Profiling overhead on {path}", rows)
+
+
+if __name__ == "__main__":
+    main()
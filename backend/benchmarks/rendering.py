@@ -0,0 +1,104 @@
+"""
+Render time and bytes on the wire for the admin trip list: DRF's stock
+JSONRenderer against FastJSONRenderer, then identity/gzip/brotli encodings of
+the rendered body through CompressionMiddleware.
+
+    python -m benchmarks.rendering --trips 5000
+"""
+import argparse
+
+from benchmarks import Timer, report, setup, test_database
+
+
+def seed(trips):
+    from apps.users.models import User
+    from apps.vehicle.models import Location, Route, Trip
+
+    route = Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"),
+        drop=Location.objects.create(name="Mazar-i-Sharif"),
+        price_af=850,
+    )
+    passenger, driver = User.objects.bulk_create_users(
+        [
+            {"first_name": "Passenger", "last_name": "A", "email": "passenger@example.com"},
+            {"first_name": "Driver", "last_name": "B", "email": "driver@example.com", "role": "driver"},
+        ]
+    )
+    route.drivers.add(driver)
+    Trip.objects.bulk_create(
+        [
+            Trip(
+                passenger=passenger,
+                driver=driver,
+                route=route,
+                fare=route.price_af,
+                status="completed",
+                notes_for_driver="Call on arrival",
+            )
+            for _ in range(trips)
+        ]
+    )
+
+
+def payload():
+    from apps.vehicle.serializers import AdminTripListSerializer
+    from apps.vehicle.views import AdminTripListView
+
+    return AdminTripListSerializer(AdminTripListView.queryset, many=True).data
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        with Timer() as timer:
+            result = func()
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+    return best, result
+
+
+def run(repeat):
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.common.middleware import CompressionMiddleware
+    from apps.common.renderers import FastJSONRenderer
+
+    data = payload()
+    rows = []
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        seconds, body = best_of(repeat, lambda: renderer.render(data))
+        rows.append(
+            {"step": f"render {type(renderer).__name__}", "ms": seconds * 1000, "bytes": len(body)}
+        )
+
+    factory = RequestFactory()
+    for accept in ("identity", "gzip", "br"):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(body, content_type="application/json"))
+        request = factory.get("/", HTTP_ACCEPT_ENCODING=accept)
+        seconds, response = best_of(repeat, lambda: middleware(request))
+        rows.append(
+            {
+                "step": f"encode {response.get('Content-Encoding', 'identity')}",
+                "ms": seconds * 1000,
+                "bytes": len(response.content),
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trips", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        seed(args.trips)
+        report(f"Admin trip list, {args.trips} trips", run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
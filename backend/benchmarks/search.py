@@ -0,0 +1,105 @@
+"""
+Admin search latency: the full-text index (apps.search) against ``icontains``
+over the same documents, the way a ``search_fields`` admin search scans them.
+Documents are synthetic users, vehicles and trips inserted straight into
+``SearchDocument``.
+
+    python -m benchmarks.search --documents 5000000 --name /tmp/search-bench.sqlite3
+"""
+import argparse
+import random
+import uuid
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+# Syllable combinations give a few thousand distinct names, closer to real
+# name frequencies than a short list of common ones
+HEADS = ["ah", "zar", "mi", "fa", "so", "ni", "ja", "par", "ha", "la", "ka", "ra", "po", "wa", "su", "no", "gul", "sha"]
+TAILS = ["mad", "ghuna", "na", "rid", "raya", "lofar", "wid", "wana", "mid", "ila", "rim", "him", "pal", "dak", "tan", "ri"]
+FIRST = [head + tail for head in HEADS for tail in TAILS]
+LAST = [name + suffix for name in FIRST for suffix in ("i", "zai", "yar")]
+CITIES = ["Kabul", "Herat", "Mazar-i-Sharif", "Kandahar", "Jalalabad", "Bamyan", "Kunduz", "Ghazni"]
+NOTES = ["Call on arrival", "Blue gate", "Two suitcases", "Wait near the mosque", "", "", ""]
+
+QUERIES = ["zarghuna", "kbl 047", "herat blue gate", "nothingmatches"]
+
+
+def document(i, rng):
+    from apps.search.models import SearchDocument
+
+    first, last = rng.choice(FIRST), rng.choice(LAST)
+    kind = ("user", "vehicle", "trip")[i % 3]
+    if kind == "user":
+        title, body = f"{first.title()} {last.title()}", f"{first}.{last}{i}@example.com {first}{i} Passenger"
+    elif kind == "vehicle":
+        title, body = f"KBL-{i % 100000:05d}", f"Corolla Economy {first.title()} {last.title()}"
+    else:
+        pickup, drop = rng.sample(CITIES, 2)
+        title = f"{pickup} ➜ {drop} - {first.title()} {last.title()}"
+        body = f"{first}.{last}{i}@example.com Completed {rng.choice(NOTES)}"
+    return SearchDocument(kind=kind, object_pk=i, object_id=uuid.uuid4(), title=title, body=body)
+
+
+def seed(documents, batch_size=20000):
+    from apps.search.models import SearchDocument
+
+    rng = random.Random(38)
+    for start in range(0, documents, batch_size):
+        SearchDocument.objects.bulk_create(
+            [document(i, rng) for i in range(start, min(documents, start + batch_size))]
+        )
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            count = len(func())
+        samples.append(timer.elapsed)
+    return samples, count
+
+
+def run(repeat, limit):
+    from django.db.models import Q
+
+    from apps.search import index
+    from apps.search.models import SearchDocument
+
+    def scan(query):
+        # Like an admin changelist: count the matches, then fetch the first page
+        documents = SearchDocument.objects.all()
+        for word in index.terms(query):
+            documents = documents.filter(Q(title__icontains=word) | Q(body__icontains=word))
+        documents.count()
+        return list(documents[:limit])
+
+    # A full name and an exact email from the middle of the table
+    sample = SearchDocument.objects.filter(kind="user").order_by("pk")[SearchDocument.objects.count() // 6]
+    queries = QUERIES + [sample.title, sample.body.split()[0]]
+
+    rows = []
+    for query in queries:
+        for name, func in (("fts", lambda: index.search(query, limit=limit)), ("icontains", lambda: scan(query))):
+            samples, count = measure(func, repeat)
+            rows.append({"query": query, "engine": name, "results": count, **summarize(samples)})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--name", default=None, help="Test database name, e.g. a file path for large SQLite runs.")
+    args = parser.parse_args()
+
+    setup()
+    with test_database(name=args.name):
+        with Timer() as timer:
+            seed(args.documents)
+        print(f"Indexed {args.documents} documents in {timer.elapsed:.1f}s")
+        report(f"Admin search, {args.documents} documents, top {args.limit}", run(args.repeat, args.limit))
+
+
+if __name__ == "__main__":
+    main()
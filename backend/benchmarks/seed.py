@@ -0,0 +1,104 @@
+"""
+Bulk data seeder for the load benchmarks: locations, routes served by
+drivers, vehicles, passengers, an admin and trips in every status, inserted
+with ``bulk_create`` through the model factories. Importable, or runnable on
+its own to time the seeding:
+
+    python -m benchmarks.seed --scale medium
+"""
+import argparse
+import random
+from dataclasses import dataclass, field
+
+from benchmarks import Timer, report, setup, test_database
+
+# Dataset sizes per scale
+SCALES = {
+    "small": {"locations": 20, "routes": 60, "drivers": 40, "passengers": 400, "trips": 4000},
+    "medium": {"locations": 60, "routes": 400, "drivers": 300, "passengers": 4000, "trips": 50000},
+    "large": {"locations": 150, "routes": 2000, "drivers": 2000, "passengers": 40000, "trips": 500000},
+}
+
+# Share of seeded trips per status; requested ones are open for drivers
+STATUS_WEIGHTS = {"requested": 0.1, "in_progress": 0.1, "completed": 0.7, "cancelled": 0.1}
+
+ROUTES_PER_DRIVER = 3
+
+
+@dataclass
+class Dataset:
+    routes: list
+    drivers: list
+    passengers: list
+    admin: object
+    requested: list = field(default_factory=list)
+
+
+def seed(locations, routes, drivers, passengers, trips, seed_value=0):
+    """Insert a dataset of the given sizes and return it as a ``Dataset``."""
+    from apps.users.factories import AdminFactory, DriverFactory, PassengerFactory
+    from apps.vehicle.factories import LocationFactory, RouteFactory, TripFactory, VehicleFactory
+    from apps.vehicle.models import Route, Trip, Vehicle
+
+    rng = random.Random(seed_value)
+    places = LocationFactory.create_bulk(locations)
+    pairs = [(a, b) for a in places for b in places if a is not b]
+    rng.shuffle(pairs)
+    route_objs = Route.objects.bulk_create(
+        [RouteFactory.build(pickup=pickup, drop=drop) for pickup, drop in pairs[:routes]]
+    )
+
+    # Unusable passwords: the scenarios authenticate with tokens, and hashing
+    # thousands of passwords would dominate the seeding time
+    driver_objs = DriverFactory.create_bulk(drivers, password=None)
+    passenger_objs = PassengerFactory.create_bulk(passengers, password=None)
+    admin = AdminFactory.create_bulk(1, password=None)[0]
+
+    Vehicle.objects.bulk_create([VehicleFactory.build(driver=driver) for driver in driver_objs])
+
+    Through = Route.drivers.through
+    served = {}
+    links = []
+    for driver in driver_objs:
+        for route in rng.sample(route_objs, min(ROUTES_PER_DRIVER, len(route_objs))):
+            served.setdefault(route.pk, []).append(driver)
+            links.append(Through(route_id=route.pk, user_id=driver.pk))
+    Through.objects.bulk_create(links, batch_size=1000)
+
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    requested = []
+    for start in range(0, trips, 5000):
+        batch = []
+        for _ in range(min(5000, trips - start)):
+            route = rng.choice(route_objs)
+            status = rng.choices(statuses, weights)[0]
+            driver = None
+            if status != "requested" and route.pk in served:
+                driver = rng.choice(served[route.pk])
+            batch.append(
+                TripFactory.build(passenger=rng.choice(passenger_objs), route=route, driver=driver, status=status)
+            )
+        created = Trip.objects.bulk_create(batch)
+        requested.extend(trip for trip in created if trip.status == "requested" and trip.route_id in served)
+
+    return Dataset(route_objs, driver_objs, passenger_objs, admin, requested)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    args = parser.parse_args()
+
+    setup()
+    with test_database():
+        with Timer() as timer:
+            dataset = seed(**SCALES[args.scale])
+    report(
+        "Seeding",
+        [dict(SCALES[args.scale], scale=args.scale, requested=len(dataset.requested), seconds=timer.elapsed)],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+The polled read endpoints under real servers: uvicorn running ``config.asgi``
+(async views, see ``apps.common.asyncviews``) against gunicorn sync workers
+running ``config.wsgi``, with the same number of worker processes. For each
+number of concurrent clients it reports throughput, latency percentiles,
+failed requests and the peak resident memory of the whole server (master and
+workers, read from /proc, so Linux only).
+
+Clients poll the driver board and trip list, the public route list and the
+admin dashboard over plain HTTP, one connection per request. ``--think-ms``
+adds client pauses between requests, which is where many mostly-idle
+connections (polling apps) favour the event loop. The dataset is seeded into
+a throwaway SQLite file shared by the servers.
+
+    python -m benchmarks.servers
+    python -m benchmarks.servers --workers 4 --clients 16 64 256 --duration 15
+    python -m benchmarks.servers --servers uvicorn --think-ms 200
+"""
+import argparse
+import http.client
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import report, setup, summarize, test_database
+from benchmarks.seed import SCALES, seed
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+API = "/api/v1/vehicle"
+
+# (path, token kind) and their share of the mix
+ENDPOINTS = [
+    ((f"{API}/driver/available-trips/", "driver"), 4),
+    ((f"{API}/driver/trips/", "driver"), 2),
+    ((f"{API}/vehicle/routes/", None), 3),
+    ((f"{API}/admin/dashboard-stats/", "admin"), 1),
+]
+
+
+def command(server, workers, port):
+    address = f"127.0.0.1:{port}"
+    if server == "gunicorn":
+        return ["gunicorn", "config.wsgi:application", "--workers", str(workers), "--worker-class", "sync",
+                "--bind", address, "--backlog", "2048", "--log-level", "warning"]
+    return ["uvicorn", "config.asgi:application", "--workers", str(workers), "--host", "127.0.0.1",
+            "--port", str(port), "--backlog", "2048", "--no-access-log", "--log-level", "warning"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def tree_rss_mb(pid):
+    """Resident memory of ``pid`` and all its descendants, in MiB."""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                parent = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry.name))
+    total_kb, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        try:
+            for line in Path(f"/proc/{current}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total_kb += int(line.split()[1])
+        except OSError:
+            continue
+        stack.extend(children.get(current, ()))
+    return total_kb / 1024
+
+
+def get(port, path, token=None, timeout=30):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        headers = {"Host": "localhost", "Connection": "close"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        connection.request("GET", path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+class Server:
+    """A server subprocess on a free port, stopped on exit."""
+
+    def __init__(self, name, workers, env):
+        self.name, self.workers, self.env = name, workers, env
+        self.port = free_port()
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            command(self.name, self.workers, self.port), cwd=BACKEND_DIR, env=self.env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited: {self.process.stderr.read()[-2000:]}")
+            try:
+                if get(self.port, f"{API}/vehicle/routes/", timeout=2) == 200:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f"{self.name} did not start within 60s")
+
+    def __exit__(self, *exc):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def load(server, tokens, clients, duration, think):
+    """Hammer ``server`` with ``clients`` threads for ``duration`` seconds."""
+    samples, failures, peak = [], [0], [0.0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+    choices, weights = zip(*ENDPOINTS)
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        mine = []
+        failed = 0
+        while time.monotonic() < stop:
+            path, kind = rng.choices(choices, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = get(server.port, path, tokens.get(kind)) == 200
+            except OSError:
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                failed += 1
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+        with lock:
+            samples.extend(mine)
+            failures[0] += failed
+
+    def sample_memory():
+        while time.monotonic() < stop:
+            peak[0] = max(peak[0], tree_rss_mb(server.process.pid))
+            time.sleep(0.25)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    threads.append(threading.Thread(target=sample_memory))
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    row = {
+        "server": server.name,
+        "workers": server.workers,
+        "clients": clients,
+        "requests": len(samples),
+        "errors": failures[0],
+        "req_per_s": len(samples) / elapsed,
+    }
+    row.update(summarize(samples))
+    row["peak_rss_mb"] = peak[0]
+    row["rss_per_worker_mb"] = peak[0] / server.workers
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=["gunicorn", "uvicorn"], default=["gunicorn", "uvicorn"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a client's requests.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--settings", default="config.settings.local", help="Settings module of the servers.")
+    args = parser.parse_args()
+
+    missing = [name for name in args.servers if shutil.which(name) is None]
+    if missing:
+        sys.exit(f"Not installed: {', '.join(missing)} (see requirements/requirement.txt)")
+
+    setup()
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, test_database(name=os.path.join(tmp, "servers.sqlite3")) as connection:
+        dataset = seed(**SCALES[args.scale])
+        # Any driver serving routes with open requests; every client polls as them
+        driver = max(dataset.drivers, key=lambda d: d.available_routes.count())
+        tokens = {
+            "driver": str(RefreshToken.for_user(driver).access_token),
+            "admin": str(RefreshToken.for_user(dataset.admin).access_token),
+        }
+        connection.close()
+
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=args.settings,
+            DATABASE_URL=f"sqlite:///{connection.settings_dict['NAME']}",
+            DEBUG="",
+        )
+        for name in args.servers:
+            with Server(name, args.workers, env) as server:
+                for clients in args.clients:
+                    rows.append(load(server, tokens, clients, args.duration, args.think_ms / 1000))
+
+    report(
+        f"Polled read endpoints, {args.workers} workers, {args.duration:g}s per run, think {args.think_ms:g} ms",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Registration throughput: the per-request ``CustomRegisterSerializer`` path
+against ``User.objects.bulk_create_users``.
+
+    python -m benchmarks.signup --users 2000
+"""
+import argparse
+
+from benchmarks import Timer, report, setup, test_database
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+
+def rows(prefix, count):
+    return [
+        {
+            "first_name": "Driver",
+            "last_name": f"{prefix}{i}",
+            "email": f"{prefix}{i}@fleet.example.com",
+            "password": "secure_password123",
+            "role": "driver",
+        }
+        for i in range(count)
+    ]
+
+
+def run(users, batch_size):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from apps.users.models import User
+    from apps.users.serializers import CustomRegisterSerializer
+
+    results = []
+
+    with CaptureQueriesContext(connection) as queries, Timer() as timer:
+        for row in rows("single", users):
+            serializer = CustomRegisterSerializer(data=dict(row, password2=row["password"]))
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+    results.append(
+        {
+            "path": "register serializer",
+            "users": users,
+            "seconds": timer.elapsed,
+            "users_per_s": users / timer.elapsed,
+            "queries_per_user": len(queries) / users,
+        }
+    )
+
+    with CaptureQueriesContext(connection) as queries, Timer() as timer:
+        created = User.objects.bulk_create_users(rows("bulk", users), batch_size=batch_size)
+    assert len(created) == users
+    results.append(
+        {
+            "path": f"bulk_create_users({batch_size})",
+            "users": users,
+            "seconds": timer.elapsed,
+            "users_per_s": users / timer.elapsed,
+            "queries_per_user": len(queries) / users,
+        }
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--real-hasher",
+        action="store_true",
+        help="Hash with the configured PASSWORD_HASHERS instead of MD5, to include hashing cost.",
+    )
+    args = parser.parse_args()
+
+    setup()
+    from django.test.utils import override_settings
+
+    hashers = {} if args.real_hasher else {"PASSWORD_HASHERS": FAST_HASHERS}
+    with test_database(), override_settings(**hashers):
+        report("Signup throughput", run(args.users, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Worker start-up cost per settings profile: time to load the WSGI application,
+time to serve the first request (which imports the URLconf and every view),
+peak RSS and the number of modules loaded. Each run is a fresh interpreter.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --settings config.settings.api --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks import report
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules the API-only profile should never load; a probe reports which did.
+# django.contrib.admin itself is not listed: django_countries imports it.
+HEAVY_MODULES = ("jazzmin", "django_extensions", "drf_spectacular", "apps.users.admin", "apps.vehicle.admin")
+
+
+def probe():
+    """Boot the WSGI app in this process, serve one request and print the measurements as JSON."""
+    import io
+    import resource
+
+    started = time.perf_counter()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    booted = time.perf_counter()
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h != "*"), "localhost")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": "/internal/metrics",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "443",
+        "HTTP_HOST": host,
+        "wsgi.url_scheme": "https",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+    statuses = []
+    b"".join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    served = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "boot_ms": (booted - started) * 1000,
+                "first_request_ms": (served - booted) * 1000,
+                "status": int(statuses[0].split()[0]),
+                "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "modules": len(sys.modules),
+                "heavy_modules": sorted(
+                    name for name in HEAVY_MODULES if any(m == name or m.startswith(name + ".") for m in sys.modules)
+                ),
+            }
+        )
+    )
+
+
+def run_probe(settings_module):
+    """Measurements of one fresh interpreter started with ``settings_module``."""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    env.setdefault("DJANGO_SECRET_KEY", "benchmark-only-secret-key")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--probe"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    measurements = json.loads(result.stdout.strip().splitlines()[-1])
+    measurements["process_ms"] = (time.perf_counter() - started) * 1000
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--settings", nargs="+", default=["config.settings.production", "config.settings.api"],
+        help="Settings modules to compare.",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe()
+        return
+
+    rows = []
+    for settings_module in args.settings:
+        runs = [run_probe(settings_module) for _ in range(args.runs)]
+        row = {"settings": settings_module}
+        for metric in ("process_ms", "boot_ms", "first_request_ms", "rss_mb", "modules"):
+            row[metric] = statistics.median(run[metric] for run in runs)
+        row["heavy_modules"] = ",".join(runs[0]["heavy_modules"]) or "-"
+        rows.append(row)
+    report(f"Worker start-up (median of {args.runs} runs)", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Board and list latency as completed trip history grows, with and without
+``archive_trips``. The live set (open trips plus recent history) stays the same
+at every step, so with archival the hot-table latencies should stay flat.
+
+    python -m benchmarks.trip_archive --steps 0 20000 50000 100000
+"""
+import argparse
+from datetime import timedelta
+
+from benchmarks import Timer, report, setup, summarize, test_database
+
+
+def seed():
+    from apps.users.models import User
+    from apps.vehicle.models import Location, Route, Trip
+
+    route = Route.objects.create(
+        pickup=Location.objects.create(name="Kabul"),
+        drop=Location.objects.create(name="Herat"),
+        price_af=600,
+    )
+    passenger, driver, admin = User.objects.bulk_create_users(
+        [
+            {"first_name": "Passenger", "last_name": "A", "email": "passenger@example.com"},
+            {"first_name": "Driver", "last_name": "B", "email": "driver@example.com", "role": "driver"},
+            {"first_name": "Admin", "last_name": "C", "email": "admin@example.com", "role": "admin"},
+        ]
+    )
+    route.drivers.add(driver)
+    Trip.objects.bulk_create(
+        [Trip(passenger=passenger, route=route, fare=route.price_af) for _ in range(50)]
+        + [Trip(passenger=passenger, route=route, driver=driver, status="completed") for _ in range(150)]
+    )
+    return route, passenger, driver, admin
+
+
+def add_history(route, passenger, driver, count, batch_size=5000):
+    from django.utils import timezone
+
+    from apps.vehicle.models import Trip
+
+    old = timezone.now() - timedelta(days=365)
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        created = Trip.objects.bulk_create(
+            [Trip(passenger=passenger, route=route, driver=driver, status="completed") for _ in range(size)]
+        )
+        # auto_now fields ignore values passed to bulk_create
+        Trip.objects.filter(pkid__in=[trip.pkid for trip in created]).update(
+            request_time=old, updated_at=old
+        )
+
+
+def measure(view, user, requests, **params):
+    from rest_framework.test import APIRequestFactory, force_authenticate
+
+    factory = APIRequestFactory()
+    samples = []
+    for _ in range(requests):
+        request = factory.get("/", params)
+        force_authenticate(request, user=user)
+        with Timer() as timer:
+            response = view(request)
+            response.render()
+        samples.append(timer.elapsed)
+    return summarize(samples)["p50_ms"]
+
+
+def run(steps, archive, requests):
+    from apps.vehicle.archive import archive_trips
+    from apps.vehicle.models import ArchivedTrip, Trip
+    from apps.vehicle.views import AdminTripListView, AvailableTripRequestListView
+
+    board = AvailableTripRequestListView.as_view()
+    trips = AdminTripListView.as_view()
+    route, passenger, driver, admin = seed()
+    rows, total = [], 0
+    for step in steps:
+        add_history(route, passenger, driver, step - total)
+        total = step
+        if archive:
+            archive_trips()
+        rows.append(
+            {
+                "archive": archive,
+                "history": total,
+                "hot_rows": Trip.objects.count(),
+                "archived_rows": ArchivedTrip.objects.count(),
+                "board_p50_ms": measure(board, driver, requests),
+                "list_p50_ms": measure(trips, admin, requests, limit=20),
+                "history_p50_ms": measure(trips, admin, requests, history="all", limit=20),
+            }
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[0, 10000, 50000])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    rows = []
+    for archive in (False, True):
+        with test_database():
+            rows.extend(run(sorted(args.steps), archive, args.requests))
+    report("Trip board/list latency vs. history size", rows)
+
+
+if __name__ == "__main__":
+    main()
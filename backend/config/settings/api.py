@@ -0,0 +1,37 @@
+"""
+API-only worker profile: production settings without the admin and its theme,
+django-extensions, the schema/Swagger views and the middleware that only
+session-based pages use. Authentication is by JWT, so API workers need neither
+sessions, CSRF nor messages. Run the admin on a node with the production
+profile.
+
+    DJANGO_SETTINGS_MODULE=config.settings.api gunicorn config.wsgi
+"""
+from .production import *  # noqa
+from .production import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK
+
+API_ONLY_EXCLUDED_APPS = [
+    "jazzmin",
+    "django.contrib.admin",
+    "django.contrib.sessions",
+    "django.contrib.messages",
+    "django_extensions",
+    "drf_spectacular",
+]
+API_ONLY_EXCLUDED_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_ONLY_EXCLUDED_APPS]
+MIDDLEWARE = [name for name in MIDDLEWARE if name not in API_ONLY_EXCLUDED_MIDDLEWARE]
+
+# JSON only: the browsable API needs templates and sessions
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ["apps.common.renderers.FastJSONRenderer"],
+    "DEFAULT_SCHEMA_CLASS": "rest_framework.schemas.openapi.AutoSchema",
+}
@@ -2,6 +2,8 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+from .database import databases_from_env
+
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent
 BASE_DIR = ROOT_DIR / "apps"
 ALLOWED_HOSTS = ["0.0.0.0", "localhost", "127.0.0.1", "api"]
@@ -21,6 +23,10 @@ LOCAL_APPS = [
     "apps.common",
     "apps.profiles",
     "apps.vehicle",
+    "apps.events",
+    "apps.search",
+    "apps.tracking",
+    "apps.routing",
 ]
 THIRD_PARTY_APPS = [
     "drf_spectacular",
@@ -30,9 +36,11 @@ THIRD_PARTY_APPS = [
 ]
 INSTALLED_APPS = DJANGO_APPS + LOCAL_APPS + THIRD_PARTY_APPS
 MIDDLEWARE = [
+    "apps.common.profiling.ProfilingMiddleware",
+    "apps.common.sqlstats.SQLStatsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
-    "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "apps.common.middleware.CompressionMiddleware",
+    "apps.common.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -58,12 +66,47 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "config.wsgi.application"
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": ROOT_DIR / "db.sqlite3",
-    }
+# SQLite by default, PostgreSQL (pooled, with statement timeouts) when
+# DATABASE_URL points at one; see config/settings/database.py.
+DATABASES = databases_from_env(ROOT_DIR / "db.sqlite3")
+# Safe requests read from replicas unless the client wrote in the last
+# REPLICA_PIN_SECONDS; lagging replicas are skipped. Pins of token clients are
+# kept in the cache, so replicas are only used with a shared one (CACHE_URL).
+# See apps/common/routers.py.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["apps.common.routers.ReplicaRouter"]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+REPLICA_LAG_CHECK_INTERVAL = 2
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+REPLICA_PIN_COOKIE = "primary_until"
+# Password hashing. PASSWORD_HASHER_PROFILE picks the hasher used for new
+# hashes; every other hasher stays listed so existing hashes keep verifying and
+# are upgraded on the next login. Compare profiles with benchmarks/hashing.py.
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": "apps.users.hashers.TunedPBKDF2PasswordHasher",
+    "argon2": "apps.users.hashers.TunedArgon2PasswordHasher",
+    "scrypt": "apps.users.hashers.TunedScryptPasswordHasher",
 }
+PASSWORD_HASHER_PROFILE = os.getenv("PASSWORD_HASHER_PROFILE", "pbkdf2")
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]] + [
+    hasher
+    for name, hasher in PASSWORD_HASHER_PROFILES.items()
+    if name != PASSWORD_HASHER_PROFILE
+] + [
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+PASSWORD_HASHER_TUNING = {
+    "pbkdf2_iterations": int(os.getenv("PBKDF2_ITERATIONS", 1_000_000)),
+    "argon2_time_cost": int(os.getenv("ARGON2_TIME_COST", 2)),
+    "argon2_memory_cost": int(os.getenv("ARGON2_MEMORY_COST", 19 * 1024)),
+    "argon2_parallelism": int(os.getenv("ARGON2_PARALLELISM", 1)),
+    "scrypt_work_factor": int(os.getenv("SCRYPT_WORK_FACTOR", 2**14)),
+    "scrypt_block_size": int(os.getenv("SCRYPT_BLOCK_SIZE", 8)),
+    "scrypt_parallelism": int(os.getenv("SCRYPT_PARALLELISM", 1)),
+}
+# Process pool used for bulk imports (apps.users.hashing)
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 0)) or None
+PASSWORD_HASHING_POOL_THRESHOLD = 64
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -86,6 +129,31 @@ STATIC_URL = "/static/"
 STATIC_ROOT = str(ROOT_DIR / "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = str(ROOT_DIR / "mediafile")
+STORAGES = {
+    "default": {"BACKEND": "apps.common.storage.ContentHashStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# Media is served by apps.common.views.serve_media when MEDIA_SERVE is on (off
+# unless set; local settings follow DEBUG). Files in MEDIA_PRIVATE_DIRS and
+# their thumbnails are only served by views that check the user, such as the
+# vehicle license view, so a proxy serving MEDIA_ROOT itself must deny them.
+# Set the accel prefix to an nginx ``internal`` location aliasing MEDIA_ROOT to
+# hand the bytes to nginx.
+MEDIA_SERVE = os.getenv("MEDIA_SERVE", "False") == "True"
+MEDIA_PRIVATE_DIRS = ("license",)
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "")
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_STREAM_BLOCK_SIZE = 64 * 1024
+
+# Uploads are streamed to disk and checked as they arrive (apps.common.uploads)
+FILE_UPLOAD_HANDLERS = ["apps.common.uploads.LimitedImageUploadHandler"]
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 1 * 1024 * 1024))
+MAX_IMAGE_DIMENSION = 6000
+MAX_IMAGE_PIXELS = 24_000_000
+THUMBNAIL_SIZE = 320
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -112,11 +180,22 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
-    "DEFAULT_FILTER_BACKEND": [
+    "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.common.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
+# Response compression (apps.common.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+COMPRESSION_CONTENT_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+# Never compressed, against BREACH: these return tokens or carry CSRF tokens
+COMPRESSION_EXCLUDED_PATHS = ("/api/v1/auth/", "/admin/")
 # Simple JWT settings
 SIMPLE_JWT = {
     "AUTH_HDEFAULT_FROM_EMAILEADER_TYPES": (
@@ -131,6 +210,120 @@ SIMPLE_JWT = {
 }
 
 SITE_ID = 1
+
+# Domain event outbox (apps.events). Events are delivered by the
+# ``dispatch_events`` command unless in-process dispatch on commit is enabled.
+EVENTS_BATCH_SIZE = int(os.getenv("EVENTS_BATCH_SIZE", 500))
+EVENTS_DISPATCH_ON_COMMIT = os.getenv("EVENTS_DISPATCH_ON_COMMIT", "False") == "True"
+# Completed/cancelled trips untouched for this long are moved to ArchivedTrip
+# by the archive_trips command.
+TRIP_ARCHIVE_AFTER_DAYS = int(os.getenv("TRIP_ARCHIVE_AFTER_DAYS", 90))
+# Shared cache. Set CACHE_URL (redis://...) when running more than one
+# process; the default is a per-process memory cache.
+CACHE_URL = os.getenv("CACHE_URL")
+CACHES = {
+    "default": {
+        "BACKEND": (
+            "django.core.cache.backends.redis.RedisCache"
+            if CACHE_URL
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": CACHE_URL or "default",
+        "TIMEOUT": 300,
+        "KEY_PREFIX": os.getenv("CACHE_KEY_PREFIX", "backend"),
+    }
+}
+# Per-user read caches (apps.common.cache.ReadCache)
+READ_CACHE_TIMEOUT = int(os.getenv("READ_CACHE_TIMEOUT", 300))
+READ_CACHE_LOCAL_ENTRIES = 2048
+READ_CACHE_LOCAL_TIMEOUT = 60
+READ_CACHE_LOCK_TIMEOUT = 2
+# Admin full-text search (apps.search)
+SEARCH_MAX_RESULTS = 100
+SEARCH_MAX_TERMS = 8
+# Request instrumentation (apps.common.profiling): phase timings for a share of
+# requests, cProfile for a smaller share, kept when slower than PROFILING_SLOW_MS
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False") == "True"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 1.0))
+PROFILING_CPROFILE_RATE = float(os.getenv("PROFILING_CPROFILE_RATE", 0.01))
+PROFILING_SLOW_MS = int(os.getenv("PROFILING_SLOW_MS", 500))
+PROFILING_MAX_CAPTURES = 20
+PROFILING_SERVER_TIMING = os.getenv("PROFILING_SERVER_TIMING", "True") == "True"
+# OpenAPI schema, precomputed by the build_schema command
+SPECTACULAR_SETTINGS = {
+    "TITLE": "Booking API",
+    "VERSION": "1.0.0",
+    "ENUM_NAME_OVERRIDES": {
+        "TripStatusEnum": "apps.vehicle.models.Trip.STATUS_CHOICES",
+        "DriverApplicationStatusEnum": "apps.vehicle.models.DriverApplication.Status",
+    },
+}
+SCHEMA_ARTIFACT = ROOT_DIR / "schema" / "openapi.json"
+SCHEMA_CACHE_MAX_AGE = 300
+# Bearer token for scraping /internal/metrics; admins can always read it
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# SQL fingerprint statistics (apps.common.sqlstats, reported by sql_report) and
+# the slow query log, which includes the EXPLAIN output
+SQL_STATS_ENABLED = os.getenv("SQL_STATS_ENABLED", "False") == "True"
+SQL_SLOW_MS = int(os.getenv("SQL_SLOW_MS", 200))
+SQL_STATS_FLUSH_SECONDS = int(os.getenv("SQL_STATS_FLUSH_SECONDS", 60))
+SQL_STATS_RETENTION = 24 * 60 * 60
+# Async read views (apps.common.asyncviews), turned on by config.asgi. Parallel
+# queries give each independent query its own connection; PostgreSQL only
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
+ASYNC_PARALLEL_QUERIES = os.getenv("ASYNC_PARALLEL_QUERIES", "False") == "True"
+# Driver live locations (apps.tracking): latest positions in memory (or Redis,
+# see LOCATION_STORE_URL), bucketed by geohash cells of LOCATION_GEOHASH_PRECISION characters (5: about 5 x 5 km);
+# pings are written to DriverLocation in bulk every LOCATION_FLUSH_SECONDS or
+# LOCATION_FLUSH_BATCH pings and kept for LOCATION_HISTORY_DAYS
+LOCATION_GEOHASH_PRECISION = 5
+LOCATION_MAX_BATCH = 100
+LOCATION_MAX_SKEW_SECONDS = 60
+LOCATION_STALE_SECONDS = int(os.getenv("LOCATION_STALE_SECONDS", 120))
+LOCATION_FLUSH_SECONDS = int(os.getenv("LOCATION_FLUSH_SECONDS", 10))
+LOCATION_FLUSH_BATCH = int(os.getenv("LOCATION_FLUSH_BATCH", 20000))
+LOCATION_FLUSH_IN_BACKGROUND = os.getenv("LOCATION_FLUSH_IN_BACKGROUND", "True") == "True"
+LOCATION_INSERT_BATCH = 2000
+LOCATION_BUFFER_MAX = 500_000
+LOCATION_HISTORY_DAYS = int(os.getenv("LOCATION_HISTORY_DAYS", 14))
+LOCATION_SEARCH_RADIUS_KM = 25
+# Shared driver positions (apps.tracking.store.RedisLocationStore); without
+# one each process only knows the drivers whose pings it received
+LOCATION_STORE_URL = os.getenv(
+    "LOCATION_STORE_URL", CACHE_URL if CACHE_URL and CACHE_URL.startswith(("redis://", "rediss://")) else ""
+)
+LOCATION_STORE_PREFIX = os.getenv("LOCATION_STORE_PREFIX", "tracking")
+# Drivers with a live position farther than this from the pickup can't accept
+# a trip; 0 turns the check off
+LOCATION_ACCEPT_RADIUS_KM = float(os.getenv("LOCATION_ACCEPT_RADIUS_KM", 0))
+# Location x Location distance and ETA matrix (apps.routing.matrix), memory-mapped
+# from DISTANCE_MATRIX_DIR. build_distance_matrix publishes the first one; after
+# that, location edits rebuild it in the background. Pairs not joined by
+# DISTANCE_ROAD_GRAPH (a CSV of road segments) get the great-circle distance
+# times DISTANCE_ROAD_FACTOR, driven at DISTANCE_AVERAGE_SPEED_KMH
+DISTANCE_MATRIX_DIR = os.getenv("DISTANCE_MATRIX_DIR", str(ROOT_DIR / "var" / "distance-matrix"))
+DISTANCE_ROAD_GRAPH = os.getenv("DISTANCE_ROAD_GRAPH", "")
+DISTANCE_ROAD_FACTOR = float(os.getenv("DISTANCE_ROAD_FACTOR", 1.3))
+DISTANCE_AVERAGE_SPEED_KMH = float(os.getenv("DISTANCE_AVERAGE_SPEED_KMH", 60))
+DISTANCE_MATRIX_CHECK_SECONDS = 10
+DISTANCE_MATRIX_IN_BACKGROUND = os.getenv("DISTANCE_MATRIX_IN_BACKGROUND", "True") == "True"
+# Itinerary search over the route network (apps.routing.graph), cached per
+# process. Route edits from other processes are read from the outbox every
+# ROUTE_GRAPH_CHECK_SECONDS; the full reload picks up writes that bypass it
+ROUTE_GRAPH_CHECK_SECONDS = float(os.getenv("ROUTE_GRAPH_CHECK_SECONDS", 2))
+ROUTE_GRAPH_RELOAD_SECONDS = int(os.getenv("ROUTE_GRAPH_RELOAD_SECONDS", 3600))
+ITINERARY_MAX_LEGS = 4
+# Ride pooling (apps.vehicle.pooling). Every POOL_BATCH_SECONDS, pool_trips
+# groups open requests that allow it, on the same route and departing within
+# POOL_WINDOW_MINUTES of each other, onto shared rides; requests departing
+# later than POOL_HORIZON_MINUTES wait for a later batch. A seat costs
+# POOL_SEAT_FARE_SHARE of the route price; routes without assigned vehicles
+# are planned for POOL_DEFAULT_VEHICLE_TYPE
+POOL_BATCH_SECONDS = int(os.getenv("POOL_BATCH_SECONDS", 60))
+POOL_WINDOW_MINUTES = int(os.getenv("POOL_WINDOW_MINUTES", 10))
+POOL_HORIZON_MINUTES = int(os.getenv("POOL_HORIZON_MINUTES", 30))
+POOL_SEAT_FARE_SHARE = os.getenv("POOL_SEAT_FARE_SHARE", "0.6")
+POOL_DEFAULT_VEHICLE_TYPE = os.getenv("POOL_DEFAULT_VEHICLE_TYPE", "economy")
 PAYPAL_CLIENT_ID = os.getenv("CLIENT_ID")
 PAYPAL_SECRET_ID = os.getenv("SECRET_KEY")
 LOGGING = {
@@ -146,7 +339,7 @@ LOGGING = {
         "level": "INFO",
     },
     "loggers": {
-        "apps.orders": {
+        "apps.common.sqlstats": {
             "handlers": ["console"],
             "level": "WARNING",
             "propagate": False,
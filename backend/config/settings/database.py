@@ -0,0 +1,155 @@
+"""
+Database settings built from the environment.
+
+``DATABASE_URL`` selects the backend, e.g.
+``postgres://user:password@db:5432/chiqfrip`` or ``sqlite:////srv/db.sqlite3``.
+Without it the project keeps using ``db.sqlite3`` next to ``manage.py``.
+
+SQLite knobs, for single-node deployments:
+
+- ``SQLITE_TUNED``: ``True`` (default) opens every connection in WAL mode with
+  ``synchronous=NORMAL``, a memory map and a larger page cache, and waits up
+  to ``SQLITE_BUSY_TIMEOUT`` seconds for locks. Transactions stay deferred;
+  the paths that read, check and then write (trip acceptance, pooling) take
+  the write lock up front with ``apps.common.transactions.write_transaction``.
+- ``SQLITE_MMAP_SIZE`` (bytes) and ``SQLITE_CACHE_SIZE_KB``.
+
+PostgreSQL knobs (all optional):
+
+- ``DB_POOL``: ``True`` to use psycopg's built-in connection pool, with
+  ``DB_POOL_MIN_SIZE``/``DB_POOL_MAX_SIZE``/``DB_POOL_TIMEOUT``. Pooled
+  connections are returned per request, so ``CONN_MAX_AGE`` is forced to 0.
+- ``DB_CONN_MAX_AGE``: persistent connection lifetime in seconds when not pooling.
+- ``DB_STATEMENT_TIMEOUT_MS`` / ``DB_IDLE_IN_TRANSACTION_TIMEOUT_MS``: server-side
+  timeouts applied to every session. Management commands other than
+  ``runserver`` (migrations, backfills, the event dispatcher) use
+  ``DB_COMMAND_STATEMENT_TIMEOUT_MS`` instead, 0 (no limit) by default.
+- ``DB_CONNECT_TIMEOUT``: seconds to wait for a new connection.
+
+Read replicas:
+
+- ``DATABASE_REPLICA_URLS``: comma-separated URLs, configured as the aliases
+  ``replica``, ``replica_2``, ... and used by ``apps.common.routers``. Test
+  databases mirror ``default``.
+"""
+import os
+import sys
+from urllib.parse import parse_qsl, unquote, urlparse
+
+POSTGRES_SCHEMES = ("postgres", "postgresql", "pgsql")
+# Management commands that serve web requests, and so keep the request timeout
+SERVER_COMMANDS = ("runserver",)
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)) == "True"
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def statement_timeout(argv=None):
+    """The ``statement_timeout`` in ms for this process, started with ``argv``."""
+    argv = sys.argv if argv is None else argv
+    program = os.path.basename(argv[0]) if argv else ""
+    if program in ("manage.py", "django-admin") and len(argv) > 1 and argv[1] not in SERVER_COMMANDS:
+        return _env_int("DB_COMMAND_STATEMENT_TIMEOUT_MS", 0)
+    return _env_int("DB_STATEMENT_TIMEOUT_MS", 30_000)
+
+
+def postgres_options(query=None, argv=None):
+    statement_timeout_ms = statement_timeout(argv)
+    idle_timeout = _env_int("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 60_000)
+    options = {
+        "connect_timeout": _env_int("DB_CONNECT_TIMEOUT", 5),
+        "options": (
+            f"-c statement_timeout={statement_timeout_ms} "
+            f"-c idle_in_transaction_session_timeout={idle_timeout}"
+        ),
+    }
+    if _env_bool("DB_POOL", False):
+        options["pool"] = {
+            "min_size": _env_int("DB_POOL_MIN_SIZE", 2),
+            "max_size": _env_int("DB_POOL_MAX_SIZE", 10),
+            "timeout": _env_int("DB_POOL_TIMEOUT", 10),
+        }
+    options.update(query or {})
+    return options
+
+
+def sqlite_options(query=None):
+    if not _env_bool("SQLITE_TUNED", True):
+        return dict(query or {})
+    options = {
+        "init_command": ";".join(
+            [
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)}",
+                # Negative values are KiB rather than pages
+                f"PRAGMA cache_size=-{_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024)}",
+                "PRAGMA temp_store=MEMORY",
+            ]
+        ),
+        "timeout": _env_int("SQLITE_BUSY_TIMEOUT", 20),
+    }
+    options.update(query or {})
+    return options
+
+
+def parse_database_url(url):
+    """Turn a ``DATABASE_URL`` into a Django ``DATABASES`` entry."""
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query))
+
+    if parsed.scheme == "sqlite":
+        # sqlite:////abs/path.sqlite3 -> /abs/path.sqlite3, sqlite:///:memory:
+        name = unquote(parsed.path[1:] if parsed.path.startswith("//") else parsed.path.lstrip("/"))
+        return {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": name or ":memory:",
+            "OPTIONS": sqlite_options(query),
+        }
+
+    if parsed.scheme in POSTGRES_SCHEMES:
+        options = postgres_options(query)
+        return {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": unquote(parsed.path.lstrip("/")),
+            "USER": unquote(parsed.username or ""),
+            "PASSWORD": unquote(parsed.password or ""),
+            "HOST": parsed.hostname or "",
+            "PORT": str(parsed.port or ""),
+            "CONN_MAX_AGE": 0 if "pool" in options else _env_int("DB_CONN_MAX_AGE", 60),
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": options,
+        }
+
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {parsed.scheme!r}")
+
+
+def replicas_from_env():
+    urls = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    replicas = {}
+    for index, url in enumerate(urls, start=1):
+        config = parse_database_url(url)
+        config["TEST"] = {"MIRROR": "default"}
+        replicas["replica" if index == 1 else f"replica_{index}"] = config
+    return replicas
+
+
+def databases_from_env(default_sqlite_path):
+    """``DATABASES`` with ``default`` and any read replicas."""
+    return {"default": database_from_env(default_sqlite_path), **replicas_from_env()}
+
+
+def database_from_env(default_sqlite_path):
+    url = os.getenv("DATABASE_URL")
+    if url:
+        return parse_database_url(url)
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": default_sqlite_path,
+        "OPTIONS": sqlite_options(),
+    }
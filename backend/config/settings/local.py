@@ -2,12 +2,17 @@ from os import getenv, path
 from dotenv import load_dotenv  # type: ignore
 from .base import *  # noqa
 from .base import ROOT_DIR
+from .database import databases_from_env
 
 local_env_file = path.join(ROOT_DIR, ".env", ".env")
 if path.isfile(local_env_file):
     load_dotenv(local_env_file)
 
+DATABASES = databases_from_env(ROOT_DIR / "db.sqlite3")
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
 DEBUG = getenv("DEBUG")
+MEDIA_SERVE = getenv("MEDIA_SERVE", getenv("DEBUG", "False")) == "True"
 SITE_NAME = getenv("SITE_NAME")
 ALLOWED_HOSTS = getenv("ALLOWED_HOSTS", "localhost,127.0.0.1,0.0.0.0").split(",")
 SECRET_KEY = getenv("DJANGO_SECRET_KEY")
@@ -36,9 +41,9 @@ LOGGING = {
         "level": "INFO",
     },
     "loggers": {
-        "apps.orders": {
+        "apps.common.sqlstats": {
             "handlers": ["console"],
-            "level": "WARNING",  # This will hide INFO logs
+            "level": "WARNING",  # Slow queries
             "propagate": False,
         },
     },
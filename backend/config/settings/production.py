@@ -1,15 +1,22 @@
-from os import getenv, path
+from os import environ, getenv, path
 
 from dotenv import load_dotenv  # type: ignore
 
 from .base import *  # noqa
 from .base import ROOT_DIR
+from .database import databases_from_env
 
 # Load environment variables from .env file (optional in production, but can still be used)
 prod_env_file = path.join(ROOT_DIR, ".env", ".env.production")
 if path.isfile(prod_env_file):
     load_dotenv(prod_env_file)
 
+# Rebuilt after loading .env.production, which usually provides DATABASE_URL.
+# PostgreSQL connections are pooled unless DB_POOL=False.
+environ.setdefault("DB_POOL", "True")
+DATABASES = databases_from_env(ROOT_DIR / "db.sqlite3")
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
 
@@ -59,7 +66,7 @@ LOGGING = {
             "level": "ERROR",
             "propagate": False,
         },
-        "apps.orders": {
+        "apps.common.sqlstats": {
             "handlers": ["console"],
             "level": "WARNING",
             "propagate": False,
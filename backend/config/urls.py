@@ -1,30 +1,53 @@
+from django.apps import apps
 from django.conf import settings
 from django.conf.urls.static import static
-from django.contrib import admin
-from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from django.urls import include, path, re_path
+
+from apps.common.schema import serve_schema
+from apps.common.views import CacheStatsView, MetricsView, ProfileCapturesView, serve_media
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
-    path("", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path(
-        "api/schema/redoc/",
-        SpectacularRedocView.as_view(url_name="schema"),
-        name="redoc",
-    ),
+    # Precomputed by build_schema, so API-only workers serve it too
+    path("api/schema/", serve_schema, name="schema"),
     path("api/v1/auth/", include("apps.users.urls"), name="users"),
     path("api/v1/profiles/", include("apps.profiles.urls"), name="profiles"),
     path("api/v1/vehicle/", include("apps.vehicle.urls"), name="vehicle"),
+    path("api/v1/events/", include("apps.events.urls"), name="events"),
+    path("api/v1/tracking/", include("apps.tracking.urls"), name="tracking"),
+    path("api/v1/routing/", include("apps.routing.urls"), name="routing"),
+    path("api/v1/", include("apps.search.urls"), name="search"),
+    path("api/v1/cache/stats/", CacheStatsView.as_view(), name="cache-stats"),
+    path("internal/metrics", MetricsView.as_view(), name="internal-metrics"),
+    path("internal/profiles", ProfileCapturesView.as_view(), name="internal-profiles"),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
 
-admin.site.site_header = "Online Shopping Center Admin"
-admin.site.site_title = "Online Shopping Center Admin Portal"
-admin.site.index_title = "Welcome to Online Shopping Center API Portal"
+# The admin and the schema UIs are left out on API-only workers
+# (config.settings.api), which then never import them
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns += [path("admin/", admin.site.urls)]
+    admin.site.site_header = "Online Shopping Center Admin"
+    admin.site.site_title = "Online Shopping Center Admin Portal"
+    admin.site.index_title = "Welcome to Online Shopping Center API Portal"
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if apps.is_installed("drf_spectacular"):
+    from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+    urlpatterns += [
+        path("", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+        path(
+            "api/schema/redoc/",
+            SpectacularRedocView.as_view(url_name="schema"),
+            name="redoc",
+        ),
+    ]
+
+# serve_media checks MEDIA_SERVE per request
+urlpatterns += [
+    re_path(
+        r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"),
+        serve_media,
+        name="media",
+    ),
+]